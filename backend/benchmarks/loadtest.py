@@ -0,0 +1,278 @@
+"""Load test for the API against a local mongod or the in-memory backend.
+
+Seeds prompts and newsletter subscribers, drives the real ASGI app in-process
+with concurrent httpx clients and reports p50/p95/p99 latency and throughput
+per endpoint as JSON. Pass a previous report with --baseline to get the deltas
+and a non-zero exit status when p95 regresses by more than --max-regression.
+If the --baseline file does not exist yet, the run is written there instead,
+so the reference always comes from the machine doing the comparison.
+
+    cd backend
+    python -m benchmarks.loadtest --memory --prompts 10000 --subscribers 10000 \\
+        --baseline benchmarks/baseline.local.json
+    python -m benchmarks.loadtest --mongo-url mongodb://localhost:27017 --prompts 1000000 \\
+        --output after.json --baseline before.json
+
+Requires httpx. The target database is dropped and reseeded unless --no-seed
+is given.
+
+benchmarks/example-baseline.json shows the report format. It is one run on one
+machine and is not a reference to compare against; latencies from a different
+machine will differ by far more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+CATEGORIES = ["writing", "coding", "marketing", "research", "education", "design"]
+TAGS = ["gpt", "claude", "summarize", "translate", "brainstorm", "seo", "python", "email", "story", "analysis"]
+
+Scenario = Callable[["httpx.AsyncClient", int], Awaitable["httpx.Response"]]  # noqa: F821
+
+
+def configure_env(args: argparse.Namespace) -> None:
+    # Must run before server.py is imported: it reads its settings at import time
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    if args.memory:
+        os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+    os.environ["CACHE_BACKEND"] = "memory" if args.cache else "off"
+    os.environ.setdefault("LEADERBOARD_REFRESH_SECONDS", "0")
+    os.environ.setdefault("JOB_CONCURRENCY", "1")
+
+
+async def seed_batches(collection, count: int, make: Callable[[int], Dict[str, Any]], batch_size: int = 5000) -> None:
+    for start in range(0, count, batch_size):
+        await collection.insert_many([make(i) for i in range(start, min(count, start + batch_size))], ordered=False)
+
+
+async def seed(db, prompts: int, subscribers: int) -> List[str]:
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    prompt_ids: List[str] = []
+
+    def make_prompt(i: int) -> Dict[str, Any]:
+        prompt_id = str(uuid.uuid4())
+        prompt_ids.append(prompt_id)
+        return {
+            "id": prompt_id,
+            "title": f"Prompt {i}",
+            "description": f"Benchmark prompt number {i} for load testing",
+            "prompt_text": "You are a helpful assistant. " * rng.randint(5, 60),
+            "category": rng.choice(CATEGORIES),
+            "tags": rng.sample(TAGS, rng.randint(1, 4)),
+            "likes": rng.randint(0, 500),
+            "views": rng.randint(0, 20000),
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+        }
+
+    def make_subscriber(i: int) -> Dict[str, Any]:
+        return {
+            "id": str(uuid.uuid4()),
+            "email": f"seed{i}@bench.example.com",
+            "is_active": rng.random() > 0.1,
+            "tags": rng.sample(TAGS, rng.randint(0, 2)),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    await seed_batches(db.prompts, prompts, make_prompt)
+    await seed_batches(db.newsletter_subscribers, subscribers, make_subscriber)
+    return prompt_ids
+
+
+def scenarios(prompt_ids: List[str]) -> Dict[str, Scenario]:
+    rng = random.Random(7)
+
+    async def list_prompts(client, i):
+        return await client.get("/api/prompts/", params={"limit": 20, "view": "summary"})
+
+    async def list_prompts_by_likes(client, i):
+        return await client.get("/api/prompts/", params={"limit": 20, "sort_by": "likes"})
+
+    async def list_prompts_by_category(client, i):
+        return await client.get("/api/prompts/", params={"limit": 20, "category": rng.choice(CATEGORIES)})
+
+    async def get_prompt(client, i):
+        # Every hit also counts a view
+        return await client.get(f"/api/prompts/{rng.choice(prompt_ids)}")
+
+    async def like_prompt(client, i):
+        return await client.post(f"/api/prompts/{rng.choice(prompt_ids)}/like")
+
+    async def trending(client, i):
+        return await client.get("/api/prompts/trending", params={"limit": 20})
+
+    async def search(client, i):
+        return await client.get("/api/search/", params={"q": rng.choice(TAGS)})
+
+    async def subscribe(client, i):
+        # A fresh address every time (warmup included), so each call is a signup
+        return await client.post("/api/newsletter/subscribe", json={"email": f"bench-{uuid.uuid4().hex}@example.com"})
+
+    return {
+        "get_prompts": list_prompts,
+        "get_prompts_sort_likes": list_prompts_by_likes,
+        "get_prompts_category": list_prompts_by_category,
+        "get_prompt": get_prompt,
+        "like_prompt": like_prompt,
+        "trending": trending,
+        "search": search,
+        "subscribe": subscribe,
+    }
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, i)
+                ok = response.status_code < 400
+                label = str(response.status_code)
+            except Exception as e:
+                ok, label = False, type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors[label] = errors.get(label, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    regressions = []
+    for name, result in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        delta = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        result["p95_delta_pct"] = round(delta * 100, 1)
+        result["throughput_delta_pct"] = round((result["throughput_rps"] / before["throughput_rps"] - 1) * 100, 1)
+        if delta > max_regression:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    configure_env(args)
+    import httpx
+    import server
+
+    await server.app.router.startup()
+    try:
+        db = server.db
+        if args.seed:
+            await db.prompts.drop()
+            await db.newsletter_subscribers.drop()
+            started = time.perf_counter()
+            prompt_ids = await seed(db, args.prompts, args.subscribers)
+            seeded_in = time.perf_counter() - started
+            # drop() took the indexes created at startup with it
+            await server.ensure_indexes(db)
+            # Rebuild the in-memory structures over the freshly seeded data
+            await server.search_index.build(db)
+            await server.leaderboard.build(db)
+        else:
+            prompt_ids = [doc["id"] async for doc in db.prompts.find({}, {"_id": 0, "id": 1}).limit(100000)]
+            seeded_in = 0.0
+        if not prompt_ids:
+            print("No prompts to benchmark against; drop --no-seed", file=sys.stderr)
+            return 2
+
+        selected = scenarios(prompt_ids)
+        if args.endpoints:
+            selected = {name: selected[name] for name in args.endpoints.split(",")}
+
+        transport = httpx.ASGITransport(app=server.app)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        report: Dict[str, Any] = {
+            "started_at": datetime.utcnow().isoformat(),
+            "backend": "memory" if args.memory else args.mongo_url,
+            "prompts": args.prompts,
+            "subscribers": args.subscribers,
+            "cache": args.cache,
+            "seed_seconds": round(seeded_in, 2),
+            "endpoints": {},
+        }
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+            for name, scenario in selected.items():
+                await run_scenario(client, scenario, args.warmup, args.concurrency)
+                report["endpoints"][name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+                print(f"{name}: {report['endpoints'][name]}", file=sys.stderr)
+    finally:
+        await server.app.router.shutdown()
+
+    status = 0
+    if args.baseline and not Path(args.baseline).exists():
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"No baseline at {args.baseline}; saved this run as the baseline", file=sys.stderr)
+    elif args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.max_regression)
+        report["regressions"] = regressions
+        status = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    print(output)
+    return status
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the API against a local Mongo")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--memory", action="store_true", help="use the in-process STORAGE_BACKEND=memory repositories")
+    parser.add_argument("--db-name", default="loadtest")
+    parser.add_argument("--prompts", type=int, default=10000)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--no-seed", dest="seed", action="store_false")
+    parser.add_argument("--requests", type=int, default=2000, help="per endpoint")
+    parser.add_argument("--warmup", type=int, default=100, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--endpoints", help="comma separated subset, e.g. get_prompts,get_prompt")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    parser.add_argument("--baseline", help="previous JSON report to compare against, written if missing")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="allowed p95 increase, 0.10 = 10%%")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,131 @@
+"""CPU cost of rendering a 100-item prompt page: model rebuild + response_model
+validation + json.dumps (the old path) against trusted_response (orjson, no
+re-validation).
+
+Runs the real FastAPI request pipeline in-process, without a socket or Mongo,
+and reports per-request process CPU time as JSON:
+
+    cd backend && python -m benchmarks.serialization --items 100 --requests 2000
+
+Reference run (100 items, 2000 requests, one core of a dev container; compare
+runs on the same machine only):
+
+    before (Prompt(**doc) + response_model + json.dumps)  mean 969 us, p95 1023 us
+    after  (trusted_response, orjson)                      mean 250 us, p95 393 us
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from fastjson import FAST_JSON, trusted_response  # noqa: E402
+from models import Prompt  # noqa: E402
+
+
+def make_docs(n: int) -> List[Dict[str, Any]]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": uuid.uuid4().hex[:24],
+            "id": str(uuid.uuid4()),
+            "title": f"Prompt {i}",
+            "description": "A reasonably sized description of what the prompt does. " * 2,
+            "prompt_text": "You are a helpful assistant. " * 40,
+            "category": "writing",
+            "tags": ["gpt", "writing", f"tag{i % 7}"],
+            "likes": i * 3,
+            "views": i * 17,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def build_app(docs: List[Dict[str, Any]]) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/legacy", response_model=List[Prompt])
+    async def legacy():
+        return [Prompt(**doc) for doc in docs]
+
+    @app.get("/fast", response_model=List[Prompt])
+    async def fast():
+        return trusted_response(Prompt, docs)
+
+    return app
+
+
+async def request(app: FastAPI, path: str) -> bytes:
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+async def measure(app: FastAPI, path: str, requests: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        await request(app, path)
+    samples = []
+    for _ in range(requests):
+        start = time.process_time()
+        await request(app, path)
+        samples.append((time.process_time() - start) * 1e6)
+    return {
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(statistics.median(samples), 1),
+        "p95_us": round(statistics.quantiles(samples, n=20)[18], 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+
+    docs = make_docs(args.items)
+    app = build_app(docs)
+
+    # Same payload either way (key order aside)
+    legacy, fast = json.loads(await request(app, "/legacy")), json.loads(await request(app, "/fast"))
+    assert legacy == fast, "fast path renders a different payload"
+
+    before = await measure(app, "/legacy", args.requests, args.warmup)
+    after = await measure(app, "/fast", args.requests, args.warmup)
+    print(json.dumps({
+        "items": args.items,
+        "requests": args.requests,
+        "fast_json": FAST_JSON,
+        "before": before,
+        "after": after,
+        "speedup": round(before["mean_us"] / after["mean_us"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
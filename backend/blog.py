@@ -1,16 +1,40 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # Assuming a get_db dependency for database connection, and get_current_active_user for auth
 # These would need to be defined in your main app or a common dependencies file.
 # For now, I'll use placeholder comments for where they'd be used.
 # from ..dependencies import get_db, get_current_active_user, User
-from ..models import BlogPost, BlogPostCreate, BlogPostUpdate, ContentStatus, User # User needed for author_id
+from ..cache import cached, response_cache
+from ..search_engine import search_index
+from ..usage import USAGE_FIELDS, record_usage_change
+from ..conditional import (
+    VALIDATOR_FIELDS, VALIDATOR_PROJECTION, has_validators, make_validators, revalidate, revalidate_one, validator_headers
+)
+from ..models import BlogPost, BlogPostCreate, BlogPostUpdate, BlogPostSummary, ContentStatus, ExpandedBlogPostSummary, TocEntry, User # User needed for author_id
+from ..db_utils import update_and_fetch
+from ..pagination import (
+    NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, keyset_filter, keyset_sort, next_cursor
+)
+from ..projections import fields_projection, list_response, model_projection, parse_fields
+from ..fastjson import trusted_response
+from ..loaders import embed_category_names, fetch_by_ids, parse_ids
+from ..rendering import content_hash, render_content
 
 router = APIRouter(prefix="/blog", tags=["blog"])
 
+# Post plus what rendering.py stores at write time
+class RenderedBlogPost(BlogPost):
+    content_html: Optional[str] = None
+    toc: List[TocEntry] = []
+    content_hash: Optional[str] = None
+
+# expand=category: posts carry their category's name, resolved per page with one batched lookup
+class ExpandedBlogPost(RenderedBlogPost):
+    category_name: Optional[str] = None
+
 # Placeholder for database dependency - in a real app, this comes from main.py or deps.py
 async def get_db_placeholder():
     # This would be your actual database connection logic, e.g., from a global var or context
@@ -25,7 +49,7 @@ async def get_current_user_placeholder():
     # For now, returning a mock user
     return User(id="mock_user_id", username="mockuser", email="user@example.com", role="author", password_hash="hashed")
 
-@router.post("/", response_model=BlogPost, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=RenderedBlogPost, status_code=status.HTTP_201_CREATED)
 async def create_blog_post(
     post_data: BlogPostCreate,
     db: AsyncIOMotorDatabase = Depends(get_db_placeholder), # Replace with actual get_db
@@ -37,22 +61,43 @@ async def create_blog_post(
     # For now, assuming slug is provided and unique handling is elsewhere or not critical for this step
     
     new_post = BlogPost(**new_post_data)
+    # Rendered once here (HTML, toc, read time); reads serve the stored result
+    new_doc = {**new_post.dict(), **render_content(new_post_data.get("content"))}
     # await db.blog_posts.insert_one(new_post.dict(by_alias=True)) # by_alias if using Field aliases
-    await db.blog_posts.insert_one(new_post.dict())
-    return new_post
+    await db.blog_posts.insert_one(new_doc)
+    await record_usage_change(db, "blog", None, new_doc)
+    search_index.index_blog_post(new_doc)
+    await response_cache.invalidate("blog")
+    return RenderedBlogPost(**new_doc)
 
-@router.get("/", response_model=List[BlogPost])
+@router.get("/", response_model=List[RenderedBlogPost])
+@cached("blog:list", tags=["blog"])
 async def get_blog_posts(
+    request: Request,
+    response: Response,
     category_id: Optional[str] = None,
     tag: Optional[str] = None,
     author_id: Optional[str] = None,
     status: Optional[ContentStatus] = None,
     limit: int = Query(10, ge=1, le=100),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0),  # legacy offset paging, prefer `after`
+    after: Optional[str] = None,  # opaque cursor from the X-Next-Cursor header
     sort_by: str = "created_at",
     sort_order: int = -1,  # -1 for descending, 1 for ascending
+    view: Literal["full", "summary"] = "full",  # summary = BlogPostSummary, no content body
+    fields: Optional[str] = None,  # sparse fieldset, e.g. "title,excerpt,slug"
+    ids: Optional[str] = None,  # batch fetch, e.g. "id1,id2" (in that order, one $in query)
+    expand: Optional[Literal["category"]] = None,  # adds category_name
     db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
 ):
+    try:
+        field_names = parse_fields(fields, RenderedBlogPost)
+        id_list = parse_ids(ids) if ids else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if id_list and (after or skip):
+        raise HTTPException(status_code=400, detail="'ids' can't be combined with 'after' or 'skip'")
+
     query = {}
     if category_id:
         query["category_id"] = category_id
@@ -63,28 +108,88 @@ async def get_blog_posts(
     if status:
         query["status"] = status.value
 
-    cursor = db.blog_posts.find(query)
+    if sort_by not in ["created_at", "published_at", "updated_at", "title", "read_time_minutes"]:
+        sort_by, sort_order = "created_at", -1
+    sort_order = -1 if sort_order < 0 else 1
+
+    if after:
+        # `status` is shadowed by the query param here, hence the literal codes
+        if skip:
+            raise HTTPException(
+                status_code=400,
+                detail="Use either 'after' or 'skip', not both"
+            )
+        try:
+            value, last_id = decode_cursor(after, sort_by, sort_order)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query.update(keyset_filter(sort_by, sort_order, value, last_id))
+
+    projection = None
+    if field_names:
+        projection = fields_projection(field_names + [sort_by, *VALIDATOR_FIELDS])
+    elif view == "summary":
+        projection = model_projection(BlogPostSummary)
+
+    def page(projection):
+        if id_list:
+            return fetch_by_ids(db.blog_posts, id_list, projection, query)
+        cursor = db.blog_posts.find(query, projection).sort(keyset_sort(sort_by, sort_order))
+        if skip:
+            cursor = cursor.skip(skip)
+        return cursor.limit(limit).to_list(limit)
+
+    # Revalidation: answer 304 from a validator projection of the same page
+    variant = str(request.url.query)
+    if has_validators(request):
+        not_modified = revalidate(request, await page(VALIDATOR_PROJECTION), variant)
+        if not_modified:
+            return not_modified
 
-    if sort_by in ["created_at", "published_at", "updated_at", "title", "read_time_minutes"]:
-        cursor = cursor.sort(sort_by, sort_order)
-    else:
-        cursor = cursor.sort("created_at", -1)
+    if field_names and expand:
+        projection["category_id"] = 1
+    posts = await page(projection)
 
-    cursor = cursor.skip(skip).limit(limit)
-    posts = await cursor.to_list(limit)
-    return [BlogPost(**post) for post in posts]
+    token = None if id_list else next_cursor(sort_by, sort_order, posts, limit)
+    headers = validator_headers(*make_validators(posts, variant))
+    if token:
+        headers[NEXT_CURSOR_HEADER] = token
+    if expand:
+        await embed_category_names(request, db.categories, posts)
+    if field_names:
+        extras = {sort_by, *VALIDATOR_FIELDS} | ({"category_id"} if expand else set())
+        # id is part of every sparse fieldset (projections.py)
+        for extra in extras - {"id", *field_names}:
+            for post in posts:
+                post.pop(extra, None)
+        return list_response(posts, headers)
+    if view == "summary":
+        return trusted_response(ExpandedBlogPostSummary if expand else BlogPostSummary, posts, headers)
+
+    # Our own documents: shaped and rendered without re-validation
+    return trusted_response(ExpandedBlogPost if expand else RenderedBlogPost, posts, headers)
+
+@router.get("/{post_id}", response_model=RenderedBlogPost)
+@cached("blog:item", tags=["blog"])
+async def get_blog_post(
+    post_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
+):
+    not_modified = await revalidate_one(request, db.blog_posts, {"id": post_id})
+    if not_modified:
+        return not_modified
 
-@router.get("/{post_id}", response_model=BlogPost)
-async def get_blog_post(post_id: str, db: AsyncIOMotorDatabase = Depends(get_db_placeholder)):
     post = await db.blog_posts.find_one({"id": post_id})
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Blog post not found"
         )
-    return BlogPost(**post)
+    return trusted_response(RenderedBlogPost, post, validator_headers(*make_validators([post])))
 
-@router.put("/{post_id}", response_model=BlogPost)
+@router.put("/{post_id}", response_model=RenderedBlogPost)
 async def update_blog_post(
     post_id: str,
     post_update: BlogPostUpdate,
@@ -104,31 +209,33 @@ async def update_blog_post(
             detail="No fields to update"
         )
 
-    update_data["updated_at"] = datetime.utcnow()
     if "status" in update_data and update_data["status"] == ContentStatus.PUBLISHED.value:
         if "published_at" not in update_data or update_data["published_at"] is None:
              update_data["published_at"] = datetime.utcnow()
 
-    result = await db.blog_posts.update_one(
-        {"id": post_id},
-        {"$set": update_data}
-    )
-
-    if result.modified_count == 0:
-        # Check if the document exists to differentiate between not found and no actual change
-        existing_post = await db.blog_posts.find_one({"id": post_id})
-        if not existing_post:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Blog post not found"
-            )
-        # If it exists but wasn't modified, it might be an update with same values or an issue
-        # For now, we assume it's okay and return the current state
+    outcome = None
+    if "content" in update_data:
+        # Re-rendered only when the content (or RENDER_VERSION) actually changed.
+        # The stored hash is checked in the update's own filter, so content
+        # written concurrently can't leave a stale rendering behind.
+        unchanged = {"id": post_id, "content_hash": content_hash(update_data["content"])}
+        outcome = await update_and_fetch(db.blog_posts, unchanged, update_data)
+        if not outcome.found:
+            update_data.update(render_content(update_data["content"]))
+            outcome = None
 
-    updated_post = await db.blog_posts.find_one({"id": post_id})
-    if not updated_post:
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blog post not found after update attempt")
-    return BlogPost(**updated_post)
+    # One round trip; "no change" (same values) still returns the current state
+    if outcome is None:
+        outcome = await update_and_fetch(db.blog_posts, {"id": post_id}, update_data)
+    if not outcome.found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Blog post not found"
+        )
+    await record_usage_change(db, "blog", outcome.previous, outcome.document)
+    search_index.index_blog_post(outcome.document)
+    await response_cache.invalidate("blog")
+    return RenderedBlogPost(**outcome.document)
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_blog_post(
@@ -141,13 +248,19 @@ async def delete_blog_post(
     # if not post or (post["author_id"] != current_user.id and current_user.role not in ["editor", "admin"]):
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this post")
 
-    result = await db.blog_posts.delete_one({"id": post_id})
+    # find_one_and_delete hands back what the usage counters need in the same round trip
+    deleted = await db.blog_posts.find_one_and_delete(
+        {"id": post_id}, projection={"_id": 0, **{f: 1 for f in USAGE_FIELDS["blog"]}}
+    )
 
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Blog post not found"
         )
+    await record_usage_change(db, "blog", deleted, None)
+    search_index.remove("blog", post_id)
+    await response_cache.invalidate("blog")
     return None
 
 # Additional routes for status changes (e.g., submit_for_review, approve_post) would go here
@@ -0,0 +1,193 @@
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db_utils import touching_update
+
+# Bulk create/update/delete helpers.
+# Request bodies are a JSON array or NDJSON (one object per line). Every item
+# is validated up front, uniqueness is checked with one $in query, and writes
+# go out as a single unordered insert_many/bulk_write. The response reports the
+# outcome of every item by its position in the input.
+
+MAX_BULK_ITEMS = 50000
+
+
+async def read_items(request: Request) -> List[Any]:
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed bulk body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Bulk body must be a JSON array or NDJSON")
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    return items
+
+
+def validate_items(items: List[Any], model: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors.append({"index": index, "status": "invalid", "error": e.errors(include_url=False)})
+    return valid, errors
+
+
+class BulkReport:
+    def __init__(self, results: Optional[List[Dict[str, Any]]] = None):
+        self.results = list(results or [])
+
+    def add(self, index: int, status: str, **extra: Any) -> None:
+        self.results.append({"index": index, "status": status, **extra})
+
+    def to_dict(self) -> Dict[str, Any]:
+        summary: Dict[str, int] = {}
+        for result in self.results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        return {
+            "total": len(self.results),
+            "summary": summary,
+            "results": sorted(self.results, key=lambda r: r["index"]),
+        }
+
+
+def _write_errors(e: BulkWriteError) -> Dict[int, str]:
+    return {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+
+
+async def bulk_insert(
+    collection,
+    docs: List[Tuple[int, Dict[str, Any]]],
+    report: BulkReport,
+    unique_key: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+    unique_query: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    # Drop duplicates, both against the collection (one $in query) and within the batch
+    if unique_key and docs:
+        existing = set()
+        async for doc in collection.find(unique_query([d for _, d in docs]), {"_id": 0}):
+            existing.add(unique_key(doc))
+        seen, kept = set(), []
+        for index, doc in docs:
+            key = unique_key(doc)
+            if key in existing or key in seen:
+                report.add(index, "duplicate")
+            else:
+                seen.add(key)
+                kept.append((index, doc))
+        docs = kept
+
+    if not docs:
+        return []
+
+    failed: Dict[int, str] = {}
+    try:
+        await collection.insert_many([doc for _, doc in docs], ordered=False)
+    except BulkWriteError as e:
+        failed = _write_errors(e)
+
+    inserted = []
+    for position, (index, doc) in enumerate(docs):
+        doc.pop("_id", None)
+        if position in failed:
+            report.add(index, "error", id=doc["id"], error=failed[position])
+        else:
+            report.add(index, "created", id=doc["id"])
+            inserted.append(doc)
+    return inserted
+
+
+def _projection(fields: Optional[List[str]]) -> Dict[str, int]:
+    return {"_id": 0, "id": 1, **{field: 1 for field in fields or []}}
+
+
+async def bulk_update(
+    collection,
+    updates: List[Tuple[int, str, Dict[str, Any]]],
+    report: BulkReport,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    # Returns {id: pre-image} of the updated documents, with the requested fields.
+    # Like update_and_fetch, updated_at only moves for items that change a
+    # value, so no-op items keep their ETags. The pre-images come from a find
+    # before the bulk_write: a concurrent write in between makes them stale,
+    # and usage counts derived from them drift until `python usage.py`.
+    ids = [doc_id for _, doc_id, _ in updates]
+    existing = {doc["id"]: doc async for doc in collection.find({"id": {"$in": ids}}, _projection(fields))}
+
+    ops, op_items = [], []
+    now = datetime.utcnow()
+    for index, doc_id, fields in updates:
+        if doc_id not in existing:
+            report.add(index, "not_found", id=doc_id)
+        elif not fields:
+            report.add(index, "invalid", id=doc_id, error="No fields to update")
+        else:
+            ops.append(UpdateOne({"id": doc_id}, touching_update(fields, now)))
+            op_items.append((index, doc_id))
+
+    failed: Dict[int, str] = {}
+    if ops:
+        try:
+            await collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            failed = _write_errors(e)
+
+    updated = {}
+    for position, (index, doc_id) in enumerate(op_items):
+        if position in failed:
+            report.add(index, "error", id=doc_id, error=failed[position])
+        else:
+            report.add(index, "updated", id=doc_id)
+            updated[doc_id] = existing[doc_id]
+    return updated
+
+
+async def bulk_delete(
+    collection,
+    ids: List[str],
+    report: BulkReport,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    # Returns {id: last image} of the deleted documents, with the requested fields
+    existing = {doc["id"]: doc async for doc in collection.find({"id": {"$in": ids}}, _projection(fields))}
+    if existing:
+        await collection.delete_many({"id": {"$in": list(existing)}})
+    for index, doc_id in enumerate(ids):
+        report.add(index, "deleted" if doc_id in existing else "not_found", id=doc_id)
+    return existing
+
+
+def split_update_items(items: List[Any], model: Type[BaseModel]) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], BulkReport]:
+    # Update items are {"id": ..., <fields of the *Update model>}
+    report = BulkReport()
+    updates = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("id"), str):
+            report.add(index, "invalid", error="Each item needs a string 'id'")
+            continue
+        fields = {k: v for k, v in item.items() if k != "id"}
+        try:
+            parsed = model.model_validate(fields)
+        except ValidationError as e:
+            report.add(index, "invalid", id=item["id"], error=e.errors(include_url=False))
+            continue
+        updates.append((index, item["id"], {k: v for k, v in parsed.model_dump(exclude_unset=True).items() if v is not None}))
+    return updates, report
+
+
+def split_delete_items(items: List[Any]) -> List[str]:
+    if not all(isinstance(item, str) for item in items):
+        raise HTTPException(status_code=400, detail="Bulk delete body must be a list of ids")
+    return items
@@ -0,0 +1,264 @@
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from conditional import is_fresh
+
+logger = logging.getLogger(__name__)
+
+# Response cache for read endpoints.
+# Entries are rendered JSON bodies (plus the few headers we set ourselves),
+# keyed by the endpoint namespace and its normalized query params, and tagged
+# so that write handlers can drop everything derived from a collection with a
+# single invalidate("prompts") call. The in-process LRU is the default; a
+# Redis backend can be plugged in to share the cache between workers.
+
+CachedEntry = Tuple[bytes, Dict[str, str]]
+
+# Endpoint arguments that are injected rather than coming from the query string
+NON_KEY_ARGS = {"db", "request", "response", "current_user", "current_admin_user"}
+
+# Response headers worth replaying from a cached entry
+KEPT_HEADERS = {"etag", "last-modified", "cache-control"}
+
+
+class CacheBackend:
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CachedEntry, ttl: float, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, CachedEntry, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def _drop(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry, _ = item
+        if expires_at < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CachedEntry, ttl: float, tags: Iterable[str]) -> None:
+        if key in self._entries:
+            self._drop(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, entry, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+                dropped += 1
+        return dropped
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    # Shared backend; expiry and eviction are left to Redis itself
+    def __init__(self, url: str, prefix: str = "respcache:"):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._redis = aioredis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        raw = await self._redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        return payload["body"].encode(), payload["headers"]
+
+    async def set(self, key: str, entry: CachedEntry, ttl: float, tags: Iterable[str]) -> None:
+        body, headers = entry
+        payload = json.dumps({"body": body.decode(), "headers": headers})
+        pipe = self._redis.pipeline()
+        pipe.set(self.prefix + key, payload, ex=max(1, int(ttl)))
+        for tag in tags:
+            pipe.sadd(self.prefix + "tag:" + tag, key)
+        await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            keys = await self._redis.smembers(tag_key)
+            if keys:
+                dropped += await self._redis.delete(*[self.prefix + k.decode() for k in keys])
+            await self._redis.delete(tag_key)
+        return dropped
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=self.prefix + "*"):
+            await self._redis.delete(key)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(_normalize(v)) for v in value)
+    return value
+
+
+def make_key(namespace: str, params: Dict[str, Any]) -> str:
+    items = sorted((k, _normalize(v)) for k, v in params.items() if v is not None and k not in NON_KEY_ARGS)
+    return f"{namespace}?{urlencode(items)}"
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        if not self.enabled:
+            return None
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            # A broken shared backend must never take reads down with it
+            logger.warning("Response cache get failed: %s", e)
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def set(self, key: str, entry: CachedEntry, tags: Iterable[str], ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, entry, ttl or self.ttl, tags)
+        except Exception as e:
+            logger.warning("Response cache set failed: %s", e)
+
+    async def invalidate(self, *tags: str) -> None:
+        try:
+            self.invalidations += await self.backend.invalidate_tags(tags)
+        except Exception as e:
+            logger.warning("Response cache invalidation failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "invalidations": self.invalidations,
+            "entries": len(self.backend) if isinstance(self.backend, MemoryCacheBackend) else None,
+        }
+
+
+response_cache = ResponseCache(MemoryCacheBackend())
+
+
+def configure_cache(backend: str = "memory", ttl: float = 60.0, max_entries: int = 1024, redis_url: Optional[str] = None) -> ResponseCache:
+    if backend == "redis":
+        response_cache.backend = RedisCacheBackend(redis_url or "redis://localhost:6379/0")
+    elif backend == "off":
+        response_cache.enabled = False
+    else:
+        response_cache.backend = MemoryCacheBackend(max_entries=max_entries)
+    response_cache.ttl = ttl
+    return response_cache
+
+
+def _kept_headers(headers) -> Dict[str, str]:
+    return {k: v for k, v in headers.items() if k.lower().startswith("x-") or k.lower() in KEPT_HEADERS}
+
+
+def _render(result: Any, response: Optional[Response]) -> CachedEntry:
+    if isinstance(result, Response):
+        return bytes(result.body), _kept_headers(result.headers)
+    body = json.dumps(jsonable_encoder(result), separators=(",", ":")).encode()
+    return body, _kept_headers(response.headers) if response is not None else {}
+
+
+def _cached_not_modified(request, headers: Dict[str, str]) -> Optional[Response]:
+    headers = {k.lower(): v for k, v in headers.items()}
+    etag = headers.get("etag")
+    if request is None or etag is None:
+        return None
+    # Last-Modified is already folded into the ETag, so If-None-Match is enough here
+    if "if-none-match" in request.headers and is_fresh(request, etag, None):
+        return Response(status_code=304, headers={k: v for k, v in headers.items() if k in KEPT_HEADERS})
+    return None
+
+
+def cached(namespace: str, tags: List[str], ttl: Optional[float] = None):
+    # Decorator for GET endpoints; place it under the @router.get(...) line.
+    # Only 200 JSON results are cached, exceptions (404 etc.) pass straight through.
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            key = make_key(namespace, kwargs)
+            entry = await response_cache.get(key)
+            if entry is None:
+                result = await endpoint(**kwargs)
+                if isinstance(result, Response) and (result.status_code != 200 or not hasattr(result, "body")):
+                    return result
+                entry = _render(result, kwargs.get("response"))
+                await response_cache.set(key, entry, tags, ttl)
+            body, headers = entry
+            return (
+                _cached_not_modified(kwargs.get("request"), headers)
+                or Response(content=body, media_type="application/json", headers=headers)
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+import notifications
+from external_integrations.mailer import Mailer
+from jobs import RetryLater, job_queue
+
+logger = logging.getLogger(__name__)
+
+# Newsletter campaign fan-out.
+# A campaign targets tag segments of active subscribers (no segments = all).
+# Each segment is streamed from a cursor in email order and its template is
+# compiled once; recipients are sent in concurrent batches paced by a token
+# bucket. After every batch the (segment, last email) position is saved on the
+# campaign, so a run that dies resumes right after the last finished batch.
+# A subscriber in several segments only gets the first one's email: segment i
+# excludes the tags of segments 0..i-1 in the query itself.
+#
+# Runs are jobs on the job queue, whose heartbeat keeps the job leased for as
+# long as the run takes. The campaign holds its own lease too (lock_id, renewed
+# every lease/3 seconds while the run is alive), so a duplicate job cannot
+# start a second sender while the first is alive: it gets CampaignBusy, and
+# the queue retries it once the campaign lease could have run out, without
+# counting an attempt. If the first sender died, that retry resumes from its
+# checkpoint. Checkpoints and the final status are only written by the lock
+# holder; a run that finds its lease taken over stops with CampaignBusy.
+
+DRAFT = "draft"
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+
+MAX_ERRORS_KEPT = 20
+
+
+class CampaignBusy(RetryLater):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def segment_query(segments: List[str], index: int) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"is_active": True}
+    if segments:
+        query["tags"] = {"$eq": segments[index], "$nin": segments[:index]}
+    return query
+
+
+def render_segment(campaign: Dict[str, Any], segment: Optional[str]) -> Tuple[Template, Template]:
+    # Campaign-level placeholders are filled once per segment; $email and
+    # $unsubscribe_url are left for the per-recipient pass
+    context = {"segment": segment or "", "campaign_id": campaign["id"]}
+    subject = Template(Template(campaign["subject"]).safe_substitute(context))
+    body = Template(Template(campaign["body"]).safe_substitute(context))
+    return subject, body
+
+
+class CampaignSender:
+    def __init__(self, rate: float = 500.0, concurrency: int = 50, batch_size: int = 1000,
+                 lease: float = 120.0, unsubscribe_url: str = ""):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.lease = lease
+        self.unsubscribe_url = unsubscribe_url
+
+    async def _claim(self, db: AsyncIOMotorDatabase, campaign_id: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await db.newsletter_campaigns.find_one_and_update(
+            {"id": campaign_id, "status": {"$in": [QUEUED, SENDING]}, "$or": [
+                {"locked_until": None}, {"locked_until": {"$lt": now}},
+            ]},
+            {"$set": {
+                "status": SENDING, "lock_id": str(uuid.uuid4()),
+                "locked_until": now + timedelta(seconds=self.lease), "updated_at": now,
+            }},
+            projection={"_id": False},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _heartbeat(self, db: AsyncIOMotorDatabase, campaign: Dict[str, Any]) -> None:
+        # Keeps the campaign leased however long a batch takes to send
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            now = datetime.utcnow()
+            try:
+                result = await db.newsletter_campaigns.update_one(
+                    {"id": campaign["id"], "lock_id": campaign["lock_id"], "status": SENDING},
+                    {"$set": {"locked_until": now + timedelta(seconds=self.lease)}},
+                )
+            except PyMongoError as e:
+                logger.warning("Campaign %s lease renewal failed: %s", campaign["id"], e)
+                continue
+            if not result.matched_count:
+                # The next checkpoint stops the run
+                logger.warning("Campaign %s lost its lease while sending", campaign["id"])
+                return
+
+    async def _checkpoint(self, db: AsyncIOMotorDatabase, campaign: Dict[str, Any], segment: int, last_email: Optional[str],
+                          sent: int, failed: int, errors: List[str]) -> None:
+        now = datetime.utcnow()
+        update: Dict[str, Any] = {
+            "$set": {
+                "checkpoint": {"segment": segment, "last_email": last_email},
+                "locked_until": now + timedelta(seconds=self.lease),
+                "updated_at": now,
+            },
+            "$inc": {"sent": sent, "failed": failed},
+        }
+        if errors:
+            update["$push"] = {"errors": {"$each": errors, "$slice": -MAX_ERRORS_KEPT}}
+        result = await db.newsletter_campaigns.update_one({"id": campaign["id"], "lock_id": campaign["lock_id"]}, update)
+        if not result.matched_count:
+            raise CampaignBusy(f"Campaign {campaign['id']} was taken over by another worker", delay=self.lease)
+
+    async def _send_batch(self, transport: Mailer, bucket: TokenBucket, semaphore: asyncio.Semaphore,
+                          subject: Template, body: Template, emails: List[str]) -> Tuple[int, List[str]]:
+        async def deliver(email: str) -> Optional[str]:
+            context = {"email": email, "unsubscribe_url": f"{self.unsubscribe_url}{quote(email)}" if self.unsubscribe_url else ""}
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    await transport.send(email, subject.safe_substitute(context), body.safe_substitute(context))
+                except Exception as e:
+                    return f"{email}: {type(e).__name__}: {e}"
+            return None
+
+        results = await asyncio.gather(*(deliver(email) for email in emails))
+        errors = [error for error in results if error]
+        return len(emails) - len(errors), errors
+
+    async def run(self, db: AsyncIOMotorDatabase, campaign_id: str, transport: Optional[Mailer] = None) -> Optional[Dict[str, Any]]:
+        transport = transport or notifications.mailer
+        campaign = await self._claim(db, campaign_id)
+        if campaign is None:
+            current = await db.newsletter_campaigns.find_one({"id": campaign_id}, {"_id": 0, "status": 1})
+            if current is None or current["status"] in (SENT, DRAFT):
+                return current or {}
+            raise CampaignBusy(f"Campaign {campaign_id} is being sent by another worker", delay=self.lease)
+
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(db, campaign))
+        try:
+            await self._send_all(db, campaign, transport)
+        finally:
+            heartbeat.cancel()
+
+        now = datetime.utcnow()
+        # None when the campaign was taken over or deleted meanwhile
+        return await db.newsletter_campaigns.find_one_and_update(
+            {"id": campaign_id, "lock_id": campaign["lock_id"]},
+            {"$set": {"status": SENT, "locked_until": None, "finished_at": now, "updated_at": now}},
+            projection={"_id": False},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _send_all(self, db: AsyncIOMotorDatabase, campaign: Dict[str, Any], transport: Mailer) -> None:
+        segments: List[str] = campaign.get("segments") or []
+        checkpoint = campaign.get("checkpoint") or {"segment": 0, "last_email": None}
+        bucket = TokenBucket(self.rate)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        for index in range(checkpoint["segment"], max(len(segments), 1)):
+            query = segment_query(segments, index)
+            last_email = checkpoint["last_email"] if index == checkpoint["segment"] else None
+            if last_email:
+                query["email"] = {"$gt": last_email}
+            subject, body = render_segment(campaign, segments[index] if segments else None)
+
+            cursor = db.newsletter_subscribers.find(query, {"_id": 0, "email": 1}).sort("email", 1).batch_size(self.batch_size)
+            batch: List[str] = []
+            async for subscriber in cursor:
+                batch.append(subscriber["email"])
+                if len(batch) >= self.batch_size:
+                    sent, errors = await self._send_batch(transport, bucket, semaphore, subject, body, batch)
+                    await self._checkpoint(db, campaign, index, batch[-1], sent, len(errors), errors)
+                    batch = []
+            sent, errors = await self._send_batch(transport, bucket, semaphore, subject, body, batch)
+            # Segment done: the next one starts from its beginning
+            await self._checkpoint(db, campaign, index + 1, None, sent, len(errors), errors)
+
+
+campaign_sender = CampaignSender()
+
+
+async def enqueue_campaign(campaign_id: str) -> str:
+    return await job_queue.enqueue("newsletter.campaign", {"campaign_id": campaign_id})
+
+
+@job_queue.handler("newsletter.campaign")
+async def run_campaign(payload: Dict[str, Any]) -> None:
+    result = await campaign_sender.run(job_queue.db, payload["campaign_id"]) or {}
+    logger.info("Campaign %s finished: %s sent, %s failed", payload["campaign_id"], result.get("sent"), result.get("failed"))
@@ -1,13 +1,30 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Request, Response
+from pymongo.errors import DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 # Assuming a get_db dependency for database connection, and get_current_active_user for auth
 # from ..dependencies import get_db, get_current_active_user, User # User for role checks
+from ..db_utils import update_and_fetch
+from ..bulk import (
+    BulkReport, bulk_delete, bulk_insert, bulk_update, read_items, split_delete_items, split_update_items,
+    validate_items
+)
+from ..cache import cached, response_cache
+from ..conditional import (
+    VALIDATOR_PROJECTION, has_validators, make_validators, revalidate, revalidate_one, validator_headers
+)
+from ..fastjson import trusted_response
 from ..models import Category, CategoryCreate, CategoryUpdate, UserRole, User # User and UserRole for permission checks
+from ..usage import current_counts, recount_renamed
+from ..loaders import fetch_by_ids, parse_ids
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+# Category plus its materialized usage count (see usage.py)
+class CategoryWithUsage(Category):
+    usage_count: int = 0
+
 # Placeholder for database dependency
 async def get_db_placeholder():
     pass
@@ -29,40 +46,140 @@ async def create_category(
     # Check if category with same name and type already exists
     existing_category = await db.categories.find_one({"name": category_data.name, "type": category_data.type})
     if existing_category:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Category 
-        {category_data.name}
-         already exists for type 
-        {category_data.type}
-        ")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Category '{category_data.name}' already exists for type '{category_data.type}'")
 
     new_category = Category(**category_data.dict())
-    await db.categories.insert_one(new_category.dict())
+    new_doc = new_category.dict()
+    # Prompts reference categories by name, so one may already be in use
+    counts = await current_counts(db, "category", new_doc["type"], [new_doc["name"]]) if new_doc["type"] == "prompt" else {}
+    new_doc["usage_count"] = counts.get(new_doc["name"], 0)
+    await db.categories.insert_one(new_doc)
+    await response_cache.invalidate("categories")
     return new_category
 
-@router.get("/", response_model=List[Category])
+@router.post("/bulk")
+async def bulk_create_categories(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to create categories")
+
+    # JSON array or NDJSON of CategoryCreate objects; (name, type) must be unique
+    valid, errors = validate_items(await read_items(request), CategoryCreate)
+    report = BulkReport(errors)
+    docs = [(index, {**Category(**item.dict()).dict(), "usage_count": 0}) for index, item in valid]
+    # Starting usage counts: one aggregation per type
+    for doc_type in {doc["type"] for _, doc in docs}:
+        names = [doc["name"] for _, doc in docs if doc["type"] == doc_type]
+        # Blog categories are referenced by id, and a new id has no posts yet
+        counts = await current_counts(db, "category", doc_type, names) if doc_type == "prompt" else {}
+        for _, doc in docs:
+            if doc["type"] == doc_type:
+                doc["usage_count"] = counts.get(doc["name"], 0)
+    await bulk_insert(
+        db.categories, docs, report,
+        unique_key=lambda doc: (doc["name"], doc["type"]),
+        unique_query=lambda docs: {"name": {"$in": list({doc["name"] for doc in docs})}},
+    )
+    await response_cache.invalidate("categories")
+    return report.to_dict()
+
+@router.patch("/bulk")
+async def bulk_update_categories(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update categories")
+
+    # Name collisions surface per item as errors from the unique (name, type) index
+    updates, report = split_update_items(await read_items(request), CategoryUpdate)
+    previous = await bulk_update(db.categories, updates, report, fields=["name", "type"])
+    renamed = [
+        {"id": doc_id, "type": fields.get("type", previous[doc_id].get("type")), "name": fields["name"]}
+        for _, doc_id, fields in updates
+        if doc_id in previous and "name" in fields and fields["name"] != previous[doc_id].get("name")
+    ]
+    await recount_renamed(db, "category", renamed)
+    await response_cache.invalidate("categories", "blog")
+    return report.to_dict()
+
+@router.post("/bulk/delete")
+async def bulk_delete_categories(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete categories")
+
+    report = BulkReport()
+    await bulk_delete(db.categories, split_delete_items(await read_items(request)), report)
+    await response_cache.invalidate("categories", "blog")
+    return report.to_dict()
+
+@router.get("/", response_model=List[CategoryWithUsage])
+@cached("categories:list", tags=["categories"])
 async def get_categories(
+    request: Request,
+    response: Response,
     type: Optional[str] = None, # Filter by 'blog' or 'prompt'
     limit: int = Query(50, ge=1, le=200),
     skip: int = Query(0, ge=0),
+    sort_by: Literal["popularity", "name"] = "popularity",
+    ids: Optional[str] = None,  # batch fetch, e.g. "id1,id2" (in that order, one $in query)
     db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
 ):
+    try:
+        id_list = parse_ids(ids) if ids else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if id_list and skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'ids' can't be combined with 'skip'")
+
     query = {}
     if type:
         query["type"] = type
     
-    cursor = db.categories.find(query).skip(skip).limit(limit)
-    categories = await cursor.to_list(limit)
-    return [Category(**cat) for cat in categories]
+    # Most used first, served by the (type, usage_count) index
+    sort = [("usage_count", -1), ("name", 1)] if sort_by == "popularity" else [("name", 1)]
+
+    def page(projection):
+        if id_list:
+            return fetch_by_ids(db.categories, id_list, projection, query)
+        return db.categories.find(query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
+
+    variant = str(request.url.query)
+    if has_validators(request):
+        not_modified = revalidate(request, await page(VALIDATOR_PROJECTION), variant)
+        if not_modified:
+            return not_modified
+
+    categories = await page(None)
+    return trusted_response(CategoryWithUsage, categories, validator_headers(*make_validators(categories, variant)))
+
+@router.get("/{category_id}", response_model=CategoryWithUsage)
+@cached("categories:item", tags=["categories"])
+async def get_category(
+    category_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
+):
+    not_modified = await revalidate_one(request, db.categories, {"id": category_id})
+    if not_modified:
+        return not_modified
 
-@router.get("/{category_id}", response_model=Category)
-async def get_category(category_id: str, db: AsyncIOMotorDatabase = Depends(get_db_placeholder)):
     category = await db.categories.find_one({"id": category_id})
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    return Category(**category)
+    return trusted_response(CategoryWithUsage, category, validator_headers(*make_validators([category])))
 
 @router.put("/{category_id}", response_model=Category)
 async def update_category(
@@ -82,38 +199,28 @@ async def update_category(
             detail="No fields to update"
         )
     
-    # Check for name collision if name is being updated
-    if "name" in update_data:
-        current_category = await db.categories.find_one({"id": category_id})
-        if current_category:
-            existing_category = await db.categories.find_one({"name": update_data["name"], "type": current_category["type"], "id": {"$ne": category_id}})
-            if existing_category:
-                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Category name 
-                 {update_data['name']}
-                  already exists for type 
-                 {current_category['type']}
-                 ")
-        else:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-
-
-    result = await db.categories.update_one(
-        {"id": category_id},
-        {"$set": update_data}
-    )
+    # Name collisions are caught by the unique (name, type) index, so the
+    # update is a single round trip with no existence/collision pre-checks
+    try:
+        outcome = await update_and_fetch(db.categories, {"id": category_id}, update_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Category name '{update_data['name']}' already exists for this type")
+
+    if not outcome.found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
 
-    if result.modified_count == 0:
-        existing_cat = await db.categories.find_one({"id": category_id})
-        if not existing_cat:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
+    # Prompt categories are referenced by name: re-point the count on rename
+    if "name" in update_data and outcome.document.get("type") == "prompt" and outcome.previous.get("name") != update_data["name"]:
+        counts = await current_counts(db, "category", outcome.document["type"], [update_data["name"]])
+        outcome.document["usage_count"] = counts.get(update_data["name"], 0)
+        await db.categories.update_one({"id": category_id}, {"$set": {"usage_count": outcome.document["usage_count"]}})
 
-    updated_category = await db.categories.find_one({"id": category_id})
-    if not updated_category:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found after update attempt")
-    return Category(**updated_category)
+    # Blog lists embed category names (expand=category)
+    await response_cache.invalidate("categories", "blog")
+    return Category(**outcome.document)
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(
@@ -140,5 +247,6 @@ async def delete_category(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+    await response_cache.invalidate("categories", "blog")
     return None
 
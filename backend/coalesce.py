@@ -0,0 +1,62 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Request coalescing ("single flight").
+# Concurrent calls with the same key share one execution of the underlying
+# coroutine. With a `ttl` its result is also replayed to repeats arriving
+# within that many seconds; the default of 0 only shares calls in flight, as
+# a replay can hide writes made since. Only successful results are kept; a
+# failure is raised to every waiter and the next call runs again. The state
+# is per process.
+
+
+class SingleFlight:
+    def __init__(self, ttl: float = 0.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._done: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.coalesced = 0
+
+    def _recent(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._done.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._done[key]
+            return None
+        return entry
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._recent(key)
+        if entry is not None:
+            self.coalesced += 1
+            return entry[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one cancelled waiter must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else waited on is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if self.ttl > 0:
+                self._done[key] = (time.monotonic() + self.ttl, result)
+                while len(self._done) > self.max_entries:
+                    self._done.popitem(last=False)
+            return result
+        finally:
+            del self._inflight[key]
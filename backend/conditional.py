@@ -0,0 +1,101 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Conditional GET support (ETag / Last-Modified -> 304).
+# Validators are derived from (id, updated_at) of the documents in a response
+# plus the counters that change without touching updated_at (likes/views are
+# $inc'ed by the counter flush, usage_count by usage.py), so they can be
+# computed from a tiny projection without loading bodies and a new count
+# always misses the ETag.
+# Last-Modified still follows updated_at only; If-None-Match wins when a
+# client sends both.
+
+COUNTER_FIELDS = ("likes", "views", "usage_count")
+VALIDATOR_FIELDS = ("id", "updated_at", *COUNTER_FIELDS)
+VALIDATOR_PROJECTION = {"_id": 0, **{field: 1 for field in VALIDATOR_FIELDS}}
+
+
+def make_validators(docs: Iterable[Dict[str, Any]], variant: str = "") -> Tuple[str, Optional[datetime]]:
+    digest = hashlib.blake2b(variant.encode(), digest_size=12)
+    last_modified = None
+    for doc in docs:
+        updated_at = doc.get("updated_at")
+        counters = ",".join(str(doc.get(field, 0)) for field in COUNTER_FIELDS)
+        digest.update(f"{doc.get('id')}@{updated_at.isoformat() if updated_at else ''}#{counters};".encode())
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Stored datetimes are naive UTC (datetime.utcnow)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def has_validators(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_fresh(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(_opaque(tag) == _opaque(etag) for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
+
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def revalidate(request: Request, docs: Iterable[Dict[str, Any]], variant: str = "") -> Optional[Response]:
+    etag, last_modified = make_validators(docs, variant)
+    if is_fresh(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    return None
+
+
+async def revalidate_one(
+    request: Request,
+    collection,
+    query: Dict[str, Any],
+    overlay: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> Optional[Response]:
+    # Cheap probe for single resources: only runs when the client sent validators.
+    # `overlay` applies what the full response would add (e.g. unflushed counters).
+    if not has_validators(request):
+        return None
+    probe = await collection.find_one(query, VALIDATOR_PROJECTION)
+    if probe is None:
+        return None
+    return revalidate(request, [overlay(probe) if overlay else probe])
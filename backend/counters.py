@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Write-behind counters.
+# Hot increments (prompt views/likes) are buffered in-process per document id
+# and flushed as a single unordered bulk_write of $inc operations, either on a
+# timer or once enough distinct documents are pending. Readers overlay the
+# pending deltas so responses stay consistent with what the client just did.
+
+
+class CounterAggregator:
+    def __init__(self, collection_name: str, key: str = "id", flush_interval: float = 1.0, max_pending: int = 500):
+        self.collection_name = collection_name
+        self.key = key
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def incr(self, doc_id: str, field: str, amount: int = 1) -> None:
+        self._pending[doc_id][field] += amount
+        if self._db is not None and len(self._pending) >= self.max_pending and not self._lock.locked():
+            if self._flush_task is None or self._flush_task.done():
+                # Keep a reference: the loop only holds tasks weakly
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def pending(self, doc_id: str) -> Dict[str, int]:
+        return dict(self._pending.get(doc_id, {}))
+
+    def apply_pending(self, doc: dict) -> dict:
+        # Overlay not-yet-flushed deltas onto a document read from Mongo
+        for field, amount in self.pending(doc[self.key]).items():
+            doc[field] = doc.get(field, 0) + amount
+        return doc
+
+    async def flush(self) -> int:
+        if self._db is None:
+            return 0
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            doc_ids = list(batch)
+            ops = [UpdateOne({self.key: doc_id}, {"$inc": dict(batch[doc_id])}) for doc_id in doc_ids]
+            try:
+                await self._db[self.collection_name].bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every op not listed in writeErrors was applied, so
+                # only the failed ones go back (anything more double counts)
+                failed = [doc_ids[error["index"]] for error in e.details.get("writeErrors", [])]
+                logger.warning("Counter flush for %s: %d of %d updates failed, retrying later",
+                               self.collection_name, len(failed), len(ops))
+                self._requeue(batch, failed)
+                return len(ops) - len(failed)
+            except PyMongoError as e:
+                # Nothing acknowledged; put the deltas back so the next flush retries them
+                logger.warning("Counter flush for %s failed, retrying later: %s", self.collection_name, e)
+                self._requeue(batch, doc_ids)
+                return 0
+            return len(ops)
+
+    def _requeue(self, batch: Dict[str, Dict[str, int]], doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            for field, amount in batch[doc_id].items():
+                self._pending[doc_id][field] += amount
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so cancelling on shutdown never drops an in-flight batch
+            await asyncio.shield(self.flush())
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+
+prompt_counters = CounterAggregator("prompts")
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+
+class UpdateOutcome(NamedTuple):
+    document: Optional[Dict[str, Any]]
+    changed: bool = False
+    previous: Optional[Dict[str, Any]] = None
+
+    @property
+    def found(self) -> bool:
+        return self.document is not None
+
+
+def touching_update(update_data: Dict[str, Any], now: datetime, touch: bool = True) -> List[Dict[str, Any]]:
+    # Pipeline $set of update_data, as literals; updated_at only moves when a
+    # field actually differs from its stored value
+    fields = {key: {"$literal": value} for key, value in update_data.items()}
+    if touch:
+        unchanged = {"$and": [{"$eq": [f"${key}", {"$literal": value}]} for key, value in update_data.items()]}
+        fields["updated_at"] = {"$cond": [unchanged, "$updated_at", now]}
+    return [{"$set": fields}]
+
+
+async def update_and_fetch(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any],
+    update_data: Dict[str, Any],
+    touch: bool = True,
+) -> UpdateOutcome:
+    # Single round trip: find_one_and_update applies the update atomically and
+    # hands back the pre-image, from which the post-image is derived locally.
+    # The pre-image is what tells "not found" (None) apart from "no change"
+    # (same values) without a follow-up find_one, and there is no window
+    # between the write and the read for another writer to slip into.
+    # updated_at only moves when a field actually differs: it is a pipeline
+    # update comparing the stored values, so a same-value PUT keeps the ETag.
+    now = datetime.utcnow()
+    before = await collection.find_one_and_update(
+        query,
+        touching_update(update_data, now, touch),
+        projection={"_id": False},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return UpdateOutcome(None)
+
+    changed = any(before.get(key) != value for key, value in update_data.items())
+    after = {**before, **update_data}
+    if touch and changed:
+        after["updated_at"] = now
+    return UpdateOutcome(after, changed, before)
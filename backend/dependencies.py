@@ -0,0 +1,18 @@
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# Request dependencies shared by the routers. The database handle is created
+# per worker process in server.py's startup hook and registered here, so the
+# route modules don't import server.py.
+
+_db: Optional[AsyncIOMotorDatabase] = None
+
+
+def set_db(db: Optional[AsyncIOMotorDatabase]) -> None:
+    global _db
+    _db = db
+
+
+async def get_db() -> AsyncIOMotorDatabase:
+    return _db
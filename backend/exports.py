@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Literal
+
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCursor
+
+# Streaming exports.
+# Rows are pulled from the Motor cursor one server batch at a time and written
+# straight to the response, so memory stays flat however big the collection is.
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return value
+
+
+async def ndjson_chunks(cursor: AsyncIOMotorCursor, rows_per_chunk: int) -> AsyncIterator[bytes]:
+    lines: List[str] = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=_json_default))
+        if len(lines) >= rows_per_chunk:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def csv_chunks(cursor: AsyncIOMotorCursor, columns: List[str], rows_per_chunk: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        rows += 1
+        if rows >= rows_per_chunk:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    collection,
+    query: Dict[str, Any],
+    columns: List[str],
+    format: ExportFormat,
+    filename: str,
+    batch_size: int = 1000,
+    sort: Any = None,
+) -> StreamingResponse:
+    projection = {"_id": 0, **{column: 1 for column in columns}}
+    cursor = collection.find(query, projection).batch_size(batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+
+    if format == "csv":
+        body = csv_chunks(cursor, columns, batch_size)
+    else:
+        body = ndjson_chunks(cursor, batch_size)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
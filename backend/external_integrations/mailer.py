@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Outgoing email. SES goes through boto3, whose calls block, so they run in a
+# thread; the stub only logs and keeps the last `keep` messages it was asked
+# to send, for local development and tests.
+
+
+class Mailer:
+    async def send(self, to: str, subject: str, body: str) -> None:
+        raise NotImplementedError
+
+
+class StubMailer(Mailer):
+    def __init__(self, keep: int = 100):
+        # Bounded: the stub is the default backend of long-running processes
+        self.sent: Deque[Dict[str, str]] = deque(maxlen=keep)
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        self.sent.append({"to": to, "subject": subject, "body": body})
+        logger.info("Email to %s: %s", to, subject)
+
+
+class SesMailer(Mailer):
+    def __init__(self, sender: str, region: Optional[str] = None):
+        import boto3
+        self.sender = sender
+        self.client = boto3.client("ses", region_name=region)
+
+    def _send(self, to: str, subject: str, body: str) -> None:
+        self.client.send_email(
+            Source=self.sender,
+            Destination={"ToAddresses": [to]},
+            Message={
+                "Subject": {"Data": subject, "Charset": "UTF-8"},
+                "Body": {"Text": {"Data": body, "Charset": "UTF-8"}},
+            },
+        )
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        await asyncio.to_thread(self._send, to, subject, body)
+
+
+def create_mailer(backend: str = "stub", sender: Optional[str] = None, region: Optional[str] = None) -> Mailer:
+    if backend == "ses":
+        if not sender:
+            raise ValueError("EMAIL_FROM is required for the ses backend")
+        return SesMailer(sender, region)
+    return StubMailer()
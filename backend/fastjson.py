@@ -0,0 +1,87 @@
+import functools
+import os
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+# Fast path for rendering documents read from our own collections.
+# The usual `return [Prompt(**doc) for doc in docs]` validates every document
+# into a model, then FastAPI validates it again against response_model and
+# runs jsonable_encoder over the result before json.dumps. Documents we wrote
+# ourselves have already been through the models, so trusted_response only
+# shapes them to the model's fields (filling defaults, dropping _id and
+# anything else not in the model) and hands them to orjson, which renders
+# datetimes, enums and UUIDs natively in the same ISO format pydantic uses.
+# Returning a Response also makes FastAPI skip its response_model pass; the
+# response_model on the route still documents the schema.
+#
+# FAST_JSON=false falls back to model validation for debugging.
+
+FAST_JSON = orjson is not None and os.environ.get("FAST_JSON", "true") == "true"
+
+Document = Mapping[str, Any]
+
+
+@functools.lru_cache(maxsize=None)
+def _fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any, Optional[Callable[[], Any]]], ...]:
+    # (name, default, default_factory) per field. Plain defaults are looked up
+    # once; factories (ids, timestamps) must run for every document that lacks
+    # the field, or they would all share the value from first use.
+    fields = []
+    for name, info in model.model_fields.items():
+        if info.is_required():
+            fields.append((name, None, None))
+        elif info.default_factory is not None:
+            fields.append((name, None, info.default_factory))
+        else:
+            fields.append((name, info.get_default(), None))
+    return tuple(fields)
+
+
+def shape(model: Type[BaseModel], doc: Document) -> Dict[str, Any]:
+    return {
+        name: doc[name] if name in doc else (factory() if factory else default)
+        for name, default, factory in _fields(model)
+    }
+
+
+def trusted_response(
+    model: Type[BaseModel],
+    docs: Union[Document, List[Document]],
+    headers: Optional[Dict[str, str]] = None,
+    status_code: int = 200,
+) -> JSONResponse:
+    if not FAST_JSON:
+        if isinstance(docs, list):
+            content = [model(**doc).model_dump(mode="json") for doc in docs]
+        else:
+            content = model(**docs).model_dump(mode="json")
+        return JSONResponse(content=content, headers=headers, status_code=status_code)
+
+    if isinstance(docs, list):
+        content = [shape(model, doc) for doc in docs]
+    else:
+        content = shape(model, docs)
+    return FastJSONResponse(content=content, headers=headers, status_code=status_code)
+
+
+def trusted_bundle(
+    sections: Mapping[str, Tuple[Type[BaseModel], List[Document]]],
+    headers: Optional[Dict[str, str]] = None,
+) -> JSONResponse:
+    # Several trusted lists rendered as one object, e.g. {"prompts": [...], "tags": [...]}
+    if not FAST_JSON:
+        content = {
+            name: [model(**doc).model_dump(mode="json") for doc in docs] for name, (model, docs) in sections.items()
+        }
+        return JSONResponse(content=content, headers=headers)
+    content = {name: [shape(model, doc) for doc in docs] for name, (model, docs) in sections.items()}
+    return FastJSONResponse(content=content, headers=headers)
@@ -0,0 +1,204 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from storage import index_keys
+
+logger = logging.getLogger(__name__)
+
+# Declarative list of the indexes the routers rely on. Each entry records the
+# queries it serves so the startup report doubles as documentation.
+# create_index is a no-op when an identical index already exists, so ensuring
+# them on every boot is safe.
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: Sequence[Tuple[str, int]]
+    unique: bool = False
+    serves: Tuple[str, ...] = ()
+    expire_after: Optional[int] = None  # TTL index: seconds past the indexed date
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+
+INDEX_SPECS: List[IndexSpec] = [
+    # prompts
+    IndexSpec("prompts", [("id", ASCENDING)], unique=True, serves=(
+        "prompts.find_one/update_one/delete_one({id})",
+    )),
+    IndexSpec("prompts", [("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_prompts sort_by=created_at (skip and cursor paging)",
+    )),
+    IndexSpec("prompts", [("likes", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_prompts sort_by=likes",
+    )),
+    IndexSpec("prompts", [("views", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_prompts sort_by=views",
+    )),
+    IndexSpec("prompts", [("title", ASCENDING), ("id", ASCENDING)], serves=(
+        "get_prompts sort_by=title",
+    )),
+    IndexSpec("prompts", [("category", ASCENDING), ("tags", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_prompts category=... [tag=...] sorted by created_at (cursor paging)",
+    )),
+    IndexSpec("prompts", [("tags", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_prompts tag=... sorted by created_at (cursor paging)",
+    )),
+    # blog_posts
+    IndexSpec("blog_posts", [("id", ASCENDING)], unique=True, serves=(
+        "blog_posts.find_one/update_one/delete_one({id})",
+    )),
+    IndexSpec("blog_posts", [("status", ASCENDING), ("published_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_blog_posts status=... sorted by published_at (cursor paging)",
+        "bundle home/blog latest published posts",
+    )),
+    IndexSpec("blog_posts", [("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_blog_posts sort_by=created_at (skip and cursor paging)",
+    )),
+    IndexSpec("blog_posts", [("category_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_blog_posts category_id=... (cursor paging)",
+    )),
+    IndexSpec("blog_posts", [("tags", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_blog_posts tag=... (cursor paging)",
+    )),
+    IndexSpec("blog_posts", [("author_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], serves=(
+        "get_blog_posts author_id=... (cursor paging)",
+    )),
+    # newsletter_subscribers
+    IndexSpec("newsletter_subscribers", [("email", ASCENDING)], unique=True, serves=(
+        "subscribe/unsubscribe find_one/update_one({email})",
+    )),
+    IndexSpec("newsletter_subscribers", [("is_active", ASCENDING)], serves=(
+        "get_subscribers active_only=true",
+    )),
+    IndexSpec("newsletter_subscribers", [("tags", ASCENDING), ("email", ASCENDING)], serves=(
+        "campaign fan-out: stream a tag segment in email order",
+    )),
+    # newsletter_campaigns
+    IndexSpec("newsletter_campaigns", [("id", ASCENDING)], unique=True, serves=(
+        "campaign claim/checkpoint/get({id})",
+    )),
+    # contact_submissions
+    IndexSpec("contact_submissions", [("id", ASCENDING)], unique=True, serves=(
+        "update_submission_status({id})",
+    )),
+    IndexSpec("contact_submissions", [("created_at", DESCENDING)], serves=(
+        "get_submissions sorted by created_at",
+    )),
+    IndexSpec("contact_submissions", [("status", ASCENDING), ("created_at", DESCENDING)], serves=(
+        "get_submissions status=... sorted by created_at",
+    )),
+    # categories
+    IndexSpec("categories", [("id", ASCENDING)], unique=True, serves=(
+        "categories.find_one/update_one/delete_one({id})",
+    )),
+    IndexSpec("categories", [("name", ASCENDING), ("type", ASCENDING)], unique=True, serves=(
+        "create_category/update_category name collision check",
+    )),
+    IndexSpec("categories", [("type", ASCENDING), ("usage_count", DESCENDING), ("name", ASCENDING)], serves=(
+        "get_categories type=... sorted by popularity",
+        "bundle prompts/blog popular categories",
+        "usage count $inc by (name, type)",
+    )),
+    # tags
+    IndexSpec("tags", [("id", ASCENDING)], unique=True, serves=(
+        "tags.find_one/update_one/delete_one({id})",
+    )),
+    IndexSpec("tags", [("name", ASCENDING), ("type", ASCENDING)], unique=True, serves=(
+        "create_tag/update_tag name collision check",
+    )),
+    IndexSpec("tags", [("type", ASCENDING), ("usage_count", DESCENDING), ("name", ASCENDING)], serves=(
+        "get_tags type=... sorted by popularity",
+        "bundle prompts/blog popular tags",
+        "usage count $inc by (name, type)",
+    )),
+    # jobs
+    IndexSpec("jobs", [("id", ASCENDING)], unique=True, serves=(
+        "job_queue finish/retry update_one({id})",
+    )),
+    IndexSpec("jobs", [("status", ASCENDING), ("run_at", ASCENDING)], serves=(
+        "job_queue claim: due queued jobs by run_at",
+    )),
+    IndexSpec("jobs", [("status", ASCENDING), ("locked_until", ASCENDING)], serves=(
+        "job_queue claim: running jobs with an expired lease",
+    )),
+    IndexSpec("jobs", [("expires_at", ASCENDING)], expire_after=0, serves=(
+        "TTL: removes done jobs once their retention runs out",
+    )),
+    # users
+    IndexSpec("users", [("id", ASCENDING)], unique=True, serves=(
+        "users.find_one/update_one/delete_one({id})",
+    )),
+    IndexSpec("users", [("username", ASCENDING)], unique=True, serves=(
+        "create_user/update_user username lookup",
+    )),
+    IndexSpec("users", [("email", ASCENDING)], unique=True, serves=(
+        "create_user/update_user email lookup",
+    )),
+]
+
+
+# Older specs that a current one extends (the keyset pages sort on (field, id)).
+# Every query they served is served by their replacement, so they are dropped
+# rather than maintained on every write.
+SUPERSEDED: Dict[str, List[str]] = {
+    "prompts": ["category_1_tags_1_created_at_-1", "tags_1_created_at_-1"],
+    "blog_posts": [
+        "status_1_published_at_-1", "category_id_1_created_at_-1", "tags_1_created_at_-1", "author_id_1_created_at_-1",
+    ],
+}
+
+
+async def drop_superseded(db: AsyncIOMotorDatabase, superseded: Dict[str, List[str]] = SUPERSEDED) -> List[str]:
+    dropped = []
+    for collection, names in superseded.items():
+        for name in names:
+            try:
+                await db[collection].drop_index(name)
+            except OperationFailure:
+                continue  # never created, or already gone
+            dropped.append(f"{collection}.{name}")
+            logger.info("Dropped superseded index %s.%s", collection, name)
+    return dropped
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, specs: List[IndexSpec] = INDEX_SPECS) -> List[Dict[str, Any]]:
+    report = []
+    for spec in specs:
+        # In ID_STORAGE=uuid mode `id` lives in _id: the id index is the
+        # primary one, and compound keys use _id instead
+        keys = index_keys(spec.collection, spec.keys)
+        if keys is None:
+            continue
+        spec = spec._replace(keys=keys)
+        entry = {
+            "collection": spec.collection,
+            "name": spec.name,
+            "keys": list(spec.keys),
+            "unique": spec.unique,
+            "serves": list(spec.serves),
+            "ok": True,
+        }
+        try:
+            options = {} if spec.expire_after is None else {"expireAfterSeconds": spec.expire_after}
+            await db[spec.collection].create_index(list(spec.keys), name=spec.name, unique=spec.unique, **options)
+        except OperationFailure as e:
+            # e.g. duplicates blocking a unique index; keep booting and report it
+            entry["ok"] = False
+            entry["error"] = str(e)
+            logger.warning("Could not create index %s.%s: %s", spec.collection, spec.name, e)
+        report.append(entry)
+
+    # Only once their replacements exist
+    await drop_superseded(db)
+
+    for entry in report:
+        if entry["ok"]:
+            logger.info("Index %s.%s serves: %s", entry["collection"], entry["name"], "; ".join(entry["serves"]))
+    return report
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Background job queue persisted in the `jobs` collection.
+# Request handlers only insert a job document and return; a small pool of
+# worker tasks per process claims due jobs with an atomic find_one_and_update,
+# so several uvicorn workers can share the collection safely. Failures are
+# retried with exponential backoff and jitter; after max_attempts a job is
+# parked as "dead" with its last error for inspection. A job whose worker
+# died mid-run is picked up again once its lease expires.
+#
+# Every claim writes a fresh lease_id, and a run only records its outcome
+# while the job still carries that lease: a runner whose lease expired and was
+# reclaimed elsewhere cannot overwrite the newer run's status. While a handler
+# runs, a heartbeat renews the lease every lease/3 seconds, so only a dead
+# worker's jobs are reclaimed however long they take. A handler that cannot
+# run yet raises RetryLater: the job is requeued without counting an attempt.
+# Finished jobs get an expires_at and are removed by the TTL index on it
+# (indexes.py) after `retention` seconds; dead jobs are kept.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class RetryLater(Exception):
+    def __init__(self, message: str = "", delay: float = 60.0):
+        super().__init__(message)
+        self.delay = delay
+
+
+class JobQueue:
+    def __init__(
+        self,
+        collection_name: str = "jobs",
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 600.0,
+        lease: float = 300.0,
+        poll_interval: float = 5.0,
+        retention: float = 7 * 24 * 3600.0,
+    ):
+        self.collection_name = collection_name
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._handlers: Dict[str, Handler] = {}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        def register(func: Handler) -> Handler:
+            self._handlers[kind] = func
+            return func
+        return register
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        return self._db
+
+    @property
+    def collection(self):
+        return self._db[self.collection_name]
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0) -> str:
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "run_at": now + timedelta(seconds=delay),
+            "locked_until": None,
+            "lease_id": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.collection.insert_one(job)
+        # Wake an idle worker in this process instead of waiting for the next poll
+        self._wakeup.set()
+        return job["id"]
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                {"status": RUNNING, "locked_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "locked_until": now + timedelta(seconds=self.lease),
+                    "lease_id": str(uuid.uuid4()),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            projection={"_id": False},
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _finish(self, job: Dict[str, Any], error: Optional[str] = None) -> bool:
+        now = datetime.utcnow()
+        if error is None:
+            expires_at = now + timedelta(seconds=self.retention)
+            update = {"status": DONE, "locked_until": None, "expires_at": expires_at, "updated_at": now}
+        elif job["attempts"] >= self.max_attempts or job["kind"] not in self._handlers:
+            logger.error("Job %s (%s) dead after %d attempts: %s", job["id"], job["kind"], job["attempts"], error)
+            update = {"status": DEAD, "locked_until": None, "last_error": error, "updated_at": now}
+        else:
+            retry_at = now + timedelta(seconds=self.backoff(job["attempts"]))
+            logger.warning("Job %s (%s) failed, retrying at %s: %s", job["id"], job["kind"], retry_at, error)
+            update = {"status": QUEUED, "run_at": retry_at, "locked_until": None, "last_error": error, "updated_at": now}
+        result = await self.collection.update_one({"id": job["id"], "lease_id": job["lease_id"]}, {"$set": update})
+        if not result.matched_count:
+            logger.warning("Job %s (%s) lost its lease while running; outcome not recorded", job["id"], job["kind"])
+            return False
+        return True
+
+    async def _postpone(self, job: Dict[str, Any], delay: float, reason: str) -> bool:
+        now = datetime.utcnow()
+        logger.info("Job %s (%s) postponed %.0fs: %s", job["id"], job["kind"], delay, reason)
+        update = {"status": QUEUED, "run_at": now + timedelta(seconds=delay), "locked_until": None, "updated_at": now}
+        result = await self.collection.update_one(
+            {"id": job["id"], "lease_id": job["lease_id"]},
+            # Not an attempt: the claim's increment is taken back
+            {"$set": update, "$inc": {"attempts": -1}},
+        )
+        return bool(result.matched_count)
+
+    async def _heartbeat(self, job: Dict[str, Any]) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            now = datetime.utcnow()
+            try:
+                result = await self.collection.update_one(
+                    {"id": job["id"], "lease_id": job["lease_id"], "status": RUNNING},
+                    {"$set": {"locked_until": now + timedelta(seconds=self.lease), "updated_at": now}},
+                )
+            except PyMongoError as e:
+                logger.warning("Job %s lease renewal failed: %s", job["id"], e)
+                continue
+            if not result.matched_count:
+                logger.warning("Job %s (%s) lost its lease while running", job["id"], job["kind"])
+                return
+
+    async def _call(self, job: Dict[str, Any]) -> None:
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            raise LookupError(f"No handler for job kind '{job['kind']}'")
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job))
+        try:
+            await handler(job["payload"])
+        finally:
+            heartbeat.cancel()
+
+    async def run_one(self) -> bool:
+        # Claim and run a single due job; False when there was nothing to do
+        job = await self._claim()
+        if job is None:
+            return False
+        try:
+            await self._call(job)
+        except RetryLater as e:
+            await self._postpone(job, e.delay, str(e))
+        except Exception as e:
+            await self._finish(job, f"{type(e).__name__}: {e}")
+        else:
+            await self._finish(job)
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                ran = await self.run_one()
+            except PyMongoError as e:
+                logger.warning("Job queue unavailable: %s", e)
+                ran = False
+            if not ran:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        self._db = db
+        if not self._workers:
+            loop = asyncio.get_running_loop()
+            self._workers = [loop.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        # Jobs interrupted here stay "running" and are reclaimed after their lease
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, DEAD: 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+
+job_queue = JobQueue()
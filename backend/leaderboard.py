@@ -0,0 +1,203 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from counters import prompt_counters
+from models import PromptSummary
+from projections import model_projection
+
+logger = logging.getLogger(__name__)
+
+# In-memory prompt leaderboards.
+# Top-K prompts by trending score, likes and views, overall and per category
+# and per tag, kept as small sorted lists so a ranking is served in O(K)
+# without touching Mongo. Fed by the view/like handlers; built from Mongo at
+# startup and optionally rebuilt on a timer to pick up other workers' counts.
+#
+# Trending uses forward decay: an event at time t adds weight * 2^((t - epoch) / half_life).
+# Every stored score is scaled by the same factor as time passes, so the
+# order never needs recomputing; the decayed value is only derived on read.
+# The epoch moves forward before the exponent can overflow.
+
+METRICS = ("trending", "likes", "views")
+TRENDING_WEIGHTS = {"views": 1.0, "likes": 5.0}
+RENORMALIZE_AFTER = 64  # half-lives
+
+Board = List[Tuple[float, str]]  # (-score, id), best first
+
+
+def _scopes(entry: Dict[str, Any]) -> List[str]:
+    scopes = ["all", f"category:{entry.get('category')}"]
+    scopes += [f"tag:{tag}" for tag in set(entry.get("tags") or [])]
+    return scopes
+
+
+class Leaderboard:
+    def __init__(self, size: int = 100, half_life: float = 86400.0, clock: Callable[[], float] = time.time):
+        self.size = size
+        self.half_life = half_life
+        self._clock = clock
+        self._epoch = clock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._boards: Dict[Tuple[str, str], Board] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- boards --------------------------------------------------------------
+
+    def _move(self, metric: str, scope: str, doc_id: str, old: Optional[float], new: float) -> None:
+        board = self._boards.setdefault((metric, scope), [])
+        if old is not None:
+            i = bisect.bisect_left(board, (-old, doc_id))
+            if i < len(board) and board[i][1] == doc_id:
+                del board[i]
+        item = (-new, doc_id)
+        # Scores only grow, so an entry that is not on a full board can only
+        # enter it by beating the current last place
+        if len(board) < self.size or item < board[-1]:
+            bisect.insort(board, item)
+            if len(board) > self.size:
+                board.pop()
+
+    def _refill(self, metric: str, scope: str) -> None:
+        members = ((-e[metric], doc_id) for doc_id, e in self._entries.items() if scope in _scopes(e))
+        self._boards[(metric, scope)] = heapq.nsmallest(self.size, members)
+
+    def _rebuild_boards(self) -> None:
+        grouped: Dict[Tuple[str, str], Board] = defaultdict(list)
+        for doc_id, entry in self._entries.items():
+            for scope in _scopes(entry):
+                for metric in METRICS:
+                    grouped[(metric, scope)].append((-entry[metric], doc_id))
+        self._boards = {key: heapq.nsmallest(self.size, items) for key, items in grouped.items()}
+
+    def _boost(self) -> float:
+        # Weight of an event happening now, relative to the epoch
+        elapsed = (self._clock() - self._epoch) / self.half_life
+        if elapsed > RENORMALIZE_AFTER:
+            factor = 2.0 ** -elapsed
+            for entry in self._entries.values():
+                entry["trending"] *= factor
+            for (metric, scope), board in self._boards.items():
+                if metric == "trending":
+                    self._boards[(metric, scope)] = [(score * factor, doc_id) for score, doc_id in board]
+            self._epoch = self._clock()
+            elapsed = 0.0
+        return 2.0 ** elapsed
+
+    # -- maintenance ---------------------------------------------------------
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        # New prompt, or metadata change of a known one (counts are kept)
+        old = self._entries.get(doc["id"])
+        entry = {field: doc.get(field) for field in PromptSummary.model_fields}
+        entry["likes"] = doc.get("likes") or 0
+        entry["views"] = doc.get("views") or 0
+        entry["trending"] = 0.0
+        if old is not None:
+            entry.update({metric: old[metric] for metric in METRICS})
+            if _scopes(old) == _scopes(entry):
+                self._entries[doc["id"]] = entry
+                return
+            self.remove(doc["id"])
+
+        self._entries[doc["id"]] = entry
+        for scope in _scopes(entry):
+            for metric in METRICS:
+                self._move(metric, scope, doc["id"], None, entry[metric])
+
+    def remove(self, doc_id: str) -> None:
+        entry = self._entries.pop(doc_id, None)
+        if entry is None:
+            return
+        for scope in _scopes(entry):
+            for metric in METRICS:
+                board = self._boards.get((metric, scope), [])
+                i = bisect.bisect_left(board, (-entry[metric], doc_id))
+                if i < len(board) and board[i][1] == doc_id:
+                    # A full board may have evicted the prompt that now moves up
+                    if len(board) >= self.size:
+                        self._refill(metric, scope)
+                    else:
+                        del board[i]
+
+    def record(self, doc_id: str, field: str, amount: int = 1) -> None:
+        entry = self._entries.get(doc_id)
+        if entry is None:
+            # Created on another worker; the next rebuild picks it up
+            return
+        weight = TRENDING_WEIGHTS[field] * amount * self._boost()
+        old = {metric: entry[metric] for metric in (field, "trending")}
+        entry[field] += amount
+        entry["trending"] += weight
+        for scope in _scopes(entry):
+            for metric, old_score in old.items():
+                self._move(metric, scope, doc_id, old_score, entry[metric])
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        # Counts come from Mongo plus the not-yet-flushed deltas; trending
+        # scores only live in memory and carry over from the current board
+        docs = [doc async for doc in db.prompts.find({}, model_projection(PromptSummary))]
+        fresh = {}
+        for doc in docs:
+            prompt_counters.apply_pending(doc)
+            entry = {field: doc.get(field) for field in PromptSummary.model_fields}
+            entry["likes"] = entry["likes"] or 0
+            entry["views"] = entry["views"] or 0
+            previous = self._entries.get(doc["id"])
+            entry["trending"] = previous["trending"] if previous else 0.0
+            fresh[doc["id"]] = entry
+        self._entries = fresh
+        self._rebuild_boards()
+        logger.info("Leaderboard built: %d prompts, %d boards", len(self._entries), len(self._boards))
+
+    async def _refresh(self, db: AsyncIOMotorDatabase, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.build(db)
+            except Exception as e:
+                logger.warning("Leaderboard refresh failed: %s", e)
+
+    def start_refresh(self, db: AsyncIOMotorDatabase, interval: float) -> None:
+        if interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh(db, interval))
+
+    async def stop_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    # -- querying ------------------------------------------------------------
+
+    def top(self, metric: str, category: Optional[str] = None, tag: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        if tag:
+            scope = f"tag:{tag}"
+        elif category:
+            scope = f"category:{category}"
+        else:
+            scope = "all"
+        decay = 2.0 ** -((self._clock() - self._epoch) / self.half_life)
+
+        ranked = []
+        for score, doc_id in self._boards.get((metric, scope), [])[:limit]:
+            entry = dict(self._entries[doc_id])
+            entry.pop("trending")
+            entry["score"] = -score * decay if metric == "trending" else -score
+            ranked.append(entry)
+        return ranked
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# Batch reads by id.
+#
+# `?ids=a,b,c` on the list endpoints fetches those documents with a single
+# $in query, in the order asked for (unknown ids are left out), instead of one
+# GET /{id} and one find_one per document.
+#
+# Loader is the in-process counterpart for resolving references while a
+# response is being built (e.g. category_id -> category name on blog posts):
+# every load() issued in the same event loop turn is collected and answered by
+# one $in query, and keys are deduplicated and remembered for the rest of the
+# request. Loaders are request scoped (request_loader) so nothing outlives the
+# request it was read for.
+
+MAX_BATCH_IDS = 100
+
+
+def parse_ids(ids: str, limit: int = MAX_BATCH_IDS) -> List[str]:
+    # Comma separated, order kept, duplicates dropped
+    parsed = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not parsed:
+        raise ValueError("No ids given")
+    if len(parsed) > limit:
+        raise ValueError(f"At most {limit} ids per request")
+    return parsed
+
+
+async def fetch_by_ids(
+    collection,
+    ids: List[str],
+    projection: Optional[Dict[str, Any]] = None,
+    query: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    docs = await collection.find({**(query or {}), "id": {"$in": ids}}, projection).to_list(len(ids))
+    by_id = {doc["id"]: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+
+class Loader:
+    def __init__(self, collection, key: str = "id", projection: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.key = key
+        if projection and any(v for k, v in projection.items() if k != "_id"):
+            projection = {**projection, key: 1}
+        self.projection = projection
+        self._results: Dict[Any, asyncio.Future] = {}
+        self._pending: List[Any] = []
+        # Running dispatches; the loop itself only keeps weak references
+        self._dispatches: Set[asyncio.Task] = set()
+        self.queries = 0
+
+    def load(self, key: Any) -> "asyncio.Future[Optional[Dict[str, Any]]]":
+        loop = asyncio.get_running_loop()
+        if key is None:
+            # Unset reference
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+        if key not in self._results:
+            self._results[key] = loop.create_future()
+            if not self._pending:
+                # First key of this turn: dispatch once the current tasks have queued theirs
+                loop.call_soon(self._start_dispatch)
+            self._pending.append(key)
+        return self._results[key]
+
+    async def load_many(self, keys: Iterable[Any]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _start_dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._dispatch(keys))
+        self._dispatches.add(task)
+        task.add_done_callback(functools.partial(self._dispatched, keys))
+
+    async def _dispatch(self, keys: List[Any]) -> None:
+        self.queries += 1
+        docs = await self.collection.find({self.key: {"$in": keys}}, self.projection).to_list(None)
+        found = {doc.get(self.key): doc for doc in docs}
+        for key in keys:
+            future = self._results[key]
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def _dispatched(self, keys: List[Any], task: asyncio.Task) -> None:
+        # Hand a failed (or cancelled) dispatch to the waiting loads and forget
+        # those keys so a later load asks again; the error is retrieved here
+        # even if nobody is waiting any more
+        self._dispatches.discard(task)
+        cancelled = task.cancelled()
+        error = None if cancelled else task.exception()
+        if not cancelled and error is None:
+            return
+        if error is not None:
+            logger.warning("%s lookup by %s failed: %r", self.collection.name, self.key, error)
+        for key in keys:
+            future = self._results.pop(key, None)
+            if future is None or future.done():
+                continue
+            if cancelled:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+
+def request_loader(request: Request, collection, key: str = "id", projection: Optional[Dict[str, Any]] = None) -> Loader:
+    loaders = getattr(request.state, "loaders", None)
+    if loaders is None:
+        loaders = request.state.loaders = {}
+    cache_key = (collection.name, key, tuple(sorted((projection or {}).items())))
+    if cache_key not in loaders:
+        loaders[cache_key] = Loader(collection, key, projection)
+    return loaders[cache_key]
+
+
+CATEGORY_NAME_PROJECTION = {"_id": 0, "id": 1, "name": 1}
+
+
+async def embed_category_names(request: Request, categories, posts: List[Dict[str, Any]]) -> None:
+    # Blog posts reference categories by id; one batched lookup for the page
+    loader = request_loader(request, categories, projection=CATEGORY_NAME_PROJECTION)
+    found = await loader.load_many(post.get("category_id") for post in posts)
+    for post, category in zip(posts, found):
+        post["category_name"] = category.get("name") if category else None
@@ -0,0 +1,166 @@
+import os
+import time
+from typing import Any, Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+from cache import response_cache
+
+# Prometheus metrics: per-route latency/size histograms and in-flight requests
+# from an ASGI middleware, Mongo command durations and connection pool state
+# from pymongo listeners, and response cache counters. With several uvicorn
+# workers set PROMETHEUS_MULTIPROC_DIR so a scrape aggregates all of them.
+
+REGISTRY = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], registry=REGISTRY,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size",
+    ["method", "route"], registry=REGISTRY,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served",
+    registry=REGISTRY, multiprocess_mode="livesum",
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round-trip time",
+    ["command", "outcome"], registry=REGISTRY,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MONGO_POOL_OPEN = Gauge(
+    "mongo_pool_connections_open", "Open connections in the pool",
+    ["address"], registry=REGISTRY, multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_connections_checked_out", "Connections currently checked out",
+    ["address"], registry=REGISTRY, multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures", "Failed connection checkouts (e.g. wait queue timeouts)",
+    ["address", "reason"], registry=REGISTRY,
+)
+
+
+class CacheCollector:
+    # Reads the response cache counters at scrape time
+    def collect(self):
+        stats = response_cache.stats()
+        for name in ("hits", "misses", "evictions", "invalidations"):
+            family = CounterMetricFamily(f"response_cache_{name}", f"Response cache {name}")
+            family.add_metric([], stats[name])
+            yield family
+        if stats["entries"] is not None:
+            family = GaugeMetricFamily("response_cache_entries", "Entries in the in-process response cache")
+            family.add_metric([], stats["entries"])
+            yield family
+
+
+REGISTRY.register(CacheCollector())
+
+
+def _address(event: Any) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).set(0)
+
+    def pool_closed(self, event):
+        MONGO_POOL_OPEN.labels(_address(event)).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_OPEN.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_OPEN.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(_address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(_address(event)).dec()
+
+
+def mongo_event_listeners() -> list:
+    return [CommandMetrics(), PoolMetrics()]
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware overhead on the hot path)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state: Dict[str, Any] = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            # The router records the matched route in the scope; use its template
+            # rather than the raw path to keep label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path_format", None) or getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, path, str(state["status"])).observe(time.perf_counter() - start)
+            RESPONSE_SIZE.labels(method, path).observe(state["size"])
+
+
+def render_metrics():
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CacheCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
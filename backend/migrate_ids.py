@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Dict, Iterator, List
+
+import bson
+from bson.binary import Binary, UuidRepresentation
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from storage import ID_COLLECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Online, resumable migration to ID_STORAGE=uuid (see storage.py).
+#
+# Documents still keyed by an ObjectId are rewritten in batches with their
+# application id as a binary UUID _id. Each batch is first staged in
+# `<collection>_id_migration`, then the originals are deleted and the new
+# documents inserted, then the stage is cleared. An original is only deleted
+# if it still matches its staged copy field for field; one written to since
+# is staged again from its current state (up to RESTAGE_ATTEMPTS times, after
+# that it is left for the next run). An interrupted run therefore never loses
+# a document or an update, and the next run finishes the staged batch before
+# continuing. The converted documents keep their `id` field, so an app still
+# running in field mode keeps serving them.
+#
+# Rollout:
+#   1. python migrate_ids.py                 (app still in field mode; rerun at will)
+#   2. restart the app with ID_STORAGE=uuid
+#   3. python migrate_ids.py --cleanup       (converts documents created during
+#      the rollout, drops the leftover `id` fields and the `id` index)
+#
+# The unique `id` index is swapped for a plain one up front: documents written
+# in uuid mode carry no `id` field and would all collide on null. Field-mode
+# lookups stay indexed; the ids are server generated uuid4s either way.
+#
+# A write that lands between a batch's delete and insert still finds no
+# document (404 / lost counter increment); keep batches small on busy
+# collections.
+
+STAGE_SUFFIX = "_id_migration"
+RESTAGE_ATTEMPTS = 3
+# The compare-and-delete filters embed whole documents; split them well under
+# the 16 MB command limit
+MAX_FILTER_BYTES = 8 * 1024 * 1024
+
+
+def _convert(doc: Dict[str, Any]) -> Dict[str, Any]:
+    converted = dict(doc)
+    converted["_id"] = Binary.from_uuid(uuid.UUID(doc["id"]), UuidRepresentation.STANDARD)
+    return converted
+
+
+async def _insert_ignoring_duplicates(collection, docs: List[Dict[str, Any]]) -> int:
+    if not docs:
+        return 0
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        # Already there from an interrupted run
+        fatal = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+        if fatal:
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def _unchanged(staged: Dict[str, Any]) -> Dict[str, Any]:
+    # The original of a staged document, as long as nobody has written to it:
+    # every field equal and no field added
+    fields = {key: value for key, value in staged.items() if key != "_id"}
+    return {
+        **fields,
+        "_id": {"$type": "objectId"},
+        "$expr": {"$eq": [{"$size": {"$objectToArray": "$$ROOT"}}, len(staged)]},
+    }
+
+
+def _chunks(filters: List[Dict[str, Any]], max_bytes: int = MAX_FILTER_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    size = 0
+    for query in filters:
+        n = len(bson.encode(query))
+        if chunk and size + n > max_bytes:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(query)
+        size += n
+    if chunk:
+        yield chunk
+
+
+async def _apply_stage(db: AsyncIOMotorDatabase, name: str) -> int:
+    # Finish a staged batch: unchanged originals out, converted documents in,
+    # stage cleared. Changed originals are staged again and retried.
+    collection, stage = db[name], db[name + STAGE_SUFFIX]
+    applied = 0
+    for _ in range(RESTAGE_ATTEMPTS):
+        staged = await stage.find({}).to_list(None)
+        if not staged:
+            break
+        for chunk in _chunks([_unchanged(doc) for doc in staged]):
+            await collection.delete_many({"$or": chunk})
+        # Whatever is still there was written to after staging
+        changed = await collection.find(
+            {"id": {"$in": [doc["id"] for doc in staged]}, "_id": {"$type": "objectId"}}
+        ).to_list(None)
+        changed_ids = {doc["id"] for doc in changed}
+        done = [doc for doc in staged if doc["id"] not in changed_ids]
+        await _insert_ignoring_duplicates(collection, done)
+        await stage.delete_many({"_id": {"$in": [doc["_id"] for doc in done]}})
+        for doc in changed:
+            restaged = _convert(doc)
+            await stage.replace_one({"_id": restaged["_id"]}, restaged, upsert=True)
+        applied += len(done)
+    else:
+        left = await stage.count_documents({})
+        if left:
+            # Still being written to; the originals stay and the next run picks them up
+            logger.warning("%s: %d documents kept changing, left for the next run", name, left)
+            await stage.delete_many({})
+    return applied
+
+
+async def _relax_id_index(collection) -> None:
+    indexes = await collection.index_information()
+    if indexes.get("id_1", {}).get("unique"):
+        await collection.drop_index("id_1")
+        await collection.create_index([("id", 1)], name="id_1")
+
+
+async def migrate_collection(db: AsyncIOMotorDatabase, name: str, batch_size: int = 500) -> Dict[str, int]:
+    collection = db[name]
+    await _relax_id_index(collection)
+    report = {"migrated": await _apply_stage(db, name), "skipped": 0}
+    last_seen = None
+    while True:
+        query: Dict[str, Any] = {"_id": {"$type": "objectId"}}
+        if last_seen is not None:
+            query["_id"]["$gt"] = last_seen
+        batch = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_seen = batch[-1]["_id"]
+
+        converted = []
+        for doc in batch:
+            try:
+                converted.append(_convert(doc))
+            except (KeyError, TypeError, ValueError):
+                # No usable application id; left as it is
+                logger.warning("%s: document %s has no valid uuid id, skipped", name, doc["_id"])
+                report["skipped"] += 1
+        if not converted:
+            continue
+
+        await _insert_ignoring_duplicates(db[name + STAGE_SUFFIX], converted)
+        report["migrated"] += await _apply_stage(db, name)
+        logger.info("%s: %d migrated", name, report["migrated"])
+
+    await db[name + STAGE_SUFFIX].drop()
+    return report
+
+
+async def cleanup_collection(db: AsyncIOMotorDatabase, name: str) -> Dict[str, int]:
+    result = await db[name].update_many({"_id": {"$type": "binData"}, "id": {"$exists": True}}, {"$unset": {"id": ""}})
+    try:
+        await db[name].drop_index("id_1")
+    except OperationFailure:
+        pass  # already gone
+    return {"unset": result.modified_count}
+
+
+async def migrate(db: AsyncIOMotorDatabase, collections=ID_COLLECTIONS, batch_size: int = 500, cleanup: bool = False) -> Dict[str, Any]:
+    report = {}
+    for name in sorted(collections):
+        report[name] = await migrate_collection(db, name, batch_size)
+        if cleanup:
+            report[name].update(await cleanup_collection(db, name))
+    return report
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Move application ids into binary UUID _ids")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--collections", help="comma separated subset of: " + ", ".join(sorted(ID_COLLECTIONS)))
+    parser.add_argument("--cleanup", action="store_true", help="after switching to ID_STORAGE=uuid: drop `id` fields and index")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(Path(__file__).parent / '.env')
+    collections = args.collections.split(",") if args.collections else ID_COLLECTIONS
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        report = await migrate(client[os.environ['DB_NAME']], collections, args.batch_size, args.cleanup)
+        print(f"Id migration: {report}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,15 @@ class DBModelBase(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Status check models (the legacy /api/status routes)
+class StatusCheck(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class StatusCheckCreate(BaseModel):
+    client_name: str
+
 # Newsletter subscriber models
 class NewsletterSubscriber(DBModelBase):
     email: EmailStr
@@ -18,6 +27,23 @@ class NewsletterSubscriber(DBModelBase):
 class NewsletterSubscriberCreate(BaseModel):
     email: EmailStr
 
+# Newsletter campaign models
+class Campaign(DBModelBase):
+    subject: str
+    body: str  # string.Template: $segment, $email, $unsubscribe_url
+    segments: List[str] = []  # subscriber tags; empty = every active subscriber
+    status: str = "draft"  # draft, queued, sending, sent
+    sent: int = 0
+    failed: int = 0
+    errors: List[str] = []
+    checkpoint: Optional[dict] = None
+    finished_at: Optional[datetime] = None
+
+class CampaignCreate(BaseModel):
+    subject: str
+    body: str
+    segments: List[str] = []
+
 # Contact form models
 class ContactSubmission(DBModelBase):
     name: str
@@ -54,4 +80,68 @@ class PromptUpdate(BaseModel):
     description: Optional[str] = None
     prompt_text: Optional[str] = None
     category: Optional[str] = None
-    tags: Optional[List[str]] = None
\ No newline at end of file
+    tags: Optional[List[str]] = None
+
+# Lightweight list-view models: everything a card needs, none of the body text
+class PromptSummary(BaseModel):
+    id: str
+    title: str
+    description: str
+    category: str
+    tags: List[str] = []
+    likes: int = 0
+    views: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+class RankedPrompt(PromptSummary):
+    score: float  # decayed trending score, or the likes/views count
+
+class BlogPostSummary(BaseModel):
+    id: str
+    title: str
+    slug: Optional[str] = None
+    excerpt: Optional[str] = None
+    category_id: Optional[str] = None
+    tags: List[str] = []
+    author_id: Optional[str] = None
+    status: Optional[str] = None
+    read_time_minutes: Optional[int] = None
+    published_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+class TocEntry(BaseModel):
+    level: int
+    id: str  # anchor of the heading in content_html
+    title: str
+
+class ExpandedBlogPostSummary(BlogPostSummary):
+    category_name: Optional[str] = None  # resolved from category_id
+
+class TaxonomySummary(BaseModel):
+    # Category or tag as listed in bundles
+    id: str
+    name: str
+    type: Optional[str] = None
+    usage_count: int = 0
+    updated_at: Optional[datetime] = None
+
+# Page bundles: everything a page needs in one response (routes/bundles.py)
+class HomeBundle(BaseModel):
+    latest_posts: List[ExpandedBlogPostSummary] = []
+    top_prompts: List[RankedPrompt] = []
+    trending_prompts: List[RankedPrompt] = []
+    categories: List[TaxonomySummary] = []
+    tags: List[TaxonomySummary] = []
+
+class PromptsBundle(BaseModel):
+    prompts: List[PromptSummary] = []
+    trending_prompts: List[RankedPrompt] = []
+    categories: List[TaxonomySummary] = []
+    tags: List[TaxonomySummary] = []
+
+class BlogBundle(BaseModel):
+    posts: List[ExpandedBlogPostSummary] = []
+    categories: List[TaxonomySummary] = []
+    tags: List[TaxonomySummary] = []
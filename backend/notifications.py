@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+
+from external_integrations.mailer import Mailer, StubMailer, create_mailer
+from jobs import job_queue
+
+# Notification emails, sent from the job queue so SMTP/SES latency never sits
+# on the request path. Handlers enqueue with the helpers below and return.
+
+mailer: Mailer = StubMailer()
+contact_recipient: Optional[str] = None
+
+
+def configure_notifications(backend: str = "stub", sender: Optional[str] = None, region: Optional[str] = None,
+                            recipient: Optional[str] = None) -> None:
+    global mailer, contact_recipient
+    mailer = create_mailer(backend, sender, region)
+    contact_recipient = recipient
+
+
+async def enqueue_contact_notification(submission: Dict[str, Any]) -> str:
+    return await job_queue.enqueue("contact.notify", {
+        field: submission.get(field) for field in ("id", "name", "email", "subject", "message")
+    })
+
+
+async def enqueue_welcome_email(email: str) -> str:
+    return await job_queue.enqueue("newsletter.welcome", {"email": email})
+
+
+@job_queue.handler("contact.notify")
+async def send_contact_notification(payload: Dict[str, Any]) -> None:
+    if not contact_recipient:
+        return
+    subject = f"New contact submission: {payload.get('subject') or '(no subject)'}"
+    body = f"From: {payload['name']} <{payload['email']}>\n\n{payload['message']}\n\nSubmission id: {payload['id']}"
+    await mailer.send(contact_recipient, subject, body)
+
+
+@job_queue.handler("newsletter.welcome")
+async def send_welcome_email(payload: Dict[str, Any]) -> None:
+    await mailer.send(
+        payload["email"],
+        "Welcome to the newsletter",
+        "Thanks for subscribing! You can unsubscribe at any time from the link in every issue.",
+    )
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Keyset (cursor) pagination helpers.
+# A cursor is an opaque url-safe token holding the sort key and value of the
+# last document of a page plus its id as a tie-breaker. The next page is then
+# fetched with a range predicate on (sort_by, id) instead of skip(), so Mongo
+# can seek straight into the index no matter how deep the page is.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort_by: str, sort_order: int, doc: Dict[str, Any]) -> str:
+    payload = {
+        "k": sort_by,
+        "o": sort_order,
+        "v": _encode_value(doc.get(sort_by)),
+        "id": doc["id"],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort_by: str, sort_order: int) -> Tuple[Any, str]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = _decode_value(payload["v"]), payload["id"]
+        key, order = payload["k"], payload["o"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed pagination cursor")
+
+    if key != sort_by or order != sort_order:
+        raise InvalidCursor("Pagination cursor does not match the requested sort")
+    return value, last_id
+
+
+def keyset_filter(sort_by: str, sort_order: int, value: Any, last_id: str) -> Dict[str, Any]:
+    # Everything strictly "after" (value, id) in the (sort_by, id) ordering
+    op = "$lt" if sort_order < 0 else "$gt"
+    if value is None:
+        # Nulls sort first ascending / last descending
+        tail = {sort_by: None, "id": {op: last_id}}
+        if sort_order < 0:
+            return tail
+        return {"$or": [{sort_by: {"$ne": None}}, tail]}
+    return {
+        "$or": [
+            {sort_by: {op: value}},
+            {sort_by: value, "id": {op: last_id}},
+        ]
+    }
+
+
+def keyset_sort(sort_by: str, sort_order: int) -> List[Tuple[str, int]]:
+    return [(sort_by, sort_order), ("id", sort_order)]
+
+
+def next_cursor(sort_by: str, sort_order: int, page: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    if len(page) < limit:
+        return None
+    return encode_cursor(sort_by, sort_order, page[-1])
@@ -0,0 +1,41 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from fastjson import FAST_JSON, FastJSONResponse
+
+# Projection helpers for list endpoints.
+# `view=summary` projects just the fields of a *Summary model, `fields=a,b`
+# projects an arbitrary sparse fieldset (id is always included). Both keep
+# Mongo from shipping, and Pydantic from validating, the heavy body fields.
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    return fields_projection(model.model_fields.keys())
+
+
+def fields_projection(field_names: Iterable[str]) -> Dict[str, int]:
+    projection = {"_id": 0, "id": 1}
+    for name in field_names:
+        projection[name] = 1
+    return projection
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def list_response(items: List[Any], headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    # Summary models / sparse dicts don't match the endpoint's full response_model,
+    # so they are rendered directly
+    if FAST_JSON:
+        return FastJSONResponse(content=items, headers=headers)
+    return JSONResponse(content=jsonable_encoder(items), headers=headers)
@@ -0,0 +1,210 @@
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rate limiting for the public write endpoints.
+# Sliding-window counters: each key keeps the hit count of the current and the
+# previous fixed window, and the previous one is weighted by how much of it
+# still overlaps the sliding window. That is two integers per key instead of
+# a log of timestamps, and maps onto Redis INCR/EXPIRE directly. Limits apply
+# per client IP and, where the body carries one, per email address.
+# The in-process backend is the default; the Redis one shares the counters
+# between workers. The in-process store holds at most max_keys keys and drops
+# the least recently hit one beyond that, so a spray of distinct IPs or emails
+# costs O(1) per request and bounded memory (at worst it resets the counters
+# of long idle keys).
+
+
+class RateLimitRule(NamedTuple):
+    method: str
+    path: "re.Pattern[str]"
+    limit: int
+    window: float  # seconds
+    by: str  # "ip" or "email"
+
+
+def rule(method: str, path: str, limit: int, window: float, by: str = "ip") -> RateLimitRule:
+    return RateLimitRule(method, re.compile(path), limit, window, by)
+
+
+# Per-email rules parse the JSON body; anything larger isn't a subscribe or
+# contact form and is refused before reading further
+MAX_BODY_BYTES = 16 * 1024
+
+DEFAULT_RULES: List[RateLimitRule] = [
+    rule("POST", r"^/api/newsletter/subscribe$", 10, 60),
+    rule("POST", r"^/api/newsletter/subscribe$", 3, 600, by="email"),
+    rule("POST", r"^/api/contact/submit$", 5, 60),
+    rule("POST", r"^/api/contact/submit$", 3, 600, by="email"),
+    rule("POST", r"^/api/prompts/[^/]+/like$", 30, 60),
+]
+
+
+class RateLimitBackend:
+    async def hit(self, key: str, window: float) -> float:
+        # Records a hit and returns the weighted count over the sliding window
+        raise NotImplementedError
+
+
+def _windows(window: float) -> Tuple[int, float]:
+    now = time.time()
+    current = int(now // window)
+    elapsed = (now - current * window) / window
+    return current, 1.0 - elapsed  # weight of the previous window
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (index, current, previous), least recently hit first
+        self._counts: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+
+    async def hit(self, key: str, window: float) -> float:
+        index, weight = _windows(window)
+        start, current, previous = self._counts.get(key, (index, 0, 0))
+        if start != index:
+            previous = current if start == index - 1 else 0
+            current = 0
+        current += 1
+        self._counts[key] = (index, current, previous)
+        self._counts.move_to_end(key)
+        while len(self._counts) > self.max_keys:
+            self._counts.popitem(last=False)
+        return current + previous * weight
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._redis = aioredis.Redis.from_url(url)
+        self.prefix = prefix
+
+    async def hit(self, key: str, window: float) -> float:
+        index, weight = _windows(window)
+        current_key = f"{self.prefix}{key}:{index}"
+        pipe = self._redis.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(math.ceil(window * 2)))
+        pipe.get(f"{self.prefix}{key}:{index - 1}")
+        current, _, previous = await pipe.execute()
+        return current + int(previous or 0) * weight
+
+
+def _client_ip(scope: Dict[str, Any], trust_forwarded: bool) -> str:
+    # Behind the bundled nginx the peer is already the client: nginx overwrites
+    # X-Forwarded-For with its $remote_addr and uvicorn's proxy headers handling
+    # resolves it. trust_forwarded is for other proxy setups; only the entry the
+    # nearest proxy appended counts, anything left of it is client supplied.
+    if trust_forwarded:
+        hops = [
+            hop.strip()
+            for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",")
+        ]
+        if hops and hops[-1]:
+            return hops[-1]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _email(body: bytes) -> Optional[str]:
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    email = payload.get("email") if isinstance(payload, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    # Plain ASGI middleware; only requests matching a rule pay anything
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None, rules: Optional[List[RateLimitRule]] = None,
+                 trust_forwarded: bool = False, enabled: bool = True):
+        self.app = app
+        self.backend = backend or MemoryRateLimitBackend()
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.trust_forwarded = trust_forwarded
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        rules = [r for r in self.rules if r.method == scope["method"] and r.path.match(scope["path"])]
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        # Per-email rules need the body; read it once and replay it downstream
+        body = b""
+        if any(r.by == "email" for r in rules):
+            more = True
+            while more:
+                message = await receive()
+                body += message.get("body", b"")
+                more = message.get("more_body", False)
+                if len(body) > MAX_BODY_BYTES:
+                    await self._respond(send, 413, "Request body too large")
+                    return
+
+            replayed = False
+
+            async def replay():
+                nonlocal replayed
+                if replayed:
+                    return await receive()
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            downstream_receive = replay
+        else:
+            downstream_receive = receive
+
+        identities = {"ip": _client_ip(scope, self.trust_forwarded), "email": _email(body) if body else None}
+        for r in rules:
+            identity = identities[r.by]
+            if identity is None:
+                continue
+            key = f"{r.by}:{identity}:{r.method}:{r.path.pattern}:{r.window}"
+            try:
+                count = await self.backend.hit(key, r.window)
+            except Exception as e:
+                # Never take the endpoint down with the limiter
+                logger.warning("Rate limiter unavailable: %s", e)
+                break
+            if count > r.limit:
+                await self._reject(send, r)
+                return
+
+        await self.app(scope, downstream_receive, send)
+
+    async def _reject(self, send, r: RateLimitRule) -> None:
+        await self._respond(send, 429, "Too many requests, please slow down",
+                            [(b"retry-after", str(int(math.ceil(r.window))).encode())])
+
+    async def _respond(self, send, status: int, detail: str, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *(headers or []),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_backend(backend: str = "memory", redis_url: Optional[str] = None) -> RateLimitBackend:
+    if backend == "redis":
+        return RedisRateLimitBackend(redis_url or "redis://localhost:6379/0")
+    return MemoryRateLimitBackend()
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import html
+import math
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:  # pragma: no cover - markdown-it-py is in requirements.txt
+    MarkdownIt = None
+
+# Blog content rendering, done once at write time.
+# create/update run the Markdown body through markdown-it with raw HTML
+# disabled: tags in the source come out escaped, and links with
+# javascript:/vbscript:/data: targets are not turned into links. The result
+# is stored next to the source as content_html, toc (h2/h3 headings, which
+# carry matching id attributes in the HTML), read_time_minutes and
+# content_hash, and reads ship it as is.
+# The hash covers the source and RENDER_VERSION: an update that leaves the
+# content alone skips rendering, and after bumping RENDER_VERSION
+# `python rendering.py` re-renders just the posts that are out of date.
+# blog.py is not mounted in server.py yet (it still has placeholder db/auth
+# dependencies and models.py has no BlogPost), so for now nothing in the API
+# calls this; the CLI and tests/test_rendering.py do.
+
+RENDER_VERSION = 1
+WORDS_PER_MINUTE = 200
+TOC_LEVELS = (2, 3)
+
+_markdown = (
+    MarkdownIt("commonmark", {"html": False}).enable(["table", "strikethrough"]) if MarkdownIt else None
+)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(f"{RENDER_VERSION}:{content}".encode()).hexdigest()
+
+
+def read_time_minutes(content: str) -> int:
+    return max(1, math.ceil(len(re.findall(r"\w+", content)) / WORDS_PER_MINUTE))
+
+
+def _slugify(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^\w\s-]", "", text.lower()).strip()
+    return re.sub(r"[\s_-]+", "-", slug) or "section"
+
+
+def _anchor(title: str, seen: Dict[str, int]) -> str:
+    slug = _slugify(title)
+    seen[slug] = seen.get(slug, 0) + 1
+    return slug if seen[slug] == 1 else f"{slug}-{seen[slug]}"
+
+
+def _render_markdown_it(content: str, toc: List[Dict[str, Any]]) -> str:
+    tokens = _markdown.parse(content)
+    seen: Dict[str, int] = {}
+    for i, token in enumerate(tokens):
+        if token.type != "heading_open":
+            continue
+        title = "".join(
+            child.content for child in tokens[i + 1].children or [] if child.type in ("text", "code_inline")
+        )
+        anchor = _anchor(title, seen)
+        token.attrSet("id", anchor)
+        level = int(token.tag[1])
+        if level in TOC_LEVELS:
+            toc.append({"level": level, "id": anchor, "title": title})
+    return _markdown.renderer.render(tokens, _markdown.options, {})
+
+
+def _render_plain(content: str, toc: List[Dict[str, Any]]) -> str:
+    # Without markdown-it: headings and paragraphs only, everything escaped
+    seen: Dict[str, int] = {}
+    blocks = []
+    for block in re.split(r"\n\s*\n", content.strip()):
+        heading = re.match(r"^(#{1,6})\s+(.+)$", block.strip())
+        if heading:
+            level, title = len(heading.group(1)), heading.group(2).strip()
+            anchor = _anchor(title, seen)
+            blocks.append(f'<h{level} id="{anchor}">{html.escape(title)}</h{level}>')
+            if level in TOC_LEVELS:
+                toc.append({"level": level, "id": anchor, "title": title})
+        elif block.strip():
+            blocks.append(f"<p>{html.escape(block.strip())}</p>")
+    return "\n".join(blocks) + "\n" if blocks else ""
+
+
+def render_content(content: Optional[str]) -> Dict[str, Any]:
+    content = content or ""
+    toc: List[Dict[str, Any]] = []
+    rendered = _render_markdown_it(content, toc) if _markdown else _render_plain(content, toc)
+    return {
+        "content_html": rendered,
+        "toc": toc,
+        "read_time_minutes": read_time_minutes(content),
+        "content_hash": content_hash(content),
+    }
+
+
+def rerender(content: Optional[str], current_hash: Optional[str]) -> Dict[str, Any]:
+    # Fields to $set, or nothing when the stored rendering is still current
+    if current_hash == content_hash(content or ""):
+        return {}
+    return render_content(content)
+
+
+async def rerender_posts(db: AsyncIOMotorDatabase, batch_size: int = 500) -> Dict[str, int]:
+    report = {"checked": 0, "rendered": 0}
+    ops: List[UpdateOne] = []
+    async for doc in db.blog_posts.find({}, {"_id": 0, "id": 1, "content": 1, "content_hash": 1}):
+        report["checked"] += 1
+        fields = rerender(doc.get("content"), doc.get("content_hash"))
+        if fields:
+            ops.append(UpdateOne({"id": doc["id"]}, {"$set": fields}))
+        if len(ops) >= batch_size:
+            await db.blog_posts.bulk_write(ops, ordered=False)
+            report["rendered"] += len(ops)
+            ops = []
+    if ops:
+        await db.blog_posts.bulk_write(ops, ordered=False)
+        report["rendered"] += len(ops)
+    return report
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pathlib import Path
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        report = await rerender_posts(client[os.environ['DB_NAME']])
+        print(f"Blog posts re-rendered: {report}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,873 @@
+import bisect
+import itertools
+import operator
+from collections.abc import Hashable
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# Collection repositories.
+#
+# Routers (through stores.py), counters, usage, jobs and campaigns all talk to
+# a per-collection repository with the Motor collection interface (find /
+# find_one / find_one_and_update / insert_* / update_* / delete_* /
+# count_documents / bulk_write / aggregate / create_index). There are two
+# implementations:
+#
+# - Motor's own AsyncIOMotorCollection (STORAGE_BACKEND=mongo, the default),
+#   optionally wrapped by storage.py;
+# - MemoryRepository below (STORAGE_BACKEND=memory): documents live in the
+#   process, secondary indexes are sorted lists maintained with bisect, and a
+#   small planner answers equality prefixes and (prefix +) sort from them, so
+#   lists, keyset pages and point lookups don't scan. For the test suite and
+#   small single-worker deployments: zero I/O, millisecond start, nothing
+#   persisted and nothing shared between workers.
+#
+# The in-memory side implements the subset of the query and update language
+# this codebase uses (see matches() / apply_update() / aggregate()) and raises
+# OperationFailure for anything else rather than guessing.
+
+_MISSING = object()
+
+
+# ---------------------------------------------------------------- ordering
+
+def _type_rank(value: Any) -> int:
+    # BSON comparison order: null < numbers < strings < objects < arrays <
+    # binary < ObjectId < bool < date
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, Mapping):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def sort_value(value: Any) -> Tuple[Any, ...]:
+    rank = _type_rank(value)
+    if rank == 1:
+        return (1, 0)
+    if rank == 4:
+        return (4, repr(sorted(value.items())))
+    if rank == 5:
+        return (5, tuple(sort_value(v) for v in value))
+    if rank == 10:
+        return (10, repr(value))
+    return (rank, value)
+
+
+class _Reversed:
+    # Descending key component
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any):
+        self.key = key
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _Reversed) and self.key == other.key
+
+    def __lt__(self, other: Any) -> bool:
+        return other.key < self.key
+
+    def __gt__(self, other: Any) -> bool:
+        return self.key < other.key
+
+
+# Upper bounds for a key component, used to find the end of a prefix range
+_ASC_MAX = (99,)
+_DESC_MAX = _Reversed((0,))
+
+
+def _get(doc: Mapping[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, Mapping) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _clone(value: Any) -> Any:
+    # Cheaper than deepcopy for plain JSON-ish documents
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> Optional[List[Tuple[str, int]]]:
+    if key_or_list is None:
+        return None
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return [(key, int(d)) for key, d in key_or_list]
+
+
+def sort_key(spec: Sequence[Tuple[str, int]]) -> Callable[[Mapping[str, Any]], Tuple[Any, ...]]:
+    def key(doc: Mapping[str, Any]) -> Tuple[Any, ...]:
+        return tuple(
+            sort_value(_get(doc, field)) if direction > 0 else _Reversed(sort_value(_get(doc, field)))
+            for field, direction in spec
+        )
+    return key
+
+
+# ---------------------------------------------------------------- matching
+
+_TYPES = {
+    "null": type(None), "double": float, "int": int, "string": str, "object": dict, "array": list,
+    "binData": bytes, "objectId": ObjectId, "bool": bool, "date": datetime,
+}
+
+_COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _is_operator_dict(value: Any) -> bool:
+    return isinstance(value, Mapping) and bool(value) and all(str(k).startswith("$") for k in value)
+
+
+def _candidates(value: Any) -> List[Any]:
+    # An array field matches on the array itself or any of its elements
+    if isinstance(value, list):
+        return [value, *value]
+    return [value]
+
+
+def _equals(value: Any, target: Any) -> bool:
+    if target is None:
+        return value is None or value is _MISSING or (isinstance(value, list) and None in value)
+    return any(v == target and _type_rank(v) == _type_rank(target) for v in _candidates(value))
+
+
+def _compare(value: Any, target: Any, test: Callable[[Any, Any], bool]) -> bool:
+    # Range operators only match within the same type bracket, as in Mongo
+    rank = _type_rank(target)
+    return any(
+        v is not _MISSING and _type_rank(v) == rank and test(sort_value(v), sort_value(target))
+        for v in _candidates(value)
+    )
+
+
+def _match_operator(value: Any, op: str, arg: Any) -> bool:
+    if op == "$eq":
+        return _equals(value, arg)
+    if op == "$ne":
+        return not _equals(value, arg)
+    if op in _COMPARISONS:
+        return _compare(value, arg, _COMPARISONS[op])
+    if op == "$in":
+        return any(_equals(value, a) for a in arg)
+    if op == "$nin":
+        return not any(_equals(value, a) for a in arg)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$type":
+        return value is not _MISSING and isinstance(value, _TYPES[arg]) and not (arg == "int" and isinstance(value, bool))
+    if op == "$not":
+        return not _match_field(value, arg)
+    raise OperationFailure(f"Unsupported query operator {op}")
+
+
+def _match_field(value: Any, condition: Any) -> bool:
+    if _is_operator_dict(condition):
+        return all(_match_operator(value, op, arg) for op, arg in condition.items())
+    return _equals(value, condition)
+
+
+def matches(doc: Mapping[str, Any], query: Optional[Mapping[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator {key}")
+        elif not _match_field(_get(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc: Mapping[str, Any], projection: Any) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {name: 1 for name in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        projected = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path, wanted in fields.items():
+            value = _get(doc, path)
+            if wanted and value is not _MISSING:
+                _set(projected, path, value)
+        return projected
+    projected = {k: v for k, v in doc.items() if k not in fields}
+    if not include_id:
+        projected.pop("_id", None)
+    return projected
+
+
+# ---------------------------------------------------------------- updates
+
+def _expr_cond(args: Any, doc: Mapping[str, Any]) -> Any:
+    if isinstance(args, Mapping):
+        args = [args["if"], args["then"], args["else"]]
+    condition, then, otherwise = args
+    return evaluate(then, doc) if evaluate(condition, doc) else evaluate(otherwise, doc)
+
+
+def _expr_if_null(args: List[Any], doc: Mapping[str, Any]) -> Any:
+    for arg in args[:-1]:
+        value = evaluate(arg, doc)
+        if value is not None:
+            return value
+    return evaluate(args[-1], doc)
+
+
+def _expr_eq(args: List[Any], doc: Mapping[str, Any]) -> bool:
+    left, right = (evaluate(arg, doc) for arg in args)
+    return left == right and _type_rank(left) == _type_rank(right)
+
+
+_EXPRESSIONS: Dict[str, Callable[[Any, Mapping[str, Any]], Any]] = {
+    "$literal": lambda args, doc: args,
+    "$cond": _expr_cond,
+    "$ifNull": _expr_if_null,
+    "$eq": _expr_eq,
+    "$ne": lambda args, doc: not _expr_eq(args, doc),
+    "$and": lambda args, doc: all(evaluate(arg, doc) for arg in args),
+    "$or": lambda args, doc: any(evaluate(arg, doc) for arg in args),
+    "$not": lambda args, doc: not evaluate(args[0] if isinstance(args, list) else args, doc),
+}
+
+
+def evaluate(expr: Any, doc: Mapping[str, Any]) -> Any:
+    # Aggregation expressions, as used by pipeline updates and $group
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(item, doc) for item in expr]
+    if isinstance(expr, Mapping):
+        if len(expr) == 1:
+            (op, args), = expr.items()
+            if op.startswith("$"):
+                if op not in _EXPRESSIONS:
+                    raise OperationFailure(f"Unsupported expression {op}")
+                return _EXPRESSIONS[op](args, doc)
+        return {k: evaluate(v, doc) for k, v in expr.items()}
+    return expr
+
+
+def _push(doc: Dict[str, Any], path: str, spec: Any, unique: bool) -> None:
+    current = _get(doc, path)
+    if current is _MISSING:
+        current = []
+    elif not isinstance(current, list):
+        raise OperationFailure(f"Cannot apply $push/$addToSet to non-array field {path}")
+    current = list(current)
+    items = spec["$each"] if isinstance(spec, Mapping) and "$each" in spec else [spec]
+    for item in items:
+        if not unique or item not in current:
+            current.append(_clone(item))
+    if isinstance(spec, Mapping) and "$slice" in spec:
+        n = spec["$slice"]
+        current = current[n:] if n < 0 else current[:n]
+    _set(doc, path, current)
+
+
+def apply_update(doc: Dict[str, Any], update: Any, inserting: bool = False) -> None:
+    if isinstance(update, list):
+        # Pipeline update; every stage sees the document as the previous stage left it
+        for stage in update:
+            (op, spec), = stage.items()
+            if op in ("$set", "$addFields"):
+                values = {path: evaluate(expr, doc) for path, expr in spec.items()}
+                for path, value in values.items():
+                    _set(doc, path, _clone(value))
+            elif op == "$unset":
+                for path in [spec] if isinstance(spec, str) else spec:
+                    _unset(doc, path)
+            else:
+                raise OperationFailure(f"Unsupported pipeline update stage {op}")
+        return
+
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                _set(doc, path, _clone(value))
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$unset":
+            for path in fields:
+                _unset(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get(doc, path)
+                if current is _MISSING or current is None:
+                    current = 0
+                if not isinstance(current, (int, float)) or isinstance(current, bool):
+                    raise OperationFailure(f"Cannot apply $inc to non-numeric field {path}")
+                _set(doc, path, current + amount)
+        elif op in ("$push", "$addToSet"):
+            for path, spec in fields.items():
+                _push(doc, path, spec, unique=op == "$addToSet")
+        else:
+            raise OperationFailure(f"Unsupported update operator {op}")
+
+
+def _upsert_seed(query: Mapping[str, Any]) -> Dict[str, Any]:
+    # An upsert starts from the filter's equality fields
+    doc: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_dict(condition):
+            if "$eq" in condition:
+                _set(doc, key, _clone(condition["$eq"]))
+        else:
+            _set(doc, key, _clone(condition))
+    return doc
+
+
+# ---------------------------------------------------------------- indexes
+
+def _hashable_id(value: Any) -> Any:
+    return value if isinstance(value, Hashable) else repr(value)
+
+
+class SortedIndex:
+    # Secondary index: (key tuple, slot) entries kept sorted with bisect.
+    # A document whose indexed field holds an array gets one entry per
+    # element (multikey), like a Mongo index.
+    def __init__(self, collection: str, name: str, keys: Sequence[Tuple[str, int]], unique: bool = False):
+        self.collection = collection
+        self.name = name
+        self.keys = list(keys)
+        self.fields = [field for field, _ in self.keys]
+        self.unique = unique
+        self.array_fields: set = set()
+        self._entries: List[Tuple[Tuple[Any, ...], int]] = []
+
+    def _component(self, value: Any, direction: int) -> Any:
+        return sort_value(value) if direction > 0 else _Reversed(sort_value(value))
+
+    def prefix(self, values: Sequence[Any]) -> Tuple[Any, ...]:
+        return tuple(self._component(value, direction) for value, (_, direction) in zip(values, self.keys))
+
+    def entry_keys(self, doc: Mapping[str, Any]) -> List[Tuple[Any, ...]]:
+        per_field = []
+        for field, direction in self.keys:
+            value = _get(doc, field)
+            if isinstance(value, list):
+                self.array_fields.add(field)
+                options = list(dict.fromkeys(sort_value(v) for v in value)) or [sort_value(None)]
+                per_field.append([c if direction > 0 else _Reversed(c) for c in options])
+            else:
+                per_field.append([self._component(None if value is _MISSING else value, direction)])
+        return [tuple(key) for key in itertools.product(*per_field)]
+
+    def check(self, slot: int, doc: Mapping[str, Any]) -> None:
+        if not self.unique:
+            return
+        for key in self.entry_keys(doc):
+            i = bisect.bisect_left(self._entries, (key,))
+            if i < len(self._entries) and self._entries[i][0] == key and self._entries[i][1] != slot:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.collection} index: {self.name} "
+                    f"dup key: {({field: _get(doc, field) for field in self.fields})}",
+                    11000,
+                )
+
+    def add(self, slot: int, doc: Mapping[str, Any]) -> None:
+        for key in self.entry_keys(doc):
+            bisect.insort(self._entries, (key, slot))
+
+    def remove(self, slot: int, doc: Mapping[str, Any]) -> None:
+        for key in self.entry_keys(doc):
+            i = bisect.bisect_left(self._entries, (key, slot))
+            if i < len(self._entries) and self._entries[i] == (key, slot):
+                del self._entries[i]
+
+    def range(self, values: Sequence[Any], reverse: bool = False) -> Iterator[int]:
+        # Slots whose leading fields equal `values`, in index (or reverse) order
+        prefix = self.prefix(values)
+        lo = bisect.bisect_left(self._entries, (prefix,))
+        if len(prefix) < len(self.keys):
+            upper = _ASC_MAX if self.keys[len(prefix)][1] > 0 else _DESC_MAX
+            hi = bisect.bisect_right(self._entries, (prefix + (upper,),))
+        else:
+            hi = bisect.bisect_right(self._entries, (prefix, float("inf")))
+        entries = self._entries[lo:hi]
+        return (slot for _, slot in (reversed(entries) if reverse else entries))
+
+    def info(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"v": 2, "key": list(self.keys)}
+        if self.unique:
+            info["unique"] = True
+        return info
+
+
+def _index_name(keys: Sequence[Tuple[str, int]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+# ---------------------------------------------------------------- cursors
+
+class MemoryCursor:
+    def __init__(self, run: Callable[["MemoryCursor"], List[Dict[str, Any]]]):
+        self._run = run
+        self.sort_spec: Optional[List[Tuple[str, int]]] = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self._results: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self.sort_spec = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, n: int) -> "MemoryCursor":
+        self.skip_count = n
+        return self
+
+    def limit(self, n: int) -> "MemoryCursor":
+        self.limit_count = n
+        return self
+
+    def batch_size(self, n: int) -> "MemoryCursor":
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._run(self)
+        return docs[:length] if length else docs
+
+    # Iterated like a Motor cursor: the cursor itself is the async iterator,
+    # so wrappers can call __anext__ on it directly
+    def __aiter__(self) -> "MemoryCursor":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._results is None:
+            self._results = iter(self._run(self))
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+# ---------------------------------------------------------------- repository
+
+class MemoryRepository:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._slots: Dict[Any, int] = {}  # _id -> slot
+        self._indexes: Dict[str, SortedIndex] = {}
+        self._next_slot = itertools.count()
+
+    # -- planning
+
+    def _index_slots(self, query: Mapping[str, Any], sort: Optional[List[Tuple[str, int]]]) -> Tuple[Iterable[int], bool]:
+        # (candidate slots, already in `sort` order)
+        if "_id" in query:
+            condition = query["_id"]
+            if not _is_operator_dict(condition):
+                slot = self._slots.get(_hashable_id(condition))
+                return ([] if slot is None else [slot]), True
+            if set(condition) == {"$in"}:
+                slots = [self._slots.get(_hashable_id(value)) for value in condition["$in"]]
+                return list(dict.fromkeys(s for s in slots if s is not None)), False
+
+        equal = {}
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            if _is_operator_dict(condition):
+                if set(condition) == {"$eq"}:
+                    condition = condition["$eq"]
+                else:
+                    continue
+            if not isinstance(condition, (list, Mapping)):
+                equal[key] = condition
+
+        best: Optional[Tuple[SortedIndex, int]] = None
+        for index in self._indexes.values():
+            n = 0
+            while n < len(index.fields) and index.fields[n] in equal:
+                n += 1
+            if sort and index.keys[n:] and index.array_fields <= set(index.fields[:n]):
+                rest = index.keys[n:n + len(sort)]
+                if rest == sort or rest == [(field, -direction) for field, direction in sort]:
+                    slots = index.range([equal[field] for field in index.fields[:n]], reverse=rest != sort)
+                    return slots, True
+            if n and (best is None or n > best[1]):
+                best = (index, n)
+
+        if best is None:
+            in_field = next(
+                (index for index in self._indexes.values()
+                 if _is_operator_dict(query.get(index.fields[0])) and set(query[index.fields[0]]) == {"$in"}),
+                None,
+            )
+            if in_field is None:
+                return list(self._docs), False
+            slots = itertools.chain.from_iterable(in_field.range([value]) for value in query[in_field.fields[0]]["$in"])
+            return list(dict.fromkeys(slots)), False
+
+        index, n = best
+        slots = index.range([equal[field] for field in index.fields[:n]])
+        if index.array_fields:
+            slots = dict.fromkeys(slots)
+        return list(slots), False
+
+    def _select(self, query: Optional[Mapping[str, Any]], sort: Optional[List[Tuple[str, int]]] = None,
+                skip: int = 0, limit: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        query = query or {}
+        slots, ordered = self._index_slots(query, sort)
+        found: Iterable[Tuple[int, Dict[str, Any]]] = (
+            (slot, self._docs[slot]) for slot in slots if slot in self._docs and matches(self._docs[slot], query)
+        )
+        if sort and not ordered:
+            key = sort_key(sort)
+            found = sorted(found, key=lambda item: key(item[1]))
+        return list(itertools.islice(found, skip, skip + limit if limit else None))
+
+    def _find(self, query: Optional[Mapping[str, Any]], projection: Any, cursor: MemoryCursor) -> List[Dict[str, Any]]:
+        selected = self._select(query, cursor.sort_spec, cursor.skip_count, cursor.limit_count)
+        return [_clone(project(doc, projection)) for _, doc in selected]
+
+    # -- storage
+
+    def _store(self, doc: Dict[str, Any]) -> None:
+        key = _hashable_id(doc["_id"])
+        if key in self._slots:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {{ _id: {doc['_id']!r} }}", 11000
+            )
+        slot = next(self._next_slot)
+        for index in self._indexes.values():
+            index.check(slot, doc)
+        for index in self._indexes.values():
+            index.add(slot, doc)
+        self._docs[slot] = doc
+        self._slots[key] = slot
+
+    def _replace(self, slot: int, new: Dict[str, Any]) -> None:
+        old = self._docs[slot]
+        if _hashable_id(new.get("_id")) != _hashable_id(old["_id"]):
+            raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+        for index in self._indexes.values():
+            index.check(slot, new)
+        for index in self._indexes.values():
+            index.remove(slot, old)
+            index.add(slot, new)
+        self._docs[slot] = new
+
+    def _discard(self, slot: int) -> Dict[str, Any]:
+        doc = self._docs.pop(slot)
+        del self._slots[_hashable_id(doc["_id"])]
+        for index in self._indexes.values():
+            index.remove(slot, doc)
+        return doc
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        # Like pymongo, the caller's document gets the generated _id
+        document.setdefault("_id", ObjectId())
+        self._store(_clone(document))
+        return document["_id"]
+
+    def _update(self, query: Mapping[str, Any], update: Any, upsert: bool = False, multi: bool = False,
+                sort: Optional[List[Tuple[str, int]]] = None) -> Tuple[int, int, Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        # (matched, modified, upserted _id, before, after) - before/after of the first match
+        selected = self._select(query, sort, limit=0 if multi else 1)
+        if not selected:
+            if not upsert:
+                return 0, 0, None, None, None
+            doc = _upsert_seed(query)
+            apply_update(doc, update, inserting=True)
+            doc.setdefault("_id", ObjectId())
+            self._store(doc)
+            return 0, 0, doc["_id"], None, doc
+        modified, first = 0, None
+        for slot, doc in selected:
+            new = _clone(doc)
+            apply_update(new, update)
+            if new != doc:
+                self._replace(slot, new)
+                modified += 1
+            first = first or (doc, new)
+        return len(selected), modified, None, first[0], first[1]
+
+    # -- collection interface
+
+    def find(self, filter: Optional[Mapping[str, Any]] = None, projection: Any = None, skip: int = 0, limit: int = 0,
+             *, sort: Any = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(lambda c: self._find(filter, projection, c))
+        cursor.sort_spec, cursor.skip_count, cursor.limit_count = _normalize_sort(sort), skip, limit
+        return cursor
+
+    async def find_one(self, filter: Optional[Mapping[str, Any]] = None, projection: Any = None,
+                       sort: Any = None, **kwargs) -> Optional[Dict[str, Any]]:
+        selected = self._select(filter, _normalize_sort(sort), limit=1)
+        return _clone(project(selected[0][1], projection)) if selected else None
+
+    async def find_one_and_update(self, filter: Mapping[str, Any], update: Any, projection: Any = None, sort: Any = None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE,
+                                  **kwargs) -> Optional[Dict[str, Any]]:
+        _, _, _, before, after = self._update(filter, update, upsert=upsert, sort=_normalize_sort(sort))
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return None if doc is None else _clone(project(doc, projection))
+
+    async def find_one_and_delete(self, filter: Mapping[str, Any], projection: Any = None, sort: Any = None,
+                                  **kwargs) -> Optional[Dict[str, Any]]:
+        selected = self._select(filter, _normalize_sort(sort), limit=1)
+        if not selected:
+            return None
+        return project(self._discard(selected[0][0]), projection)
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs) -> InsertManyResult:
+        result = await self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult(result.bulk_api_result["insertedIds"], True)
+
+    async def update_one(self, filter: Mapping[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert=upsert)
+        return UpdateResult(self._update_raw(matched, modified, upserted), True)
+
+    async def update_many(self, filter: Mapping[str, Any], update: Any, upsert: bool = False, **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert=upsert, multi=True)
+        return UpdateResult(self._update_raw(matched, modified, upserted), True)
+
+    @staticmethod
+    def _update_raw(matched: int, modified: int, upserted: Any) -> Dict[str, Any]:
+        raw: Dict[str, Any] = {"n": matched or int(upserted is not None), "nModified": modified}
+        if upserted is not None:
+            raw["upserted"] = upserted
+        return raw
+
+    async def delete_one(self, filter: Mapping[str, Any], **kwargs) -> DeleteResult:
+        selected = self._select(filter, limit=1)
+        for slot, _ in selected:
+            self._discard(slot)
+        return DeleteResult({"n": len(selected)}, True)
+
+    async def delete_many(self, filter: Mapping[str, Any], **kwargs) -> DeleteResult:
+        selected = self._select(filter)
+        for slot, _ in selected:
+            self._discard(slot)
+        return DeleteResult({"n": len(selected)}, True)
+
+    async def count_documents(self, filter: Mapping[str, Any], **kwargs) -> int:
+        return len(self._select(filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def bulk_write(self, requests: Sequence[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        raw: Dict[str, Any] = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [], "insertedIds": [],
+        }
+        for i, op in enumerate(requests):
+            try:
+                if isinstance(op, InsertOne):
+                    raw["insertedIds"].append(self._insert(op._doc))
+                    raw["nInserted"] += 1
+                elif isinstance(op, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted, _, _ = self._update(
+                        op._filter, op._doc, upsert=bool(op._upsert), multi=isinstance(op, UpdateMany)
+                    )
+                    raw["nMatched"] += matched
+                    raw["nModified"] += modified
+                    if upserted is not None:
+                        raw["nUpserted"] += 1
+                        raw["upserted"].append({"index": i, "_id": upserted})
+                elif isinstance(op, (DeleteOne, DeleteMany)):
+                    selected = self._select(op._filter, limit=1 if isinstance(op, DeleteOne) else 0)
+                    for slot, _ in selected:
+                        self._discard(slot)
+                    raw["nRemoved"] += len(selected)
+                else:
+                    raise OperationFailure(f"Unsupported bulk operation {type(op).__name__}")
+            except OperationFailure as e:
+                raw["writeErrors"].append({"index": i, "code": e.code, "errmsg": str(e), "op": op})
+                if ordered:
+                    break
+        if raw["writeErrors"]:
+            raise BulkWriteError(raw)
+        return BulkWriteResult(raw, True)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> MemoryCursor:
+        return MemoryCursor(lambda c: self._aggregate(pipeline))
+
+    def _aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # $match first so it can use the indexes, like Mongo's planner would
+        stages = list(pipeline)
+        if stages and "$match" in stages[0]:
+            docs = [_clone(doc) for _, doc in self._select(stages.pop(0)["$match"])]
+        else:
+            docs = [_clone(doc) for doc in self._docs.values()]
+        for stage in stages:
+            (op, spec), = stage.items()
+            if op == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif op == "$unwind":
+                path = (spec["path"] if isinstance(spec, Mapping) else spec)[1:]
+                docs = [
+                    {**doc, path: item}
+                    for doc in docs
+                    for item in (_get(doc, path) if isinstance(_get(doc, path), list) else [])
+                ]
+            elif op == "$group":
+                docs = self._group(docs, spec)
+            elif op == "$sort":
+                docs.sort(key=sort_key(list(spec.items())))
+            elif op == "$skip":
+                docs = docs[spec:]
+            elif op == "$limit":
+                docs = docs[:spec]
+            elif op == "$project":
+                docs = [project(doc, spec) for doc in docs]
+            else:
+                raise OperationFailure(f"Unsupported aggregation stage {op}")
+        return docs
+
+    @staticmethod
+    def _group(docs: List[Dict[str, Any]], spec: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        groups: Dict[Any, Dict[str, Any]] = {}
+        for doc in docs:
+            group_id = evaluate(spec["_id"], doc)
+            group = groups.setdefault(_hashable_id(group_id), {"_id": group_id})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (op, expr), = accumulator.items()
+                if op != "$sum":
+                    raise OperationFailure(f"Unsupported accumulator {op}")
+                value = evaluate(expr, doc)
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+        return list(groups.values())
+
+    # -- indexes
+
+    async def create_index(self, keys: Any, name: Optional[str] = None, unique: bool = False, **kwargs) -> str:
+        keys = _normalize_sort(keys, 1)
+        name = name or _index_name(keys)
+        for existing in self._indexes.values():
+            if existing.keys == keys:
+                if existing.unique != unique or existing.name != name:
+                    raise OperationFailure(f"Index already exists with different name or options: {existing.name}", 85)
+                return name
+        if name in self._indexes:
+            raise OperationFailure(f"Index with name {name} already exists with different keys", 86)
+        index = SortedIndex(self.name, name, keys, unique)
+        for slot, doc in self._docs.items():
+            index.check(slot, doc)
+            index.add(slot, doc)
+        self._indexes[name] = index
+        return name
+
+    async def drop_index(self, name: str, **kwargs) -> None:
+        if name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]", 27)
+        del self._indexes[name]
+
+    async def index_information(self, **kwargs) -> Dict[str, Any]:
+        info = {"_id_": {"v": 2, "key": [("_id", 1)]}}
+        info.update({name: index.info() for name, index in self._indexes.items()})
+        return info
+
+    async def drop(self, **kwargs) -> None:
+        self._docs.clear()
+        self._slots.clear()
+        self._indexes.clear()
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryRepository] = {}
+
+    def __getattr__(self, name: str) -> MemoryRepository:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryRepository:
+        if name not in self._collections:
+            self._collections[name] = MemoryRepository(name)
+        return self._collections[name]
+
+    async def command(self, command: Any, *args, **kwargs) -> Dict[str, Any]:
+        if command == "ping" or (isinstance(command, Mapping) and "ping" in command):
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {command!r}")
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._docs or collection._indexes]
+
+    async def drop_collection(self, name: str, **kwargs) -> None:
+        self._collections.pop(name, None)
+
+
+class MemoryClient:
+    # Stand-in for AsyncIOMotorClient (STORAGE_BACKEND=memory)
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    @property
+    def admin(self) -> MemoryDatabase:
+        return self["admin"]
+
+    def close(self) -> None:
+        pass
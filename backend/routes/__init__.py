@@ -1 +1 @@
-from . import newsletter, contact, prompts
\ No newline at end of file
+from . import newsletter, contact, prompts, search
\ No newline at end of file
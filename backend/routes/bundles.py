@@ -0,0 +1,145 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query, Request, Response
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import (
+    BlogBundle, BlogPostSummary, ExpandedBlogPostSummary, HomeBundle, PromptSummary, PromptsBundle, RankedPrompt,
+    TaxonomySummary
+)
+from dependencies import get_db
+from cache import cached
+from conditional import make_validators, revalidate, validator_headers
+from leaderboard import leaderboard
+from pagination import NEXT_CURSOR_HEADER, keyset_sort, next_cursor
+from projections import model_projection
+from fastjson import trusted_bundle
+from loaders import embed_category_names
+
+router = APIRouter(prefix="/bundle", tags=["bundles"])
+
+# Page bundles: one request per page instead of one per widget. The Mongo
+# reads of a bundle run concurrently with summary projections, rankings come
+# from the in-memory leaderboard. A bundle is cached under the tag of every
+# collection it reads, so writes there drop it; leaderboard movement alone
+# shows up when the cache TTL runs out.
+
+PUBLISHED = "published"
+TAXONOMY_PROJECTION = model_projection(TaxonomySummary)
+
+Sections = Dict[str, Tuple[Type[BaseModel], List[Dict[str, Any]]]]
+
+
+def _page(collection, query: Dict[str, Any], model: Type[BaseModel], sort_by: str, limit: int):
+    cursor = collection.find(query, model_projection(model)).sort(keyset_sort(sort_by, -1))
+    return cursor.limit(limit).to_list(limit)
+
+
+def _popular(collection, type: Optional[str], limit: int):
+    # Most used first; with a type this is the (type, usage_count, name) index
+    query = {"type": type} if type else {}
+    return collection.find(query, TAXONOMY_PROJECTION).sort([("usage_count", -1), ("name", 1)]).limit(limit).to_list(limit)
+
+
+def _bundle(request: Request, sections: Sections, headers: Optional[Dict[str, str]] = None) -> Response:
+    docs = [doc for _, items in sections.values() for doc in items]
+    variant = str(request.url.query)
+    not_modified = revalidate(request, docs, variant)
+    if not_modified:
+        return not_modified
+    return trusted_bundle(sections, {**validator_headers(*make_validators(docs, variant)), **(headers or {})})
+
+
+@router.get("/home", response_model=HomeBundle)
+@cached("bundle:home", tags=["prompts", "blog", "categories", "tags"])
+async def get_home_bundle(
+    request: Request,
+    response: Response,
+    posts: int = Query(3, ge=1, le=20),
+    prompts: int = Query(6, ge=1, le=50),
+    categories: int = Query(10, ge=1, le=100),
+    tags: int = Query(20, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    latest_posts, popular_categories, popular_tags = await asyncio.gather(
+        _page(db.blog_posts, {"status": PUBLISHED}, BlogPostSummary, "published_at", posts),
+        _popular(db.categories, None, categories),
+        _popular(db.tags, None, tags),
+    )
+    await embed_category_names(request, db.categories, latest_posts)
+    return _bundle(request, {
+        "latest_posts": (ExpandedBlogPostSummary, latest_posts),
+        "top_prompts": (RankedPrompt, leaderboard.top("likes", limit=prompts)),
+        "trending_prompts": (RankedPrompt, leaderboard.top("trending", limit=prompts)),
+        "categories": (TaxonomySummary, popular_categories),
+        "tags": (TaxonomySummary, popular_tags),
+    })
+
+
+@router.get("/prompts", response_model=PromptsBundle)
+@cached("bundle:prompts", tags=["prompts", "categories", "tags"])
+async def get_prompts_bundle(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(12, ge=1, le=100),
+    trending: int = Query(5, ge=1, le=50),
+    categories: int = Query(20, ge=1, le=100),
+    tags: int = Query(30, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    query = {}
+    if category:
+        query["category"] = category
+    if tag:
+        query["tags"] = tag
+
+    page, popular_categories, popular_tags = await asyncio.gather(
+        _page(db.prompts, query, PromptSummary, "created_at", limit),
+        _popular(db.categories, "prompt", categories),
+        _popular(db.tags, "prompt", tags),
+    )
+    # The rest of the list continues at /api/prompts?after=<cursor> with the same filters
+    token = next_cursor("created_at", -1, page, limit)
+    return _bundle(request, {
+        "prompts": (PromptSummary, page),
+        "trending_prompts": (RankedPrompt, leaderboard.top("trending", category, tag, trending)),
+        "categories": (TaxonomySummary, popular_categories),
+        "tags": (TaxonomySummary, popular_tags),
+    }, {NEXT_CURSOR_HEADER: token} if token else None)
+
+
+@router.get("/blog", response_model=BlogBundle)
+@cached("bundle:blog", tags=["blog", "categories", "tags"])
+async def get_blog_bundle(
+    request: Request,
+    response: Response,
+    category_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    categories: int = Query(20, ge=1, le=100),
+    tags: int = Query(30, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    query = {"status": PUBLISHED}
+    if category_id:
+        query["category_id"] = category_id
+    if tag:
+        query["tags"] = tag
+
+    page, popular_categories, popular_tags = await asyncio.gather(
+        _page(db.blog_posts, query, BlogPostSummary, "published_at", limit),
+        _popular(db.categories, "blog", categories),
+        _popular(db.tags, "blog", tags),
+    )
+    # Continues at /api/blog?status=published&sort_by=published_at&after=<cursor>
+    token = next_cursor("published_at", -1, page, limit)
+    await embed_category_names(request, db.categories, page)
+    return _bundle(request, {
+        "posts": (ExpandedBlogPostSummary, page),
+        "categories": (TaxonomySummary, popular_categories),
+        "tags": (TaxonomySummary, popular_tags),
+    }, {NEXT_CURSOR_HEADER: token} if token else None)
@@ -1,52 +1,67 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 
 from models import ContactSubmission, ContactSubmissionCreate
+from dependencies import get_db
+from exports import ExportFormat, export_response
+from notifications import enqueue_contact_notification
+from stores import insert_submission, list_submissions, set_submission_status
 
 router = APIRouter(prefix="/contact", tags=["contact"])
 
 @router.post("/submit", response_model=ContactSubmission, status_code=status.HTTP_201_CREATED)
-async def submit_contact_form(submission_data: ContactSubmissionCreate, db: AsyncIOMotorDatabase = None):
+async def submit_contact_form(submission_data: ContactSubmissionCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     # Create new contact submission
     new_submission = ContactSubmission(**submission_data.dict())
-    await db.contact_submissions.insert_one(new_submission.dict())
+    await insert_submission(db, new_submission.dict())
+    # The notification email goes out from the job queue, off the request path
+    await enqueue_contact_notification(new_submission.dict())
     return new_submission
 
 @router.get("/submissions", response_model=List[ContactSubmission])
-async def get_submissions(status: str = None, db: AsyncIOMotorDatabase = None):
-    # Build query based on status filter
+async def get_submissions(status: str = None, db: AsyncIOMotorDatabase = Depends(get_db)):
+    submissions = await list_submissions(db, status)
+    return [ContactSubmission(**sub) for sub in submissions]
+
+@router.get("/submissions/export")
+async def export_submissions(
+    status: str = None,
+    format: ExportFormat = "ndjson",
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    # Full, untruncated export streamed straight from the cursor
     query = {}
     if status:
         query["status"] = status
-        
-    submissions = await db.contact_submissions.find(query).sort("created_at", -1).to_list(1000)
-    return [ContactSubmission(**sub) for sub in submissions]
+
+    columns = list(ContactSubmission.model_fields)
+    return export_response(
+        db.contact_submissions, query, columns, format,
+        filename="contact_submissions", batch_size=batch_size, sort=[("created_at", -1)]
+    )
 
 @router.put("/submissions/{submission_id}/status", response_model=ContactSubmission)
 async def update_submission_status(
     submission_id: str, 
     status: str, 
-    db: AsyncIOMotorDatabase = None
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    # Validate status
+    # Validate status (`status` is shadowed by the query param, hence the literal codes)
     valid_statuses = ["new", "read", "responded", "archived"]
     if status not in valid_statuses:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=400,
             detail=f"Status must be one of: {', '.join(valid_statuses)}"
         )
-    
-    result = await db.contact_submissions.update_one(
-        {"id": submission_id},
-        {"$set": {"status": status}}
-    )
-    
-    if result.modified_count == 0:
+
+    # Setting the same status again is a no-op, not a 404
+    outcome = await set_submission_status(db, submission_id, status)
+    if not outcome.found:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
+            status_code=404,
             detail="Submission not found"
         )
-    
-    updated = await db.contact_submissions.find_one({"id": submission_id})
-    return ContactSubmission(**updated)
\ No newline at end of file
+
+    return ContactSubmission(**outcome.document)
\ No newline at end of file
@@ -1,42 +1,120 @@
-from fastapi import APIRouter, HTTPException, Body, status
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query, Request, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import EmailStr
-from typing import List
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import Any, Dict, List, Optional
 
-from models import NewsletterSubscriber, NewsletterSubscriberCreate
+from models import Campaign, CampaignCreate, NewsletterSubscriber, NewsletterSubscriberCreate
+from dependencies import get_db
+from exports import ExportFormat, export_response
+from bulk import BulkReport, read_items, validate_items
+from notifications import enqueue_welcome_email
+from campaigns import DRAFT, QUEUED, enqueue_campaign
+from coalesce import SingleFlight
+from stores import (
+    bulk_write_subscribers, deactivate_subscriber, find_campaign, insert_campaign, list_subscribers,
+    transition_campaign, upsert_subscriber
+)
 
 router = APIRouter(prefix="/newsletter", tags=["newsletter"])
 
+# Identical subscribe calls (same email and same Idempotency-Key) arriving
+# together share one database operation. Nothing is replayed once it has
+# finished: a subscribe after an unsubscribe must reach the database again.
+subscribe_flights = SingleFlight()
+
+def normalize_email(email: str) -> str:
+    # Subscribers are stored, matched and coalesced by the lowercased address
+    return email.strip().lower()
+
 @router.post("/subscribe", response_model=NewsletterSubscriber, status_code=status.HTTP_201_CREATED)
-async def subscribe(subscriber_data: NewsletterSubscriberCreate, db: AsyncIOMotorDatabase = None):
-    # Check if subscriber already exists
-    existing = await db.newsletter_subscribers.find_one({"email": subscriber_data.email})
-    if existing:
-        # If they exist but were inactive, reactivate them
-        if not existing.get("is_active", True):
-            await db.newsletter_subscribers.update_one(
-                {"email": subscriber_data.email},
-                {"$set": {"is_active": True}}
-            )
-            updated = await db.newsletter_subscribers.find_one({"email": subscriber_data.email})
-            return NewsletterSubscriber(**updated)
-        
-        # Otherwise, just return the existing subscriber
-        return NewsletterSubscriber(**existing)
-    
-    # Create new subscriber
-    new_subscriber = NewsletterSubscriber(email=subscriber_data.email)
-    await db.newsletter_subscribers.insert_one(new_subscriber.dict())
-    return new_subscriber
+async def subscribe(
+    subscriber_data: NewsletterSubscriberCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    email = normalize_email(subscriber_data.email)
+    key = f"{email}:{idempotency_key or ''}"
+    return await subscribe_flights.run(key, lambda: _subscribe(email, db))
+
+def _subscribe_update(subscriber: NewsletterSubscriber) -> List[Dict[str, Any]]:
+    # Pipeline upsert: creates the subscriber, reactivates an inactive one, or
+    # leaves an active one untouched (updated_at only moves on reactivation).
+    # Values go in as $literal: in a pipeline "$boss@example.com" is a field path.
+    return [{"$set": {
+        "id": {"$ifNull": ["$id", {"$literal": subscriber.id}]},
+        "email": {"$literal": subscriber.email},
+        "tags": {"$ifNull": ["$tags", {"$literal": subscriber.tags}]},
+        "created_at": {"$ifNull": ["$created_at", {"$literal": subscriber.created_at}]},
+        "updated_at": {"$cond": [{"$eq": ["$is_active", True]}, "$updated_at", {"$literal": subscriber.updated_at}]},
+        "is_active": True,
+    }}]
+
+async def _subscribe(email: str, db: AsyncIOMotorDatabase) -> NewsletterSubscriber:
+    # One round trip against the unique email index. The pre-image says what
+    # happened: None = new subscriber, inactive = reactivated, else no-op.
+    subscriber = NewsletterSubscriber(email=email)
+    for attempt in range(2):
+        try:
+            before = await upsert_subscriber(db, subscriber.email, _subscribe_update(subscriber))
+            break
+        except DuplicateKeyError:
+            # Lost an insert race with a concurrent upsert; the retry matches its document
+            if attempt:
+                raise
+
+    if before is not None and before.get("is_active", True):
+        return NewsletterSubscriber(**before)
+
+    # Welcome email goes out from the job queue, off the request path
+    await enqueue_welcome_email(subscriber.email)
+    if before is None:
+        return subscriber
+    return NewsletterSubscriber(**{**before, "is_active": True, "updated_at": subscriber.updated_at})
+
+@router.post("/subscribe/bulk")
+async def bulk_subscribe(request: Request, welcome: bool = False, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Imports: JSON array or NDJSON of {"email": ...}, upserted in one unordered
+    # bulk_write. Welcome emails are opt-in here.
+    valid, errors = validate_items(await read_items(request), NewsletterSubscriberCreate)
+    report = BulkReport(errors)
+
+    ops, op_items, seen = [], [], set()
+    for index, item in valid:
+        email = normalize_email(item.email)
+        if email in seen:
+            report.add(index, "duplicate", email=email)
+            continue
+        seen.add(email)
+        ops.append(UpdateOne({"email": email}, _subscribe_update(NewsletterSubscriber(email=email)), upsert=True))
+        op_items.append((index, email))
+
+    failed: Dict[int, str] = {}
+    created = set()
+    if ops:
+        try:
+            result = await bulk_write_subscribers(db, ops)
+            created = set(result.upserted_ids)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+            created = {u["index"] for u in e.details.get("upserted", [])}
+
+    for position, (index, email) in enumerate(op_items):
+        if position in failed:
+            report.add(index, "error", email=email, error=failed[position])
+        elif position in created:
+            report.add(index, "created", email=email)
+            if welcome:
+                await enqueue_welcome_email(email)
+        else:
+            report.add(index, "subscribed", email=email)
+    return report.to_dict()
 
 @router.post("/unsubscribe", status_code=status.HTTP_200_OK)
-async def unsubscribe(email: EmailStr = Body(..., embed=True), db: AsyncIOMotorDatabase = None):
-    result = await db.newsletter_subscribers.update_one(
-        {"email": email},
-        {"$set": {"is_active": False}}
-    )
-    
-    if result.modified_count == 0:
+async def unsubscribe(email: EmailStr = Body(..., embed=True), db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Unsubscribing twice is fine; only an unknown email is a 404
+    if not await deactivate_subscriber(db, normalize_email(email)):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Email not found in our subscriber list"
@@ -45,7 +123,57 @@ async def unsubscribe(email: EmailStr = Body(..., embed=True), db: AsyncIOMotorD
     return {"message": "Successfully unsubscribed"}
 
 @router.get("/subscribers", response_model=List[NewsletterSubscriber])
-async def get_subscribers(active_only: bool = True, db: AsyncIOMotorDatabase = None):
+async def get_subscribers(active_only: bool = True, db: AsyncIOMotorDatabase = Depends(get_db)):
+    subscribers = await list_subscribers(db, active_only)
+    return [NewsletterSubscriber(**sub) for sub in subscribers]
+
+@router.get("/subscribers/export")
+async def export_subscribers(
+    format: ExportFormat = "ndjson",
+    active_only: bool = True,
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    # Full, untruncated export streamed straight from the cursor
     query = {"is_active": True} if active_only else {}
-    subscribers = await db.newsletter_subscribers.find(query).to_list(1000)
-    return [NewsletterSubscriber(**sub) for sub in subscribers]
\ No newline at end of file
+    columns = list(NewsletterSubscriber.model_fields)
+    return export_response(
+        db.newsletter_subscribers, query, columns, format,
+        filename="subscribers", batch_size=batch_size
+    )
+
+
+@router.post("/campaigns", response_model=Campaign, status_code=status.HTTP_201_CREATED)
+async def create_campaign(campaign_data: CampaignCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
+    new_campaign = Campaign(**campaign_data.dict())
+    await insert_campaign(db, new_campaign.dict())
+    return new_campaign
+
+@router.post("/campaigns/{campaign_id}/send", response_model=Campaign, status_code=status.HTTP_202_ACCEPTED)
+async def send_campaign(campaign_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Only a draft can be queued, so a double click does not send twice
+    outcome = await transition_campaign(db, campaign_id, DRAFT, QUEUED)
+    if not outcome.found:
+        existing = await find_campaign(db, campaign_id, {"_id": 0, "status": 1})
+        if existing is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Campaign not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Campaign is already {existing['status']}"
+        )
+
+    await enqueue_campaign(campaign_id)
+    return Campaign(**outcome.document)
+
+@router.get("/campaigns/{campaign_id}", response_model=Campaign)
+async def get_campaign(campaign_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    campaign = await find_campaign(db, campaign_id)
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    return Campaign(**campaign)
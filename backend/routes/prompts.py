@@ -1,73 +1,229 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Literal, Optional
 
-from models import Prompt, PromptCreate, PromptUpdate
+from models import Prompt, PromptCreate, PromptUpdate, PromptSummary, RankedPrompt
+from dependencies import get_db
+from counters import prompt_counters
+from bulk import (
+    BulkReport, bulk_delete, bulk_insert, bulk_update, read_items, split_delete_items, split_update_items,
+    validate_items
+)
+from cache import cached, response_cache
+from search_engine import search_index
+from leaderboard import leaderboard
+from usage import USAGE_FIELDS, record_usage_change, record_usage_changes
+from conditional import (
+    VALIDATOR_FIELDS, VALIDATOR_PROJECTION, has_validators, make_validators, revalidate, revalidate_one, validator_headers
+)
+from pagination import (
+    NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, keyset_filter, keyset_sort, next_cursor
+)
+from projections import fields_projection, list_response, model_projection, parse_fields
+from loaders import fetch_by_ids, parse_ids
+from fastjson import trusted_response
+from stores import delete_prompt_by_id, find_prompt, find_prompts, insert_prompt, page_prompts, update_prompt_fields
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
 @router.post("/", response_model=Prompt, status_code=status.HTTP_201_CREATED)
-async def create_prompt(prompt_data: PromptCreate, db: AsyncIOMotorDatabase = None):
+async def create_prompt(prompt_data: PromptCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     # Create new prompt
     new_prompt = Prompt(**prompt_data.dict())
-    await db.prompts.insert_one(new_prompt.dict())
+    await insert_prompt(db, new_prompt.dict())
+    await record_usage_change(db, "prompt", None, new_prompt.dict())
+    search_index.index_prompt(new_prompt.dict())
+    leaderboard.add(new_prompt.dict())
+    await response_cache.invalidate("prompts")
     return new_prompt
 
+@router.post("/bulk")
+async def bulk_create_prompts(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # JSON array or NDJSON of PromptCreate objects
+    valid, errors = validate_items(await read_items(request), PromptCreate)
+    report = BulkReport(errors)
+    docs = [(index, Prompt(**item.dict()).dict()) for index, item in valid]
+
+    inserted = await bulk_insert(db.prompts, docs, report)
+    await record_usage_changes(db, "prompt", [(None, doc) for doc in inserted])
+    for doc in inserted:
+        search_index.index_prompt(doc)
+        leaderboard.add(doc)
+    await response_cache.invalidate("prompts")
+    return report.to_dict()
+
+@router.patch("/bulk")
+async def bulk_update_prompts(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # JSON array or NDJSON of {"id": ..., <PromptUpdate fields>}
+    updates, report = split_update_items(await read_items(request), PromptUpdate)
+    previous = await bulk_update(db.prompts, updates, report, fields=USAGE_FIELDS["prompt"])
+    if previous:
+        current = await find_prompts(db, previous)
+        await record_usage_changes(db, "prompt", [(previous[doc["id"]], doc) for doc in current])
+        for doc in current:
+            search_index.index_prompt(doc)
+            leaderboard.add(doc)
+    await response_cache.invalidate("prompts")
+    return report.to_dict()
+
+@router.post("/bulk/delete")
+async def bulk_delete_prompts(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # JSON array of ids
+    report = BulkReport()
+    deleted = await bulk_delete(db.prompts, split_delete_items(await read_items(request)), report, fields=USAGE_FIELDS["prompt"])
+    await record_usage_changes(db, "prompt", [(doc, None) for doc in deleted.values()])
+    for prompt_id in deleted:
+        search_index.remove("prompt", prompt_id)
+        leaderboard.remove(prompt_id)
+    await response_cache.invalidate("prompts")
+    return report.to_dict()
+
 @router.get("/", response_model=List[Prompt])
+@cached("prompts:list", tags=["prompts"])
 async def get_prompts(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     tag: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0),  # legacy offset paging, prefer `after`
+    after: Optional[str] = None,  # opaque cursor from the X-Next-Cursor header
     sort_by: str = "created_at",
     sort_order: int = -1,  # -1 for descending, 1 for ascending
-    db: AsyncIOMotorDatabase = None
+    view: Literal["full", "summary"] = "full",  # summary = PromptSummary, no prompt_text
+    fields: Optional[str] = None,  # sparse fieldset, e.g. "title,likes"
+    ids: Optional[str] = None,  # batch fetch, e.g. "id1,id2" (in that order, one $in query)
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
+    try:
+        field_names = parse_fields(fields, Prompt)
+        id_list = parse_ids(ids) if ids else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if id_list and (after or skip):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'ids' can't be combined with 'after' or 'skip'"
+        )
+
     # Build query filters
     query = {}
     if category:
         query["category"] = category
     if tag:
         query["tags"] = tag
-        
-    # Get prompts with sorting and pagination
-    cursor = db.prompts.find(query)
-    
-    # Apply sorting
-    if sort_by in ["created_at", "likes", "views", "title"]:
-        cursor = cursor.sort(sort_by, sort_order)
-    else:
-        cursor = cursor.sort("created_at", -1)  # Default sort
-    
-    # Apply pagination
-    cursor = cursor.skip(skip).limit(limit)
-    
-    prompts = await cursor.to_list(limit)
-    return [Prompt(**prompt) for prompt in prompts]
+
+    # Normalize sorting
+    if sort_by not in ["created_at", "likes", "views", "title"]:
+        sort_by, sort_order = "created_at", -1  # Default sort
+    sort_order = -1 if sort_order < 0 else 1
+
+    if after:
+        if skip:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Use either 'after' or 'skip', not both"
+            )
+        try:
+            value, last_id = decode_cursor(after, sort_by, sort_order)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        query.update(keyset_filter(sort_by, sort_order, value, last_id))
+
+    # Only ship the fields the caller is going to render
+    projection = None
+    if field_names:
+        projection = fields_projection(field_names + [sort_by, *VALIDATOR_FIELDS])
+    elif view == "summary":
+        projection = model_projection(PromptSummary)
+
+    def page(projection):
+        if id_list:
+            return fetch_by_ids(db.prompts, id_list, projection, query)
+        # Get prompts with sorting and pagination (id breaks ties so cursors are stable)
+        return page_prompts(db, query, projection, keyset_sort(sort_by, sort_order), skip, limit)
+
+    # Revalidation: answer 304 from a validator projection of the same page
+    variant = str(request.url.query)
+    if has_validators(request):
+        not_modified = revalidate(request, await page(VALIDATOR_PROJECTION), variant)
+        if not_modified:
+            return not_modified
+
+    prompts = await page(projection)
+
+    token = None if id_list else next_cursor(sort_by, sort_order, prompts, limit)
+    headers = validator_headers(*make_validators(prompts, variant))
+    if token:
+        headers[NEXT_CURSOR_HEADER] = token
+    if field_names:
+        # id is part of every sparse fieldset (projections.py)
+        for extra in {sort_by, *VALIDATOR_FIELDS} - {"id", *field_names}:
+            for prompt in prompts:
+                prompt.pop(extra, None)
+        return list_response(prompts, headers)
+    if view == "summary":
+        return trusted_response(PromptSummary, prompts, headers)
+
+    # Our own documents: shaped and rendered without re-validation
+    return trusted_response(Prompt, prompts, headers)
+
+def _ranking_scope(category: Optional[str], tag: Optional[str]) -> None:
+    if category and tag:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Rankings are kept per category or per tag, not both"
+        )
+
+# Declared before /{prompt_id} so the paths are not taken for ids
+@router.get("/trending", response_model=List[RankedPrompt])
+async def get_trending_prompts(
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    # Served from the in-memory leaderboard, no Mongo query
+    _ranking_scope(category, tag)
+    return [RankedPrompt(**entry) for entry in leaderboard.top("trending", category, tag, limit)]
+
+@router.get("/top", response_model=List[RankedPrompt])
+async def get_top_prompts(
+    by: Literal["likes", "views"] = "likes",
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    # Served from the in-memory leaderboard, no Mongo query
+    _ranking_scope(category, tag)
+    return [RankedPrompt(**entry) for entry in leaderboard.top(by, category, tag, limit)]
 
 @router.get("/{prompt_id}", response_model=Prompt)
-async def get_prompt(prompt_id: str, db: AsyncIOMotorDatabase = None):
-    # Increment views
-    await db.prompts.update_one(
-        {"id": prompt_id},
-        {"$inc": {"views": 1}}
-    )
-    
-    prompt = await db.prompts.find_one({"id": prompt_id})
+async def get_prompt(prompt_id: str, request: Request, response: Response, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # A revalidated view still counts as a view
+    not_modified = await revalidate_one(request, db.prompts, {"id": prompt_id}, prompt_counters.apply_pending)
+    if not_modified:
+        prompt_counters.incr(prompt_id, "views")
+        leaderboard.record(prompt_id, "views")
+        return not_modified
+
+    prompt = await find_prompt(db, prompt_id)
     if not prompt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
-    
-    return Prompt(**prompt)
+
+    # Increment views (buffered, flushed in batches)
+    prompt_counters.incr(prompt_id, "views")
+    leaderboard.record(prompt_id, "views")
+    prompt = prompt_counters.apply_pending(prompt)
+    return trusted_response(Prompt, prompt, validator_headers(*make_validators([prompt])))
 
 @router.put("/{prompt_id}", response_model=Prompt)
 async def update_prompt(
     prompt_id: str, 
     prompt_update: PromptUpdate,
-    db: AsyncIOMotorDatabase = None
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     # Filter out None values
     update_data = {k: v for k, v in prompt_update.dict().items() if v is not None}
@@ -78,48 +234,51 @@ async def update_prompt(
             detail="No fields to update"
         )
     
-    # Add updated_at timestamp
-    update_data["updated_at"] = datetime.utcnow()
-    
-    result = await db.prompts.update_one(
-        {"id": prompt_id},
-        {"$set": update_data}
-    )
-    
-    if result.modified_count == 0:
+    # Update and read back in one round trip (updated_at moves only on a real change)
+    outcome = await update_prompt_fields(db, prompt_id, update_data)
+    if not outcome.found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
-    
-    updated = await db.prompts.find_one({"id": prompt_id})
-    return Prompt(**updated)
+    if not outcome.changed:
+        # Same values: nothing to reindex or invalidate
+        return Prompt(**prompt_counters.apply_pending(outcome.document))
+
+    await record_usage_change(db, "prompt", outcome.previous, outcome.document)
+    search_index.index_prompt(outcome.document)
+    leaderboard.add(outcome.document)
+    await response_cache.invalidate("prompts")
+    return Prompt(**prompt_counters.apply_pending(outcome.document))
 
 @router.post("/{prompt_id}/like", response_model=Prompt)
-async def like_prompt(prompt_id: str, db: AsyncIOMotorDatabase = None):
-    # Increment likes
-    result = await db.prompts.update_one(
-        {"id": prompt_id},
-        {"$inc": {"likes": 1}}
-    )
-    
-    if result.modified_count == 0:
+async def like_prompt(prompt_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    prompt = await find_prompt(db, prompt_id)
+    if not prompt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
-    
-    updated = await db.prompts.find_one({"id": prompt_id})
-    return Prompt(**updated)
+
+    # Increment likes (buffered, flushed in batches)
+    prompt_counters.incr(prompt_id, "likes")
+    leaderboard.record(prompt_id, "likes")
+    return Prompt(**prompt_counters.apply_pending(prompt))
 
 @router.delete("/{prompt_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_prompt(prompt_id: str, db: AsyncIOMotorDatabase = None):
-    result = await db.prompts.delete_one({"id": prompt_id})
-    
-    if result.deleted_count == 0:
+async def delete_prompt(prompt_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
+    # find_one_and_delete hands back what the usage counters need in the same round trip
+    deleted = await delete_prompt_by_id(db, prompt_id, USAGE_FIELDS["prompt"])
+
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
+
+    await record_usage_change(db, "prompt", deleted, None)
     
+    search_index.remove("prompt", prompt_id)
+    leaderboard.remove(prompt_id)
+    await response_cache.invalidate("prompts")
     return None
\ No newline at end of file
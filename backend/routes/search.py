@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Query
+from typing import Literal, Optional
+
+from search_engine import search_index
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[Literal["prompt", "blog"]] = None,
+    category: Optional[str] = None,  # prompt category name
+    category_id: Optional[str] = None,  # blog category id
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    prefix: bool = True,  # treat the last term as a prefix (search-as-you-type)
+):
+    # Served entirely from the in-process index, no Mongo round trip
+    return search_index.search(
+        q, kind=type, category=category, category_id=category_id, tag=tag, limit=limit, offset=offset, prefix=prefix
+    )
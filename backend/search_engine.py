@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+# In-process full-text search over prompts and published blog posts.
+# An inverted index (term -> {doc: weighted tf}) ranked with BM25, with prefix
+# expansion of the last query term for search-as-you-type and category/tag
+# facet counts computed in the same pass over the matches. Built once at
+# startup from Mongo and then kept current by the write handlers.
+# Prompts name their category, blog posts reference theirs by id, so the two
+# are filtered and faceted separately (category / category_id).
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset("a an and are as at be by for from in is it of on or that the this to with".split())
+
+# Field weights: a title hit counts more than a body hit
+PROMPT_FIELDS = {"title": 3.0, "description": 2.0, "prompt_text": 1.0, "tags": 2.0}
+BLOG_FIELDS = {"title": 3.0, "excerpt": 2.0, "content": 1.0, "tags": 2.0}
+
+MAX_PREFIX_EXPANSIONS = 50
+PUBLISHED = "published"
+
+DocKey = Tuple[str, str]  # (kind, id)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value) if value else ""
+
+
+class SearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[DocKey, float]] = defaultdict(dict)
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups
+        self._bulk = False  # build(): vocabulary sorted once at the end
+        self._docs: Dict[DocKey, Dict[str, Any]] = {}
+        self._total_length = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # -- maintenance ---------------------------------------------------------
+
+    def add(self, kind: str, doc: Dict[str, Any], fields: Dict[str, float]) -> None:
+        key = (kind, doc["id"])
+        self.remove(kind, doc["id"])
+
+        weighted: Counter = Counter()
+        for field, weight in fields.items():
+            for term in tokenize(_field_text(doc.get(field))):
+                weighted[term] += weight
+        length = sum(weighted.values())
+
+        for term, tf in weighted.items():
+            if term not in self._postings and not self._bulk:
+                bisect.insort(self._vocabulary, term)
+            self._postings[term][key] = tf
+
+        self._docs[key] = {
+            "kind": kind,
+            "id": doc["id"],
+            "title": doc.get("title", ""),
+            "category": doc.get("category"),
+            "category_id": doc.get("category_id"),
+            "tags": list(doc.get("tags") or []),
+            "terms": list(weighted),
+            "length": length,
+        }
+        self._total_length += length
+
+    def remove(self, kind: str, doc_id: str) -> None:
+        meta = self._docs.pop((kind, doc_id), None)
+        if meta is None:
+            return
+        self._total_length -= meta["length"]
+        for term in meta["terms"]:
+            postings = self._postings[term]
+            postings.pop((kind, doc_id), None)
+            if not postings:
+                del self._postings[term]
+                i = bisect.bisect_left(self._vocabulary, term)
+                if i < len(self._vocabulary) and self._vocabulary[i] == term:
+                    del self._vocabulary[i]
+
+    def index_prompt(self, doc: Dict[str, Any]) -> None:
+        self.add("prompt", doc, PROMPT_FIELDS)
+
+    def index_blog_post(self, doc: Dict[str, Any]) -> None:
+        # Drafts and archived posts are not searchable
+        status = doc.get("status")
+        status = getattr(status, "value", status)
+        if status == PUBLISHED:
+            self.add("blog", doc, BLOG_FIELDS)
+        else:
+            self.remove("blog", doc["id"])
+
+    async def build(self, db: AsyncIOMotorDatabase) -> None:
+        # Build off to the side and swap in, so queries never see a half-built index
+        fresh = SearchIndex(self.k1, self.b)
+        fresh._bulk = True
+        projection = {"_id": 0, "id": 1, "category": 1, **{f: 1 for f in PROMPT_FIELDS}}
+        async for doc in db.prompts.find({}, projection):
+            fresh.index_prompt(doc)
+        projection = {"_id": 0, "id": 1, "status": 1, "category_id": 1, **{f: 1 for f in BLOG_FIELDS}}
+        async for doc in db.blog_posts.find({"status": PUBLISHED}, projection):
+            fresh.index_blog_post(doc)
+        # One sort instead of an insort per new term
+        fresh._vocabulary = sorted(fresh._postings)
+        for attr in ("_postings", "_vocabulary", "_docs", "_total_length"):
+            setattr(self, attr, getattr(fresh, attr))
+        logger.info("Search index built: %d documents, %d terms", len(self._docs), len(self._vocabulary))
+
+    async def _refresh(self, db: AsyncIOMotorDatabase, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.build(db)
+            except Exception as e:
+                logger.warning("Search index refresh failed: %s", e)
+
+    def start_refresh(self, db: AsyncIOMotorDatabase, interval: float) -> None:
+        if interval > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh(db, interval))
+
+    async def stop_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    # -- querying ------------------------------------------------------------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix) and len(terms) < MAX_PREFIX_EXPANSIONS:
+            terms.append(self._vocabulary[i])
+            i += 1
+        return terms
+
+    def search(
+        self,
+        query: str,
+        kind: Optional[str] = None,
+        category: Optional[str] = None,
+        category_id: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+        prefix: bool = True,
+    ) -> Dict[str, Any]:
+        terms = tokenize(query)
+        # The last term may still be being typed
+        groups: List[Iterable[str]] = [[t] for t in terms]
+        if prefix and terms:
+            groups[-1] = self._expand_prefix(terms[-1]) or [terms[-1]]
+
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs if n_docs else 0.0
+        scores: Dict[DocKey, float] = defaultdict(float)
+        for group in groups:
+            for term in group:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = 1 - self.b + self.b * (self._docs[key]["length"] / avg_length if avg_length else 0)
+                    scores[key] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        hits = []
+        category_facets: Counter = Counter()
+        category_id_facets: Counter = Counter()
+        tag_facets: Counter = Counter()
+        for key, score in scores.items():
+            meta = self._docs[key]
+            if kind and meta["kind"] != kind:
+                continue
+            if category and meta["category"] != category:
+                continue
+            if category_id and meta["category_id"] != category_id:
+                continue
+            if tag and tag not in meta["tags"]:
+                continue
+            if meta["category"]:
+                category_facets[meta["category"]] += 1
+            if meta["category_id"]:
+                category_id_facets[meta["category_id"]] += 1
+            tag_facets.update(meta["tags"])
+            hits.append((score, meta))
+
+        # Only the requested window needs ordering
+        top = heapq.nsmallest(offset + limit, hits, key=lambda hit: (-hit[0], hit[1]["id"]))
+        return {
+            "total": len(hits),
+            "hits": [
+                {
+                    "type": meta["kind"],
+                    "id": meta["id"],
+                    "title": meta["title"],
+                    "category": meta["category"],
+                    "category_id": meta["category_id"],
+                    "tags": meta["tags"],
+                    "score": round(score, 4),
+                }
+                for score, meta in top[offset:]
+            ],
+            "facets": {
+                "category": dict(category_facets.most_common()),
+                "category_id": dict(category_id_facets.most_common()),
+                "tags": dict(tag_facets.most_common()),
+            },
+        }
+
+
+search_index = SearchIndex()
@@ -1,9 +1,10 @@
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, Response
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -19,35 +20,116 @@ from models import (
 )
 
 # Import route modules
-from routes import newsletter, contact, prompts
+from routes import newsletter, contact, prompts, search, bundles
+from dependencies import get_db, set_db
+from indexes import ensure_indexes
+from storage import storage_database
+from repositories import MemoryClient
+from counters import prompt_counters
+from cache import configure_cache, response_cache
+from search_engine import search_index
+from leaderboard import leaderboard
+from jobs import job_queue
+from notifications import configure_notifications
+from campaigns import campaign_sender
+from metrics import MetricsMiddleware, mongo_event_listeners, render_metrics
+from fastjson import FastJSONResponse
+from ratelimit import RateLimitMiddleware, create_backend as create_rate_limit_backend
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, created lazily per worker process in the startup hook
+# (a client built at import time would be shared across forked workers)
+mongo_url = os.environ.get('MONGO_URL')
+client: AsyncIOMotorClient = None
+db: AsyncIOMotorDatabase = None
 
-# Dependency to get the database
-async def get_db() -> AsyncIOMotorDatabase:
-    return db
+# Number of uvicorn worker processes (exported by entrypoint.sh). Workers share
+# Mongo and nothing else; per process are:
+# - the search index (rebuilt every SEARCH_REFRESH_SECONDS, default 60 with
+#   several workers) and the leaderboard (LEADERBOARD_REFRESH_SECONDS);
+# - the memory response cache: a write only invalidates its own worker, the
+#   others serve their copy until CACHE_TTL_SECONDS (CACHE_BACKEND=redis to share);
+# - memory rate-limit buckets, i.e. N workers allow N times the limit
+#   (RATE_LIMIT_BACKEND=redis to share);
+# - buffered counters, subscribe coalescing and the job/campaign runners, which
+#   coordinate through Mongo and need nothing shared.
+BACKEND_WORKERS = int(os.environ.get('BACKEND_WORKERS', '1'))
+
+# "mongo" (default) or "memory": in-process collections (repositories.py) for
+# tests and small single-worker deployments; nothing is persisted
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    if STORAGE_BACKEND == 'memory':
+        if BACKEND_WORKERS > 1:
+            # Every worker would hold its own, diverging copy of the data
+            raise RuntimeError("STORAGE_BACKEND=memory needs BACKEND_WORKERS=1")
+        return MemoryClient()
+    if not mongo_url:
+        raise RuntimeError("MONGO_URL is required with STORAGE_BACKEND=mongo")
+    # Pool sizing is per worker: total connections = workers * MONGO_MAX_POOL_SIZE
+    return AsyncIOMotorClient(
+        mongo_url,
+        maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        maxIdleTimeMS=int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000')),
+        waitQueueTimeoutMS=int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+        serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        connectTimeoutMS=int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '10000')),
+        socketTimeoutMS=int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000')),
+        # Command durations and pool stats for /api/metrics
+        event_listeners=mongo_event_listeners(),
+    )
 
 # Create the main app without a prefix
 app = FastAPI(
+    # orjson for everything FastAPI serializes itself (see fastjson.py)
+    default_response_class=FastJSONResponse,
     title="GenAI Portfolio API",
     description="API for Luca De Angelis GenAI Portfolio and Blog",
     version="1.0.0"
 )
 
+app.state.ready = False
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Probes: liveness never touches Mongo, readiness is a single ping
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout=2)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+    return {"status": "ready"}
+
 # Legacy status check routes
 @api_router.get("/")
 async def root():
     return {"message": "Hello from Luca De Angelis GenAI API"}
 
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return response_cache.stats()
+
+@api_router.get("/jobs/stats")
+async def get_job_stats():
+    return await job_queue.stats()
+
+@api_router.get("/metrics")
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     status_dict = input.dict()
@@ -60,34 +142,79 @@ async def get_status_checks(db: AsyncIOMotorDatabase = Depends(get_db)):
     status_checks = await db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
-# Add the route dependencies for DB
-async def inject_db_dependency(route):
-    if hasattr(route, "endpoint"):
-        if "db" in route.endpoint.__annotations__:
-            # Add our dependency
-            if not hasattr(route, "dependencies"):
-                route.dependencies = []
-            route.dependencies.append(Depends(get_db))
-    
-    # Process child routes if any
-    if hasattr(route, "routes"):
-        for child_route in route.routes:
-            await inject_db_dependency(child_route)
-
 # Include the router modules with their prefixes
 api_router.include_router(newsletter.router)
 api_router.include_router(contact.router)
 api_router.include_router(prompts.router)
+api_router.include_router(search.router)
+api_router.include_router(bundles.router)
 
 # Include the main router in the app
 app.include_router(api_router)
 
-# Add DB dependency to all routes
 @app.on_event("startup")
 async def startup_db_client():
-    # Add DB dependency to all routes that need it
-    for route in app.routes:
-        await inject_db_dependency(route)
+    global client, db
+    client = create_mongo_client()
+    # ID_STORAGE=uuid stores the application id as a binary UUID _id (storage.py)
+    db = storage_database(client[os.environ['DB_NAME']])
+    # Routers get it through Depends(get_db)
+    set_db(db)
+
+    # Response cache for read endpoints (memory, redis or off)
+    configure_cache(
+        backend=os.environ.get('CACHE_BACKEND', 'memory'),
+        ttl=float(os.environ.get('CACHE_TTL_SECONDS', '60')),
+        max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', '1024')),
+        redis_url=os.environ.get('CACHE_REDIS_URL'),
+    )
+
+    # Make sure every hot lookup is backed by an index
+    app.state.index_report = await ensure_indexes(db)
+
+    # Start the write-behind flusher for prompt view/like counters
+    prompt_counters.flush_interval = float(os.environ.get('COUNTER_FLUSH_INTERVAL', '1.0'))
+    prompt_counters.max_pending = int(os.environ.get('COUNTER_FLUSH_MAX_PENDING', '500'))
+    prompt_counters.start(db)
+
+    # Load the full-text search index; write handlers keep it current from here on.
+    # With several workers each holds its own copy, so periodically rebuild to
+    # pick up writes served by the other workers.
+    await search_index.build(db)
+    search_refresh = os.environ.get('SEARCH_REFRESH_SECONDS', '60' if BACKEND_WORKERS > 1 else '0')
+    search_index.start_refresh(db, float(search_refresh))
+
+    # Trending/top prompt rankings, fed by the view and like handlers. The
+    # rebuild resyncs likes/views counted by other workers.
+    leaderboard.size = int(os.environ.get('LEADERBOARD_SIZE', '100'))
+    leaderboard.half_life = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24')) * 3600
+    await leaderboard.build(db)
+    leaderboard.start_refresh(db, float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', '300')))
+
+    # Background jobs (notification emails); EMAIL_BACKEND=stub only logs
+    configure_notifications(
+        backend=os.environ.get('EMAIL_BACKEND', 'stub'),
+        sender=os.environ.get('EMAIL_FROM'),
+        region=os.environ.get('AWS_REGION'),
+        recipient=os.environ.get('CONTACT_NOTIFY_EMAIL'),
+    )
+    job_queue.concurrency = int(os.environ.get('JOB_CONCURRENCY', '4'))
+    job_queue.max_attempts = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+    job_queue.retention = float(os.environ.get('JOB_RETENTION_HOURS', '168')) * 3600
+    job_queue.start(db)
+
+    # Newsletter campaigns run as jobs; pacing for the fan-out
+    campaign_sender.rate = float(os.environ.get('NEWSLETTER_SEND_RATE', '500'))
+    campaign_sender.concurrency = int(os.environ.get('NEWSLETTER_SEND_CONCURRENCY', '50'))
+    campaign_sender.batch_size = int(os.environ.get('NEWSLETTER_BATCH_SIZE', '1000'))
+    campaign_sender.unsubscribe_url = os.environ.get('NEWSLETTER_UNSUBSCRIBE_URL', '')
+
+    if BACKEND_WORKERS > 1:
+        for setting, default in (('CACHE_BACKEND', 'memory'), ('RATE_LIMIT_BACKEND', 'memory')):
+            if os.environ.get(setting, default) == 'memory':
+                logger.warning("%s=memory is per worker; %d workers do not share it", setting, BACKEND_WORKERS)
+
+    app.state.ready = True
 
 app.add_middleware(
     CORSMiddleware,
@@ -95,8 +222,22 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-IP / per-email limits on the public write endpoints
+app.add_middleware(
+    RateLimitMiddleware,
+    backend=create_rate_limit_backend(
+        os.environ.get('RATE_LIMIT_BACKEND', 'memory'), os.environ.get('RATE_LIMIT_REDIS_URL')
+    ),
+    trust_forwarded=os.environ.get('RATE_LIMIT_TRUST_FORWARDED', 'false') == 'true',
+    enabled=os.environ.get('RATE_LIMIT_BACKEND', 'memory') != 'off',
+)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -106,4 +247,10 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.ready = False
+    # Flush buffered counters before the connection goes away
+    await prompt_counters.stop()
+    await search_index.stop_refresh()
+    await leaderboard.stop_refresh()
+    await job_queue.stop()
     client.close()
@@ -0,0 +1,254 @@
+import copy
+import os
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from bson.binary import Binary, UuidRepresentation
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+# Id storage modes.
+#
+# "field" (default, legacy): documents carry the application `id` (a uuid4
+# string) next to Mongo's own ObjectId `_id`, so point lookups need a second
+# unique index on `id`.
+#
+# "uuid": the application id *is* `_id`, stored as a 16-byte binary UUID
+# (subtype 4). Point lookups hit the primary index and documents and indexes
+# shrink. Nothing above this module changes: StorageDatabase hands out
+# collection wrappers that translate `id` <-> `_id` in filters, projections,
+# sorts, inserts, bulk operations and in the documents coming back, so routers
+# keep using {"id": ...} and always see `id` as a string.
+#
+# Existing data is converted with `python migrate_ids.py` (see there for the
+# rollout order).
+
+FIELD = "field"
+UUID = "uuid"
+
+ID_STORAGE = os.environ.get("ID_STORAGE", FIELD)
+
+# Collections whose documents are addressed by their application id
+ID_COLLECTIONS = frozenset({"prompts", "blog_posts", "categories", "tags", "users", "contact_submissions"})
+
+
+def to_binary(value: Any) -> Any:
+    # Anything that is not a valid uuid string is left alone; it then simply
+    # matches nothing, like an unknown id always did
+    if isinstance(value, str):
+        try:
+            return Binary.from_uuid(uuid.UUID(value), UuidRepresentation.STANDARD)
+        except ValueError:
+            return value
+    return value
+
+
+def from_binary(value: Any) -> Any:
+    if isinstance(value, Binary) and value.subtype == 4:
+        return str(value.as_uuid(UuidRepresentation.STANDARD))
+    return value
+
+
+def _id_value(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {op: _id_value(v) for op, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_binary(v) for v in value]
+    return to_binary(value)
+
+
+def translate_filter(query: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    if query is None:
+        return None
+    translated: Dict[str, Any] = {}
+    for key, value in query.items():
+        if key == "id":
+            translated["_id"] = _id_value(value)
+        elif key in ("$or", "$and", "$nor"):
+            translated[key] = [translate_filter(clause) for clause in value]
+        else:
+            translated[key] = value
+    return translated
+
+
+def translate_projection(projection: Any) -> Any:
+    if projection is None:
+        return None
+    if isinstance(projection, (list, tuple)):
+        projection = {name: 1 for name in projection}
+    fields = {k: v for k, v in projection.items() if k not in ("_id", "id")}
+    inclusion = any(bool(v) for v in fields.values())
+    wants_id = bool(projection.get("id")) if inclusion else "id" not in projection or bool(projection["id"])
+    if inclusion:
+        fields["_id"] = 1 if wants_id else 0
+    elif not wants_id:
+        fields["_id"] = 0
+    return fields or None
+
+
+def translate_sort(sort: Any) -> Any:
+    if isinstance(sort, str):
+        return "_id" if sort == "id" else sort
+    if isinstance(sort, (list, tuple)):
+        return [("_id" if key == "id" else key, direction) for key, direction in sort]
+    return sort
+
+
+def to_storage(doc: Mapping[str, Any]) -> Dict[str, Any]:
+    stored = {k: v for k, v in doc.items() if k != "id"}
+    if "id" in doc:
+        stored["_id"] = to_binary(doc["id"])
+    return stored
+
+
+def from_storage(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if doc is None or "_id" not in doc:
+        return doc
+    doc["id"] = from_binary(doc.pop("_id"))
+    return doc
+
+
+def translate_update(update: Any) -> Any:
+    # `id` never changes; only drop it from $set / $setOnInsert so an upsert
+    # takes its _id from the filter
+    if isinstance(update, Mapping):
+        return {op: ({k: v for k, v in fields.items() if k != "id"} if isinstance(fields, Mapping) else fields)
+                for op, fields in update.items()}
+    return update
+
+
+def translate_operation(op: Any) -> Any:
+    op = copy.copy(op)
+    if isinstance(op, (UpdateOne, UpdateMany, DeleteOne, DeleteMany, ReplaceOne)):
+        op._filter = translate_filter(op._filter)
+    if isinstance(op, (UpdateOne, UpdateMany)):
+        op._doc = translate_update(op._doc)
+    elif isinstance(op, (InsertOne, ReplaceOne)):
+        op._doc = to_storage(op._doc)
+    return op
+
+
+def translate_index_keys(keys: Sequence[Tuple[str, int]]) -> Optional[List[Tuple[str, int]]]:
+    # A unique index on `id` alone is the primary index now
+    if [key for key, _ in keys] == ["id"]:
+        return None
+    return [("_id" if key == "id" else key, direction) for key, direction in keys]
+
+
+class StorageCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list, direction=None):
+        if direction is None:
+            self._cursor = self._cursor.sort(translate_sort(key_or_list))
+        else:
+            self._cursor = self._cursor.sort(translate_sort(key_or_list), direction)
+        return self
+
+    def skip(self, n: int):
+        self._cursor = self._cursor.skip(n)
+        return self
+
+    def limit(self, n: int):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    def batch_size(self, n: int):
+        self._cursor = self._cursor.batch_size(n)
+        return self
+
+    async def to_list(self, length: Optional[int]):
+        return [from_storage(doc) for doc in await self._cursor.to_list(length)]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return from_storage(await self._cursor.__anext__())
+
+
+class StorageCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        if "sort" in kwargs:
+            kwargs["sort"] = translate_sort(kwargs["sort"])
+        return StorageCursor(self._collection.find(translate_filter(filter or {}), translate_projection(projection), *args, **kwargs))
+
+    async def find_one(self, filter=None, projection=None, *args, **kwargs):
+        return from_storage(await self._collection.find_one(translate_filter(filter or {}), translate_projection(projection), *args, **kwargs))
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, **kwargs):
+        return from_storage(await self._collection.find_one_and_update(
+            translate_filter(filter), translate_update(update), translate_projection(projection), sort=translate_sort(sort), **kwargs
+        ))
+
+    async def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        return from_storage(await self._collection.find_one_and_delete(
+            translate_filter(filter), translate_projection(projection), sort=translate_sort(sort), **kwargs
+        ))
+
+    async def insert_one(self, document, **kwargs):
+        return await self._collection.insert_one(to_storage(document), **kwargs)
+
+    async def insert_many(self, documents, **kwargs):
+        return await self._collection.insert_many([to_storage(doc) for doc in documents], **kwargs)
+
+    async def update_one(self, filter, update, **kwargs):
+        return await self._collection.update_one(translate_filter(filter), translate_update(update), **kwargs)
+
+    async def update_many(self, filter, update, **kwargs):
+        return await self._collection.update_many(translate_filter(filter), translate_update(update), **kwargs)
+
+    async def delete_one(self, filter, **kwargs):
+        return await self._collection.delete_one(translate_filter(filter), **kwargs)
+
+    async def delete_many(self, filter, **kwargs):
+        return await self._collection.delete_many(translate_filter(filter), **kwargs)
+
+    async def count_documents(self, filter, **kwargs):
+        return await self._collection.count_documents(translate_filter(filter), **kwargs)
+
+    async def bulk_write(self, requests, **kwargs):
+        return await self._collection.bulk_write([translate_operation(op) for op in requests], **kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        # Only $match stages are rewritten; outputs are left as they are
+        # ($group reuses `_id` for its own keys)
+        stages = [{"$match": translate_filter(stage["$match"])} if "$match" in stage else stage for stage in pipeline]
+        return self._collection.aggregate(stages, **kwargs)
+
+
+class StorageDatabase:
+    def __init__(self, db: AsyncIOMotorDatabase, collections: frozenset = ID_COLLECTIONS):
+        self._db = db
+        self._collections = collections
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> Any:
+        collection = self._db[name]
+        return StorageCollection(collection) if name in self._collections else collection
+
+    async def command(self, *args, **kwargs):
+        return await self._db.command(*args, **kwargs)
+
+
+def storage_database(db: AsyncIOMotorDatabase, mode: str = ID_STORAGE) -> AsyncIOMotorDatabase:
+    if mode == UUID:
+        return StorageDatabase(db)
+    return db
+
+
+def index_keys(collection: str, keys: Sequence[Tuple[str, int]], mode: str = ID_STORAGE) -> Optional[List[Tuple[str, int]]]:
+    if mode == UUID and collection in ID_COLLECTIONS:
+        return translate_index_keys(keys)
+    return list(keys)
@@ -0,0 +1,116 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from db_utils import UpdateOutcome, update_and_fetch
+
+# Per-collection data access for the routers.
+#
+# Each function is one query against one collection of whatever get_db hands
+# out (Motor, storage.py's wrapper or repositories.MemoryDatabase), so the
+# filters, projections and sorts a router relies on live here rather than in
+# the handlers. Generic helpers that work on any collection (bulk.py,
+# loaders.fetch_by_ids, conditional.revalidate_one, exports.export_response)
+# still take the collection object.
+
+
+# ---------------------------------------------------------------- prompts
+
+async def insert_prompt(db: AsyncIOMotorDatabase, prompt: Dict[str, Any]) -> None:
+    await db.prompts.insert_one(prompt)
+
+
+async def find_prompt(db: AsyncIOMotorDatabase, prompt_id: str) -> Optional[Dict[str, Any]]:
+    return await db.prompts.find_one({"id": prompt_id})
+
+
+async def find_prompts(db: AsyncIOMotorDatabase, prompt_ids: Iterable[str]) -> List[Dict[str, Any]]:
+    return [doc async for doc in db.prompts.find({"id": {"$in": list(prompt_ids)}}, {"_id": 0})]
+
+
+async def page_prompts(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    projection: Optional[Dict[str, Any]],
+    sort: List[tuple],
+    skip: int,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    cursor = db.prompts.find(query, projection).sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    return await cursor.limit(limit).to_list(limit)
+
+
+async def update_prompt_fields(db: AsyncIOMotorDatabase, prompt_id: str, update_data: Dict[str, Any]) -> UpdateOutcome:
+    return await update_and_fetch(db.prompts, {"id": prompt_id}, update_data)
+
+
+async def delete_prompt_by_id(
+    db: AsyncIOMotorDatabase, prompt_id: str, fields: Iterable[str]
+) -> Optional[Dict[str, Any]]:
+    # Hands back `fields` of the deleted prompt, None if there was none
+    return await db.prompts.find_one_and_delete(
+        {"id": prompt_id}, projection={"_id": 0, **{field: 1 for field in fields}}
+    )
+
+
+# ---------------------------------------------------------------- newsletter
+
+async def upsert_subscriber(
+    db: AsyncIOMotorDatabase, email: str, update: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    # Returns the pre-image, None when the upsert created the subscriber
+    return await db.newsletter_subscribers.find_one_and_update(
+        {"email": email},
+        update,
+        upsert=True,
+        projection={"_id": False},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+
+async def bulk_write_subscribers(db: AsyncIOMotorDatabase, ops: List[Any]):
+    return await db.newsletter_subscribers.bulk_write(ops, ordered=False)
+
+
+async def deactivate_subscriber(db: AsyncIOMotorDatabase, email: str) -> bool:
+    # False if there is no such subscriber; an inactive one still counts
+    result = await db.newsletter_subscribers.update_one({"email": email}, {"$set": {"is_active": False}})
+    return result.matched_count > 0
+
+
+async def list_subscribers(db: AsyncIOMotorDatabase, active_only: bool, limit: int = 1000) -> List[Dict[str, Any]]:
+    query = {"is_active": True} if active_only else {}
+    return await db.newsletter_subscribers.find(query).to_list(limit)
+
+
+async def insert_campaign(db: AsyncIOMotorDatabase, campaign: Dict[str, Any]) -> None:
+    await db.newsletter_campaigns.insert_one(campaign)
+
+
+async def find_campaign(
+    db: AsyncIOMotorDatabase, campaign_id: str, projection: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    return await db.newsletter_campaigns.find_one({"id": campaign_id}, projection)
+
+
+async def transition_campaign(db: AsyncIOMotorDatabase, campaign_id: str, from_status: str, to_status: str) -> UpdateOutcome:
+    # Not found when the campaign is missing or not in from_status
+    return await update_and_fetch(db.newsletter_campaigns, {"id": campaign_id, "status": from_status}, {"status": to_status})
+
+
+# ---------------------------------------------------------------- contact
+
+async def insert_submission(db: AsyncIOMotorDatabase, submission: Dict[str, Any]) -> None:
+    await db.contact_submissions.insert_one(submission)
+
+
+async def list_submissions(db: AsyncIOMotorDatabase, status: Optional[str], limit: int = 1000) -> List[Dict[str, Any]]:
+    query = {"status": status} if status else {}
+    return await db.contact_submissions.find(query).sort("created_at", -1).to_list(limit)
+
+
+async def set_submission_status(db: AsyncIOMotorDatabase, submission_id: str, status: str) -> UpdateOutcome:
+    return await update_and_fetch(db.contact_submissions, {"id": submission_id}, {"status": status})
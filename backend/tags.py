@@ -1,13 +1,30 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Request, Response
+from pymongo.errors import DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 # Assuming a get_db dependency for database connection, and get_current_active_user for auth
 # from ..dependencies import get_db, get_current_active_user, User # User for role checks
+from ..db_utils import update_and_fetch
+from ..bulk import (
+    BulkReport, bulk_delete, bulk_insert, bulk_update, read_items, split_delete_items, split_update_items,
+    validate_items
+)
+from ..cache import cached, response_cache
+from ..conditional import (
+    VALIDATOR_PROJECTION, has_validators, make_validators, revalidate, revalidate_one, validator_headers
+)
+from ..fastjson import trusted_response
 from ..models import Tag, TagCreate, TagUpdate, UserRole, User # User and UserRole for permission checks
+from ..usage import current_counts, recount_renamed
+from ..loaders import fetch_by_ids, parse_ids
 
 router = APIRouter(prefix="/tags", tags=["tags"])
 
+# Tag plus its materialized usage count (see usage.py)
+class TagWithUsage(Tag):
+    usage_count: int = 0
+
 # Placeholder for database dependency
 async def get_db_placeholder():
     pass
@@ -29,40 +46,139 @@ async def create_tag(
     # Check if tag with same name and type already exists
     existing_tag = await db.tags.find_one({"name": tag_data.name, "type": tag_data.type})
     if existing_tag:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tag 
-        {tag_data.name}
-         already exists for type 
-        {tag_data.type}
-        ")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tag '{tag_data.name}' already exists for type '{tag_data.type}'")
 
     new_tag = Tag(**tag_data.dict())
-    await db.tags.insert_one(new_tag.dict())
+    new_doc = new_tag.dict()
+    # Tags are referenced by name, so one may already be in use
+    counts = await current_counts(db, "tag", new_doc["type"], [new_doc["name"]])
+    new_doc["usage_count"] = counts.get(new_doc["name"], 0)
+    await db.tags.insert_one(new_doc)
+    await response_cache.invalidate("tags")
     return new_tag
 
-@router.get("/", response_model=List[Tag])
+@router.post("/bulk")
+async def bulk_create_tags(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to create tags")
+
+    # JSON array or NDJSON of TagCreate objects; (name, type) must be unique
+    valid, errors = validate_items(await read_items(request), TagCreate)
+    report = BulkReport(errors)
+    docs = [(index, {**Tag(**item.dict()).dict(), "usage_count": 0}) for index, item in valid]
+    # Starting usage counts: one aggregation per type
+    for doc_type in {doc["type"] for _, doc in docs}:
+        names = [doc["name"] for _, doc in docs if doc["type"] == doc_type]
+        counts = await current_counts(db, "tag", doc_type, names)
+        for _, doc in docs:
+            if doc["type"] == doc_type:
+                doc["usage_count"] = counts.get(doc["name"], 0)
+    await bulk_insert(
+        db.tags, docs, report,
+        unique_key=lambda doc: (doc["name"], doc["type"]),
+        unique_query=lambda docs: {"name": {"$in": list({doc["name"] for doc in docs})}},
+    )
+    await response_cache.invalidate("tags")
+    return report.to_dict()
+
+@router.patch("/bulk")
+async def bulk_update_tags(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update tags")
+
+    # Name collisions surface per item as errors from the unique (name, type) index
+    updates, report = split_update_items(await read_items(request), TagUpdate)
+    previous = await bulk_update(db.tags, updates, report, fields=["name", "type"])
+    renamed = [
+        {"id": doc_id, "type": fields.get("type", previous[doc_id].get("type")), "name": fields["name"]}
+        for _, doc_id, fields in updates
+        if doc_id in previous and "name" in fields and fields["name"] != previous[doc_id].get("name")
+    ]
+    await recount_renamed(db, "tag", renamed)
+    await response_cache.invalidate("tags")
+    return report.to_dict()
+
+@router.post("/bulk/delete")
+async def bulk_delete_tags(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder),
+    current_user: User = Depends(get_current_user_placeholder)
+):
+    if current_user.role not in [UserRole.ADMIN, UserRole.EDITOR]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete tags")
+
+    report = BulkReport()
+    await bulk_delete(db.tags, split_delete_items(await read_items(request)), report)
+    await response_cache.invalidate("tags")
+    return report.to_dict()
+
+@router.get("/", response_model=List[TagWithUsage])
+@cached("tags:list", tags=["tags"])
 async def get_tags(
+    request: Request,
+    response: Response,
     type: Optional[str] = None, # Filter by 'blog' or 'prompt'
     limit: int = Query(100, ge=1, le=500),
     skip: int = Query(0, ge=0),
+    sort_by: Literal["popularity", "name"] = "popularity",
+    ids: Optional[str] = None,  # batch fetch, e.g. "id1,id2" (in that order, one $in query)
     db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
 ):
+    try:
+        id_list = parse_ids(ids) if ids else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if id_list and skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'ids' can't be combined with 'skip'")
+
     query = {}
     if type:
         query["type"] = type
     
-    cursor = db.tags.find(query).skip(skip).limit(limit)
-    tags = await cursor.to_list(limit)
-    return [Tag(**t) for t in tags]
+    # Most used first, served by the (type, usage_count) index
+    sort = [("usage_count", -1), ("name", 1)] if sort_by == "popularity" else [("name", 1)]
+
+    def page(projection):
+        if id_list:
+            return fetch_by_ids(db.tags, id_list, projection, query)
+        return db.tags.find(query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
+
+    variant = str(request.url.query)
+    if has_validators(request):
+        not_modified = revalidate(request, await page(VALIDATOR_PROJECTION), variant)
+        if not_modified:
+            return not_modified
+
+    tags = await page(None)
+    return trusted_response(TagWithUsage, tags, validator_headers(*make_validators(tags, variant)))
+
+@router.get("/{tag_id}", response_model=TagWithUsage)
+@cached("tags:item", tags=["tags"])
+async def get_tag(
+    tag_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncIOMotorDatabase = Depends(get_db_placeholder)
+):
+    not_modified = await revalidate_one(request, db.tags, {"id": tag_id})
+    if not_modified:
+        return not_modified
 
-@router.get("/{tag_id}", response_model=Tag)
-async def get_tag(tag_id: str, db: AsyncIOMotorDatabase = Depends(get_db_placeholder)):
     tag = await db.tags.find_one({"id": tag_id})
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tag not found"
         )
-    return Tag(**tag)
+    return trusted_response(TagWithUsage, tag, validator_headers(*make_validators([tag])))
 
 @router.put("/{tag_id}", response_model=Tag)
 async def update_tag(
@@ -82,37 +198,27 @@ async def update_tag(
             detail="No fields to update"
         )
 
-    # Check for name collision if name is being updated
-    if "name" in update_data:
-        current_tag = await db.tags.find_one({"id": tag_id})
-        if current_tag:
-            existing_tag = await db.tags.find_one({"name": update_data["name"], "type": current_tag["type"], "id": {"$ne": tag_id}})
-            if existing_tag:
-                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tag name 
-                 {update_data['name']}
-                  already exists for type 
-                 {current_tag['type']}
-                 ")
-        else:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
-
-    result = await db.tags.update_one(
-        {"id": tag_id},
-        {"$set": update_data}
-    )
+    # Name collisions are caught by the unique (name, type) index, so the
+    # update is a single round trip with no existence/collision pre-checks
+    try:
+        outcome = await update_and_fetch(db.tags, {"id": tag_id}, update_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tag name '{update_data['name']}' already exists for this type")
+
+    if not outcome.found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
 
-    if result.modified_count == 0:
-        existing_t = await db.tags.find_one({"id": tag_id})
-        if not existing_t:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tag not found"
-            )
+    # Tags are referenced by name: re-point the count on rename
+    if "name" in update_data and outcome.previous.get("name") != update_data["name"]:
+        counts = await current_counts(db, "tag", outcome.document["type"], [update_data["name"]])
+        outcome.document["usage_count"] = counts.get(update_data["name"], 0)
+        await db.tags.update_one({"id": tag_id}, {"$set": {"usage_count": outcome.document["usage_count"]}})
 
-    updated_tag = await db.tags.find_one({"id": tag_id})
-    if not updated_tag:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found after update attempt")
-    return Tag(**updated_tag)
+    await response_cache.invalidate("tags")
+    return Tag(**outcome.document)
 
 @router.delete("/{tag_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_tag(
@@ -134,5 +240,6 @@ async def delete_tag(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tag not found"
         )
+    await response_cache.invalidate("tags")
     return None
 
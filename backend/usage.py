@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Materialized category/tag usage counts.
+# Every category and tag document carries a `usage_count` for its own type
+# (blog or prompt), so tag clouds and category filters are one indexed read
+# sorted by popularity. The prompt and blog write handlers pass the before/after
+# images of what they changed and only the difference is applied, as $inc.
+# A count change drops the cached category/tag lists and bundles; the $inc
+# leaves updated_at alone, so usage_count is part of the ETag (conditional.py).
+# `python usage.py` recomputes everything from scratch for repair.
+#
+# Prompts reference categories and tags by name; blog posts reference their
+# category by id and tags by name, and only count while published.
+
+PUBLISHED = "published"
+USAGE_FIELDS = {"prompt": ["category", "tags"], "blog": ["category_id", "tags", "status"]}
+
+Contribution = Tuple[str, str]  # ("category" | "tag", key)
+
+
+def _contributions(source: str, doc: Optional[Dict[str, Any]]) -> Counter:
+    counts: Counter = Counter()
+    if not doc:
+        return counts
+    if source == "blog":
+        status = doc.get("status")
+        if getattr(status, "value", status) != PUBLISHED:
+            return counts
+        category = doc.get("category_id")
+    else:
+        category = doc.get("category")
+    if category:
+        counts[("category", category)] += 1
+    for tag in set(doc.get("tags") or []):
+        counts[("tag", tag)] += 1
+    return counts
+
+
+def _category_filter(source: str, key: str) -> Dict[str, Any]:
+    if source == "blog":
+        return {"id": key}
+    return {"name": key, "type": source}
+
+
+async def record_usage_changes(db: AsyncIOMotorDatabase, source: str, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> None:
+    # changes: (before, after) pairs; None before = created, None after = deleted
+    delta: Counter = Counter()
+    for before, after in changes:
+        delta.update(_contributions(source, after))
+        delta.subtract(_contributions(source, before))
+
+    category_ops, tag_ops = [], []
+    for (kind, key), amount in delta.items():
+        if not amount:
+            continue
+        if kind == "category":
+            category_ops.append(UpdateOne(_category_filter(source, key), {"$inc": {"usage_count": amount}}))
+        else:
+            tag_ops.append(UpdateOne({"name": key, "type": source}, {"$inc": {"usage_count": amount}}))
+
+    if category_ops:
+        await db.categories.bulk_write(category_ops, ordered=False)
+    if tag_ops:
+        await db.tags.bulk_write(tag_ops, ordered=False)
+    changed = [tag for tag, ops in (("categories", category_ops), ("tags", tag_ops)) if ops]
+    if changed:
+        await response_cache.invalidate(*changed)
+
+
+async def record_usage_change(db: AsyncIOMotorDatabase, source: str, before: Optional[dict], after: Optional[dict]) -> None:
+    await record_usage_changes(db, source, [(before, after)])
+
+
+async def current_counts(db: AsyncIOMotorDatabase, kind: str, type: str, keys: List[str]) -> Dict[str, int]:
+    # One aggregation for the starting counts of newly created / renamed categories and tags
+    if not keys:
+        return {}
+    source = db.blog_posts if type == "blog" else db.prompts
+    field = "tags" if kind == "tag" else ("category_id" if type == "blog" else "category")
+    pipeline: List[Dict[str, Any]] = [{"$match": {field: {"$in": keys}}}]
+    if type == "blog":
+        pipeline[0]["$match"]["status"] = PUBLISHED
+    if kind == "tag":
+        pipeline += [{"$unwind": "$tags"}, {"$match": {"tags": {"$in": keys}}}]
+    pipeline.append({"$group": {"_id": f"${field}", "count": {"$sum": 1}}})
+    return {row["_id"]: row["count"] async for row in source.aggregate(pipeline)}
+
+
+async def recount_renamed(db: AsyncIOMotorDatabase, kind: str, renamed: List[Dict[str, Any]]) -> None:
+    # Renamed categories/tags ({"id", "type", "name"} with the new name) take
+    # over the count of whatever references the new name. Blog categories are
+    # referenced by id, so a rename doesn't move their count.
+    collection = db.tags if kind == "tag" else db.categories
+    ops = []
+    for doc_type in {doc["type"] for doc in renamed}:
+        if kind == "category" and doc_type == "blog":
+            continue
+        docs = [doc for doc in renamed if doc["type"] == doc_type]
+        counts = await current_counts(db, kind, doc_type, [doc["name"] for doc in docs])
+        ops += [UpdateOne({"id": doc["id"]}, {"$set": {"usage_count": counts.get(doc["name"], 0)}}) for doc in docs]
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+
+
+async def rebuild_usage_counts(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    totals: Counter = Counter()
+    for source, collection, query in (("prompt", db.prompts, {}), ("blog", db.blog_posts, {"status": PUBLISHED})):
+        projection = {"_id": 0, **{field: 1 for field in USAGE_FIELDS[source]}}
+        counts: Counter = Counter()
+        async for doc in collection.find(query, projection):
+            counts.update(_contributions(source, doc))
+
+        await db.categories.update_many({"type": source}, {"$set": {"usage_count": 0}})
+        await db.tags.update_many({"type": source}, {"$set": {"usage_count": 0}})
+        category_ops = [
+            UpdateOne(_category_filter(source, key), {"$set": {"usage_count": n}})
+            for (kind, key), n in counts.items() if kind == "category"
+        ]
+        tag_ops = [
+            UpdateOne({"name": key, "type": source}, {"$set": {"usage_count": n}})
+            for (kind, key), n in counts.items() if kind == "tag"
+        ]
+        if category_ops:
+            await db.categories.bulk_write(category_ops, ordered=False)
+        if tag_ops:
+            await db.tags.bulk_write(tag_ops, ordered=False)
+        totals[f"{source}_categories"] = len(category_ops)
+        totals[f"{source}_tags"] = len(tag_ops)
+    return dict(totals)
+
+
+async def main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pathlib import Path
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        report = await rebuild_usage_counts(client[os.environ['DB_NAME']])
+        print(f"Usage counts rebuilt: {report}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, status, Query, Depends
+from pymongo.errors import DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List, Optional
 
 # Assuming a get_db dependency for database connection, and get_current_active_user for auth
 # from ..dependencies import get_db, get_current_active_user, User, UserCreate, UserUpdate, UserRole
 # from ..utils.security import get_password_hash # Utility for hashing passwords
+from ..db_utils import update_and_fetch
 from ..models import User, UserCreate, UserUpdate, UserRole # User and UserRole for permission checks
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -101,33 +103,19 @@ async def update_user(
     if "password" in update_data and update_data["password"]:
         update_data["password_hash"] = get_password_hash_placeholder(update_data.pop("password"))
     
-    # Prevent duplicate username/email on update
-    if "username" in update_data:
-        existing_user = await db.users.find_one({"username": update_data["username"], "id": {"$ne": user_id}})
-        if existing_user:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
-    if "email" in update_data:
-        existing_user = await db.users.find_one({"email": update_data["email"], "id": {"$ne": user_id}})
-        if existing_user:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered by another user")
-
-    result = await db.users.update_one(
-        {"id": user_id},
-        {"$set": update_data}
-    )
-
-    if result.modified_count == 0:
-        existing_usr = await db.users.find_one({"id": user_id})
-        if not existing_usr:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-
-    updated_user = await db.users.find_one({"id": user_id})
-    if not updated_user:
-         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found after update attempt")
-    return User(**updated_user)
+    # Duplicate username/email is rejected by the unique indexes, no pre-checks needed
+    try:
+        outcome = await update_and_fetch(db.users, {"id": user_id}, update_data)
+    except DuplicateKeyError as e:
+        field = "Username" if "username" in str(e) else "Email"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field} already registered by another user")
+
+    if not outcome.found:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return User(**outcome.document)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
@@ -4,18 +4,42 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
+# BACKEND_MODE=production (default) runs BACKEND_WORKERS uvicorn workers,
+# defaulting to one per CPU; BACKEND_MODE=dev runs a single process.
+# The count is exported: the workers don't share memory, and server.py uses it
+# to resync per-process state (search index, rankings, caches) between them.
+BACKEND_MODE="${BACKEND_MODE:-production}"
+if [ "$BACKEND_MODE" = "dev" ]; then
+    BACKEND_WORKERS=1
+else
+    BACKEND_WORKERS="${BACKEND_WORKERS:-$(nproc 2>/dev/null || echo 1)}"
+fi
+export BACKEND_WORKERS
+
+echo "Starting FastAPI backend ($BACKEND_MODE, $BACKEND_WORKERS worker(s))"
 # Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+uvicorn server:app --host 0.0.0.0 --port 8001 --workers "$BACKEND_WORKERS" &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+# Readiness probe instead of a fixed sleep: poll until the API answers
+echo "Waiting for backend to become ready..."
+READY_TIMEOUT="${BACKEND_READY_TIMEOUT:-60}"
+READY_URL="${BACKEND_READY_URL:-http://127.0.0.1:8001/readyz}"
+elapsed=0
+until wget -q -O /dev/null "$READY_URL" 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$elapsed" -ge "$READY_TIMEOUT" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, exiting"
+        kill $BACKEND_PID
+        exit 1
+    fi
+    sleep 1
+    elapsed=$((elapsed + 1))
+done
+echo "Backend ready after ${elapsed}s"
 
 # Start Nginx
 nginx -g 'daemon off;' &
@@ -61,6 +61,16 @@ const apiService = {
     }
   },
   
+  // Several prompts in one request (one query server side), in the order given
+  getPromptsByIds: async (ids) => {
+    try {
+      const response = await apiClient.get('/api/prompts', { params: { ids: ids.join(',') } });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   getPromptById: async (id) => {
     try {
       const response = await apiClient.get(`/api/prompts/${id}`);
@@ -104,6 +114,34 @@ const apiService = {
     } catch (error) {
       throw error;
     }
+  },
+
+  // Page bundles: everything a page renders in one request
+  getHomeBundle: async (params = {}) => {
+    try {
+      const response = await apiClient.get('/api/bundle/home', { params });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  getPromptsBundle: async (params = {}) => {
+    try {
+      const response = await apiClient.get('/api/bundle/prompts', { params });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  getBlogBundle: async (params = {}) => {
+    try {
+      const response = await apiClient.get('/api/bundle/blog', { params });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
   }
 };
 
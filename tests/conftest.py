@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# The backend modules import each other by top-level name (uvicorn runs from
+# backend/), and the suite runs against the in-memory storage backend
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("DB_NAME", "test_database")
+# Per-IP limits would trip on the route tests' own traffic (test_ratelimit.py
+# covers the middleware)
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
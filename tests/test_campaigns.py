@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from campaigns import QUEUED, SENDING, SENT, CampaignBusy, CampaignSender
+from external_integrations.mailer import StubMailer
+from jobs import RUNNING, JobQueue
+from models import Campaign
+from repositories import MemoryDatabase
+
+
+async def _seed(db, subscribers, segments=()):
+    await db.newsletter_subscribers.insert_many([
+        {"email": email, "is_active": active, "tags": list(tags)} for email, active, tags in subscribers
+    ])
+    campaign = Campaign(subject="News for $segment", body="Hi $email, bye: $unsubscribe_url", segments=list(segments))
+    await db.newsletter_campaigns.insert_one({**campaign.dict(), "status": QUEUED})
+    return campaign.id
+
+
+def test_campaign_sends_each_active_subscriber_once():
+    async def scenario():
+        db = MemoryDatabase("test")
+        campaign_id = await _seed(db, [
+            ("a@example.com", True, ["ai"]),
+            ("b@example.com", True, ["ai", "ml"]),
+            ("c@example.com", True, ["ml"]),
+            ("d@example.com", False, ["ai"]),
+        ], segments=["ai", "ml"])
+        mailer = StubMailer()
+        sender = CampaignSender(rate=10_000, batch_size=2, unsubscribe_url="https://example.com/u?e=")
+        result = await sender.run(db, campaign_id, mailer)
+        return result, list(mailer.sent)
+
+    result, sent = asyncio.run(scenario())
+    assert result["status"] == SENT
+    assert result["sent"] == 3 and result["failed"] == 0
+    assert [(m["to"], m["subject"]) for m in sent] == [
+        ("a@example.com", "News for ai"), ("b@example.com", "News for ai"), ("c@example.com", "News for ml"),
+    ]
+    assert sent[0]["body"] == "Hi a@example.com, bye: https://example.com/u?e=a%40example.com"
+
+
+def test_campaign_resumes_after_checkpoint():
+    async def scenario():
+        db = MemoryDatabase("test")
+        campaign_id = await _seed(db, [(f"{n}@example.com", True, []) for n in range(5)])
+        # A previous run got through the first two before dying
+        await db.newsletter_campaigns.update_one({"id": campaign_id}, {"$set": {
+            "status": SENDING, "sent": 2, "checkpoint": {"segment": 0, "last_email": "1@example.com"},
+            "locked_until": datetime.utcnow() - timedelta(seconds=1),
+        }})
+        mailer = StubMailer()
+        result = await CampaignSender(rate=10_000, batch_size=2).run(db, campaign_id, mailer)
+        return result, [m["to"] for m in mailer.sent]
+
+    result, recipients = asyncio.run(scenario())
+    assert recipients == ["2@example.com", "3@example.com", "4@example.com"]
+    assert result["sent"] == 5 and result["status"] == SENT
+
+
+def test_busy_campaign_is_postponed_without_using_an_attempt():
+    async def scenario():
+        db = MemoryDatabase("test")
+        campaign_id = await _seed(db, [("a@example.com", True, [])])
+        await db.newsletter_campaigns.update_one({"id": campaign_id}, {"$set": {
+            "status": SENDING, "locked_until": datetime.utcnow() + timedelta(seconds=60),
+        }})
+        queue = JobQueue(max_attempts=1)
+        queue._db = db
+        sender = CampaignSender(lease=90.0)
+
+        @queue.handler("newsletter.campaign")
+        async def run(payload):
+            await sender.run(db, payload["campaign_id"], StubMailer())
+
+        job_id = await queue.enqueue("newsletter.campaign", {"campaign_id": campaign_id})
+        await queue.run_one()
+        return await db.jobs.find_one({"id": job_id})
+
+    job = asyncio.run(scenario())
+    assert job["status"] == QUEUED
+    assert job["attempts"] == 0
+    assert job["run_at"] > datetime.utcnow() + timedelta(seconds=80)
+    assert job["last_error"] is None
+
+
+def test_job_lease_is_renewed_while_the_handler_runs():
+    async def scenario():
+        queue = JobQueue(lease=0.3)
+        queue._db = MemoryDatabase("test")
+        seen = []
+
+        @queue.handler("slow")
+        async def slow(payload):
+            first = (await queue.collection.find_one({}))["locked_until"]
+            await asyncio.sleep(0.5)
+            job = await queue.collection.find_one({})
+            seen.append((first, job["locked_until"], job["status"]))
+
+        await queue.enqueue("slow", {})
+        await queue.run_one()
+        return seen
+
+    (first, renewed, status), = asyncio.run(scenario())
+    assert status == RUNNING
+    assert renewed > first
+
+
+class SlowMailer(StubMailer):
+    def __init__(self, delay, on_send=None):
+        super().__init__()
+        self.delay = delay
+        self.on_send = on_send
+
+    async def send(self, to, subject, body):
+        await asyncio.sleep(self.delay)
+        if self.on_send:
+            await self.on_send()
+        await super().send(to, subject, body)
+
+
+def test_campaign_lease_is_renewed_during_a_slow_batch():
+    async def scenario():
+        db = MemoryDatabase("test")
+        campaign_id = await _seed(db, [("a@example.com", True, [])])
+        leases = []
+
+        async def record():
+            leases.append((await db.newsletter_campaigns.find_one({"id": campaign_id}))["locked_until"])
+
+        sender = CampaignSender(rate=10_000, lease=0.3)
+        await sender.run(db, campaign_id, SlowMailer(0.5, record))
+        claimed = datetime.utcnow() - timedelta(seconds=0.5)
+        return claimed, leases
+
+    claimed, (lease,) = asyncio.run(scenario())
+    # Claimed with a 0.3s lease, but still leased 0.5s in
+    assert lease > claimed + timedelta(seconds=0.3)
+
+
+def test_run_stops_when_its_lease_was_taken_over():
+    async def scenario():
+        db = MemoryDatabase("test")
+        campaign_id = await _seed(db, [("a@example.com", True, [])])
+
+        async def take_over():
+            await db.newsletter_campaigns.update_one({"id": campaign_id}, {"$set": {"lock_id": "other"}})
+
+        with pytest.raises(CampaignBusy):
+            await CampaignSender(rate=10_000).run(db, campaign_id, SlowMailer(0, take_over))
+        return await db.newsletter_campaigns.find_one({"id": campaign_id})
+
+    campaign = asyncio.run(scenario())
+    # The other holder's progress is left alone
+    assert campaign["sent"] == 0 and campaign["status"] == SENDING and not campaign.get("checkpoint")
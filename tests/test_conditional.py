@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from conditional import make_validators
+
+UPDATED = datetime(2024, 1, 1)
+
+
+def test_etag_changes_with_counters():
+    doc = {"id": "p1", "updated_at": UPDATED, "likes": 3, "views": 10}
+    etag, last_modified = make_validators([doc])
+    liked, _ = make_validators([{**doc, "likes": 4}])
+    viewed, _ = make_validators([{**doc, "views": 11}])
+    assert last_modified == UPDATED
+    assert len({etag, liked, viewed}) == 3
+
+
+def test_etag_ignores_body_fields():
+    # Computable from the validator projection alone
+    probe = {"id": "p1", "updated_at": UPDATED, "likes": 3, "views": 10}
+    full = {**probe, "title": "Title", "prompt_text": "..."}
+    assert make_validators([probe], "q") == make_validators([full], "q")
+    assert make_validators([probe], "q") != make_validators([probe], "other")
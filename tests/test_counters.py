@@ -0,0 +1,38 @@
+import asyncio
+
+from counters import CounterAggregator
+from repositories import MemoryDatabase
+
+
+def test_flush_applies_buffered_increments():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.prompts.insert_many([{"id": "a", "likes": 0}, {"id": "b", "likes": 2}])
+        counters = CounterAggregator("prompts")
+        counters.start(db)
+        counters.incr("a", "likes")
+        counters.incr("a", "likes")
+        counters.incr("b", "views")
+        await counters.stop()
+        return await db.prompts.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+
+    assert asyncio.run(scenario()) == [{"id": "a", "likes": 2}, {"id": "b", "likes": 2, "views": 1}]
+
+
+def test_partial_bulk_failure_requeues_only_failed_ops():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.prompts.insert_many([{"id": "ok", "likes": 0}, {"id": "bad", "likes": "n/a"}])
+        counters = CounterAggregator("prompts")
+        counters._db = db
+        counters.incr("ok", "likes")
+        counters.incr("bad", "likes")
+        applied = await counters.flush()
+        doc = await db.prompts.find_one({"id": "ok"})
+        return applied, doc["likes"], counters.pending("ok"), counters.pending("bad")
+
+    applied, likes, pending_ok, pending_bad = asyncio.run(scenario())
+    assert applied == 1
+    assert likes == 1
+    assert pending_ok == {}
+    assert pending_bad == {"likes": 1}
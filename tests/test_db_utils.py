@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+from bulk import BulkReport, bulk_update
+from db_utils import update_and_fetch
+from repositories import MemoryDatabase
+
+CREATED = datetime(2024, 1, 1)
+
+
+async def _seed():
+    db = MemoryDatabase("test")
+    await db.prompts.insert_one({"id": "p1", "title": "Old", "tags": ["a"], "updated_at": CREATED})
+    return db
+
+
+def test_update_sets_fields_and_touches_updated_at():
+    async def scenario():
+        db = await _seed()
+        outcome = await update_and_fetch(db.prompts, {"id": "p1"}, {"title": "New"})
+        stored = await db.prompts.find_one({"id": "p1"}, {"_id": 0})
+        return outcome, stored
+
+    outcome, stored = asyncio.run(scenario())
+    assert outcome.found and outcome.changed
+    assert outcome.previous["title"] == "Old"
+    assert stored["title"] == "New"
+    assert stored["updated_at"] > CREATED
+    assert outcome.document == stored
+
+
+def test_same_value_update_keeps_updated_at():
+    async def scenario():
+        db = await _seed()
+        outcome = await update_and_fetch(db.prompts, {"id": "p1"}, {"title": "Old", "tags": ["a"]})
+        stored = await db.prompts.find_one({"id": "p1"}, {"_id": 0})
+        return outcome, stored
+
+    outcome, stored = asyncio.run(scenario())
+    assert outcome.found and not outcome.changed
+    assert stored["updated_at"] == CREATED
+    assert outcome.document == stored
+
+
+def test_missing_document_is_not_found():
+    async def scenario():
+        db = await _seed()
+        return await update_and_fetch(db.prompts, {"id": "nope"}, {"title": "New"})
+
+    assert not asyncio.run(scenario()).found
+
+
+def test_bulk_update_only_touches_changed_items():
+    async def scenario():
+        db = await _seed()
+        await db.prompts.insert_one({"id": "p2", "title": "Other", "tags": [], "updated_at": CREATED})
+        report = BulkReport()
+        previous = await bulk_update(db.prompts, [(0, "p1", {"title": "Old"}), (1, "p2", {"title": "$New"})], report, ["title"])
+        stored = {doc["id"]: doc async for doc in db.prompts.find({}, {"_id": 0})}
+        return report.to_dict(), previous, stored
+
+    report, previous, stored = asyncio.run(scenario())
+    assert report["summary"] == {"updated": 2}
+    assert previous["p2"]["title"] == "Other"
+    assert stored["p1"]["updated_at"] == CREATED
+    assert stored["p2"]["title"] == "$New" and stored["p2"]["updated_at"] > CREATED
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from fastjson import shape
+from models import Prompt
+
+DOC = {"title": "T", "description": "D", "prompt_text": "P", "category": "writing"}
+
+
+def test_default_factories_run_per_document():
+    first, second = shape(Prompt, DOC), shape(Prompt, DOC)
+    assert first["id"] != second["id"]
+    assert isinstance(first["created_at"], datetime)
+    assert first["tags"] == []
+
+
+def test_stored_values_win_and_extras_are_dropped():
+    stored = {**DOC, "_id": "x", "id": "p1", "likes": 3, "internal": True}
+    shaped = shape(Prompt, stored)
+    assert shaped["id"] == "p1" and shaped["likes"] == 3
+    assert "_id" not in shaped and "internal" not in shaped
@@ -0,0 +1,26 @@
+import asyncio
+
+from indexes import ensure_indexes
+from pagination import keyset_sort
+from repositories import MemoryDatabase
+
+
+def test_filtered_keyset_pages_are_served_in_index_order():
+    async def scenario():
+        db = MemoryDatabase("test")
+        # A pre-existing index the current specs supersede
+        await db.prompts.create_index([("tags", 1), ("created_at", -1)])
+        await ensure_indexes(db)
+        names = set(await db.prompts.index_information())
+        plans = [
+            db.prompts._index_slots({"category": "coding", "tags": "python"}, keyset_sort("created_at", -1)),
+            db.prompts._index_slots({"tags": "python"}, keyset_sort("created_at", -1)),
+            db.blog_posts._index_slots({"status": "published"}, keyset_sort("published_at", -1)),
+            db.blog_posts._index_slots({"category_id": "c1"}, keyset_sort("created_at", -1)),
+        ]
+        return names, plans
+
+    names, plans = asyncio.run(scenario())
+    assert "tags_1_created_at_-1" not in names
+    assert "tags_1_created_at_-1_id_-1" in names
+    assert all(ordered for _, ordered in plans)
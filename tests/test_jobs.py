@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from external_integrations.mailer import StubMailer
+from jobs import DEAD, DONE, QUEUED, RUNNING, JobQueue
+from repositories import MemoryDatabase
+
+
+def _queue(**options) -> JobQueue:
+    queue = JobQueue(base_delay=0.0, **options)
+    queue._db = MemoryDatabase("test")
+    return queue
+
+
+async def _make_due(queue: JobQueue, job_id: str) -> None:
+    # Skip the backoff wait
+    await queue.collection.update_one({"id": job_id}, {"$set": {"run_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_enqueued_job_is_claimed_and_done():
+    mailer = StubMailer()
+    queue = _queue()
+
+    @queue.handler("welcome")
+    async def welcome(payload):
+        await mailer.send(payload["email"], "Welcome", "Hi")
+
+    async def scenario():
+        job_id = await queue.enqueue("welcome", {"email": "a@example.com"})
+        assert await queue.run_one()
+        assert not await queue.run_one()
+        return await queue.collection.find_one({"id": job_id})
+
+    job = asyncio.run(scenario())
+    assert job["status"] == DONE and job["attempts"] == 1
+    assert job["expires_at"] > datetime.utcnow()
+    assert list(mailer.sent) == [{"to": "a@example.com", "subject": "Welcome", "body": "Hi"}]
+
+
+def test_failing_job_is_retried_then_dead():
+    queue = _queue(max_attempts=3)
+    calls = []
+
+    @queue.handler("flaky")
+    async def flaky(payload):
+        calls.append(payload)
+        raise RuntimeError("smtp down")
+
+    async def scenario():
+        job_id = await queue.enqueue("flaky", {"n": 1})
+        states = []
+        for _ in range(3):
+            await _make_due(queue, job_id)
+            assert await queue.run_one()
+            job = await queue.collection.find_one({"id": job_id})
+            states.append((job["status"], job["attempts"]))
+        await _make_due(queue, job_id)
+        assert not await queue.run_one()
+        return states, job
+
+    states, job = asyncio.run(scenario())
+    assert states == [(QUEUED, 1), (QUEUED, 2), (DEAD, 3)]
+    assert job["last_error"] == "RuntimeError: smtp down"
+    assert "expires_at" not in job
+    assert len(calls) == 3
+
+
+def test_unknown_kind_goes_dead_at_once():
+    queue = _queue()
+
+    async def scenario():
+        job_id = await queue.enqueue("nobody.handles.this", {})
+        await queue.run_one()
+        return await queue.collection.find_one({"id": job_id})
+
+    job = asyncio.run(scenario())
+    assert job["status"] == DEAD and job["attempts"] == 1
+
+
+def test_stale_runner_cannot_overwrite_reclaimed_job():
+    queue = _queue(lease=60.0)
+
+    async def scenario():
+        job_id = await queue.enqueue("slow", {})
+        stale = await queue._claim()
+        # The lease runs out and another worker takes the job over
+        await queue.collection.update_one({"id": job_id}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}})
+        fresh = await queue._claim()
+        recorded = await queue._finish(stale)
+        running = await queue.collection.find_one({"id": job_id})
+        await queue._finish(fresh)
+        done = await queue.collection.find_one({"id": job_id})
+        return stale, fresh, recorded, running, done
+
+    stale, fresh, recorded, running, done = asyncio.run(scenario())
+    assert stale["lease_id"] != fresh["lease_id"]
+    assert not recorded
+    assert running["status"] == RUNNING and running["attempts"] == 2
+    assert done["status"] == DONE
+
+
+def test_stub_mailer_keeps_only_recent_messages():
+    async def scenario():
+        mailer = StubMailer(keep=2)
+        for n in range(5):
+            await mailer.send(f"{n}@example.com", "Hi", "")
+        return [message["to"] for message in mailer.sent]
+
+    assert asyncio.run(scenario()) == ["3@example.com", "4@example.com"]
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from loaders import Loader
+from repositories import MemoryDatabase
+
+
+async def _seed():
+    db = MemoryDatabase("test")
+    await db.categories.insert_many([{"id": f"c{n}", "name": f"Category {n}"} for n in range(3)])
+    return db
+
+
+def test_loads_in_one_turn_share_one_query():
+    async def scenario():
+        loader = Loader((await _seed()).categories, projection={"_id": 0, "name": 1})
+        found = await loader.load_many(["c0", "c2", "missing", "c0", None])
+        again = await loader.load("c2")
+        return loader, found, again
+
+    loader, found, again = asyncio.run(scenario())
+    assert [doc and doc["name"] for doc in found] == ["Category 0", "Category 2", None, "Category 0", None]
+    assert again["name"] == "Category 2"
+    assert loader.queries == 1
+    assert not loader._dispatches
+
+
+class FlakyCollection:
+    name = "categories"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.fail = True
+
+    def find(self, *args, **kwargs):
+        if self.fail:
+            self.fail = False
+            raise PyMongoError("connection reset")
+        return self.collection.find(*args, **kwargs)
+
+
+def test_failed_dispatch_reaches_waiters_and_is_retried(caplog):
+    async def scenario():
+        loader = Loader(FlakyCollection((await _seed()).categories))
+        with pytest.raises(PyMongoError):
+            await loader.load_many(["c0", "c1"])
+        return loader, await loader.load("c1")
+
+    loader, retried = asyncio.run(scenario())
+    assert retried["name"] == "Category 1"
+    assert loader.queries == 2
+    assert "lookup by id failed" in caplog.text
@@ -0,0 +1,30 @@
+import uuid
+
+import bson
+
+from migrate_ids import _chunks, _convert, _unchanged
+
+
+def _staged(size):
+    return _convert({"_id": bson.ObjectId(), "id": str(uuid.uuid4()), "content": "x" * size})
+
+
+def test_delete_filters_are_split_by_size():
+    filters = [_unchanged(_staged(1000)) for _ in range(10)]
+    limit = 3 * len(bson.encode(filters[0])) + 1
+    chunks = list(_chunks(filters, max_bytes=limit))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [query for chunk in chunks for query in chunk] == filters
+
+
+def test_oversized_filter_still_gets_its_own_chunk():
+    filters = [_unchanged(_staged(5000)), _unchanged(_staged(10))]
+    assert [len(chunk) for chunk in _chunks(filters, max_bytes=1000)] == [1, 1]
+
+
+def test_unchanged_matches_every_field_but_the_new_id():
+    staged = _staged(10)
+    query = _unchanged(staged)
+    assert query["_id"] == {"$type": "objectId"}
+    assert query["id"] == staged["id"] and query["content"] == staged["content"]
+    assert query["$expr"]["$eq"][1] == len(staged)
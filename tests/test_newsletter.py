@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+from jobs import job_queue
+from models import NewsletterSubscriberCreate
+from repositories import MemoryDatabase
+from routes.newsletter import bulk_subscribe, subscribe, unsubscribe
+
+
+def test_subscribe_after_unsubscribe_reactivates():
+    async def scenario():
+        db = MemoryDatabase("test")
+        job_queue._db = db
+        data = NewsletterSubscriberCreate(email="reader@example.com")
+        first = await subscribe(data, None, db)
+        await unsubscribe("reader@example.com", db)
+        second = await subscribe(data, None, db)
+        stored = await db.newsletter_subscribers.find_one({"email": "reader@example.com"})
+        welcomes = await db.jobs.count_documents({"kind": "newsletter.welcome"})
+        return first, second, stored, welcomes
+
+    first, second, stored, welcomes = asyncio.run(scenario())
+    assert first.is_active and second.is_active
+    assert stored["is_active"] is True
+    assert second.id == first.id == stored["id"]
+    assert welcomes == 2
+
+
+def test_concurrent_identical_subscribes_share_one_write():
+    async def scenario():
+        db = MemoryDatabase("test")
+        job_queue._db = db
+        data = NewsletterSubscriberCreate(email="burst@example.com")
+        results = await asyncio.gather(*(subscribe(data, None, db) for _ in range(5)))
+        welcomes = await db.jobs.count_documents({"kind": "newsletter.welcome"})
+        return results, welcomes
+
+    results, welcomes = asyncio.run(scenario())
+    assert len({result.id for result in results}) == 1
+    assert welcomes == 1
+
+
+def _json_request(payload):
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "headers": [(b"content-type", b"application/json")]}, receive)
+
+
+def test_dollar_addresses_are_stored_verbatim():
+    # In a pipeline update a bare "$boss@..." would be read as a field path
+    async def scenario():
+        db = MemoryDatabase("test")
+        job_queue._db = db
+        await db.newsletter_subscribers.create_index("email", unique=True)
+        single = await subscribe(NewsletterSubscriberCreate(email="$boss@example.com"), None, db)
+        report = await bulk_subscribe(
+            _json_request([{"email": "$ceo@example.com"}, {"email": "$cfo@example.com"}]), False, db
+        )
+        emails = sorted(doc["email"] for doc in await db.newsletter_subscribers.find({}).to_list(None))
+        return single, report, emails
+
+    single, report, emails = asyncio.run(scenario())
+    assert single.email == "$boss@example.com"
+    assert [item["status"] for item in report["results"]] == ["created", "created"]
+    assert emails == ["$boss@example.com", "$ceo@example.com", "$cfo@example.com"]
+
+
+def test_email_case_is_normalized():
+    async def scenario():
+        db = MemoryDatabase("test")
+        job_queue._db = db
+        first = await subscribe(NewsletterSubscriberCreate(email="Reader@Example.com"), None, db)
+        second = await subscribe(NewsletterSubscriberCreate(email="reader@example.com"), None, db)
+        await unsubscribe("READER@example.com", db)
+        return first, second, await db.newsletter_subscribers.find({}).to_list(None)
+
+    first, second, stored = asyncio.run(scenario())
+    assert first.id == second.id
+    assert [(doc["email"], doc["is_active"]) for doc in stored] == [("reader@example.com", False)]
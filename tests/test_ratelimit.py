@@ -0,0 +1,81 @@
+import asyncio
+
+from ratelimit import MAX_BODY_BYTES, MemoryRateLimitBackend, RateLimitMiddleware, rule
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _statuses(middleware, requests):
+    async def call(client, forwarded):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        scope = {"type": "http", "method": "POST", "path": "/api/x", "headers": headers, "client": (client, 5000)}
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        return sent[0]["status"]
+
+    async def scenario():
+        return [await call(client, forwarded) for client, forwarded in requests]
+
+    return asyncio.run(scenario())
+
+
+def test_forwarded_for_is_ignored_by_default():
+    middleware = RateLimitMiddleware(_ok, rules=[rule("POST", r"^/api/x$", 2, 60)])
+    spoofed = [("203.0.113.7", f"10.0.0.{n}") for n in range(3)]
+    assert _statuses(middleware, spoofed) == [200, 200, 429]
+
+
+def test_trusted_proxy_entry_is_the_rightmost():
+    middleware = RateLimitMiddleware(_ok, rules=[rule("POST", r"^/api/x$", 2, 60)], trust_forwarded=True)
+    # The client prepends random addresses; the proxy appends the real one
+    spoofed = [("127.0.0.1", f"10.0.0.{n}, 203.0.113.7") for n in range(3)]
+    other = [("127.0.0.1", "198.51.100.1")]
+    assert _statuses(middleware, spoofed + other) == [200, 200, 429, 200]
+
+
+def test_memory_store_is_bounded_and_keeps_recent_keys():
+    async def scenario():
+        backend = MemoryRateLimitBackend(max_keys=3)
+        await backend.hit("kept", 60)
+        for n in range(5):
+            await backend.hit(f"spray-{n}", 60)
+            await backend.hit("kept", 60)
+        return backend
+
+    backend = asyncio.run(scenario())
+    assert len(backend._counts) == 3
+    assert backend._counts["kept"][1] == 6
+
+
+def test_oversized_body_is_refused_before_parsing():
+    middleware = RateLimitMiddleware(_ok, rules=[rule("POST", r"^/api/x$", 5, 60, by="email")])
+    chunk = b"x" * 4096
+
+    async def scenario():
+        scope = {"type": "http", "method": "POST", "path": "/api/x", "headers": [], "client": ("203.0.113.7", 5000)}
+        sent, reads = [], 0
+
+        async def receive():
+            nonlocal reads
+            reads += 1
+            return {"type": "http.request", "body": chunk, "more_body": True}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        return sent[0]["status"], reads
+
+    status, reads = asyncio.run(scenario())
+    assert status == 413
+    assert reads == MAX_BODY_BYTES // len(chunk) + 1
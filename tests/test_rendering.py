@@ -0,0 +1,70 @@
+import pytest
+
+import rendering
+from rendering import RENDER_VERSION, content_hash, render_content, rerender
+
+POST = """# Title
+
+## Intro
+
+<script>alert(1)</script>
+
+[bad](javascript:alert(1)) [worse](data:text/html,hi) [good](https://example.com)
+
+## Intro
+
+### Deeper *still*
+"""
+
+
+@pytest.fixture(params=["markdown-it", "plain"])
+def renderer(request, monkeypatch):
+    if request.param == "plain":
+        monkeypatch.setattr(rendering, "_markdown", None)
+    return request.param
+
+
+def test_raw_html_is_escaped(renderer):
+    html = render_content(POST)["content_html"]
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+
+
+def test_unsafe_links_are_not_linked():
+    html = render_content(POST)["content_html"]
+    assert 'href="https://example.com"' in html
+    assert 'href="javascript:' not in html and 'href="data:' not in html
+
+
+def test_headings_get_unique_anchors_and_toc(renderer):
+    rendered = render_content(POST)
+    assert '<h2 id="intro">' in rendered["content_html"]
+    assert '<h2 id="intro-2">' in rendered["content_html"]
+    toc = [(entry["level"], entry["id"]) for entry in rendered["toc"]]
+    if renderer == "markdown-it":
+        assert toc == [(2, "intro"), (2, "intro-2"), (3, "deeper-still")]
+        assert rendered["toc"][2]["title"] == "Deeper still"
+    else:
+        assert toc[:2] == [(2, "intro"), (2, "intro-2")]
+
+
+def test_read_time():
+    assert render_content("")["read_time_minutes"] == 1
+    assert render_content("word " * 401)["read_time_minutes"] == 3
+
+
+def test_content_hash_is_stable_and_versioned(monkeypatch):
+    current = content_hash(POST)
+    assert content_hash(POST) == current
+    assert content_hash(POST + " ") != current
+    assert render_content(POST)["content_hash"] == current
+    # Bumping RENDER_VERSION marks every stored rendering out of date
+    monkeypatch.setattr(rendering, "RENDER_VERSION", RENDER_VERSION + 1)
+    assert content_hash(POST) != current
+
+
+def test_rerender_skips_current_content():
+    stored = render_content(POST)["content_hash"]
+    assert rerender(POST, stored) == {}
+    assert rerender(POST + "\nmore", stored)["content_hash"] == content_hash(POST + "\nmore")
+    assert rerender(POST, None)["content_html"]
@@ -0,0 +1,143 @@
+import asyncio
+import uuid
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from pagination import decode_cursor, keyset_filter, keyset_sort, next_cursor
+from repositories import MemoryDatabase
+from storage import UUID, storage_database
+
+
+def _prompt(n, **fields):
+    return {
+        "id": f"p{n:02d}",
+        "title": f"Prompt {n}",
+        "category": "coding" if n % 2 else "writing",
+        "tags": ["a", "b"] if n % 3 == 0 else ["a"],
+        "likes": n % 5,
+        **fields,
+    }
+
+
+async def _seed(count=20):
+    db = MemoryDatabase("test")
+    await db.prompts.create_index([("id", ASCENDING)], unique=True)
+    await db.prompts.create_index([("category", ASCENDING), ("likes", DESCENDING)])
+    await db.prompts.create_index([("tags", ASCENDING)])
+    await db.prompts.insert_many([_prompt(n) for n in range(count)])
+    return db
+
+
+def test_query_operators():
+    async def scenario():
+        db = await _seed()
+        find = lambda query: db.prompts.find(query, {"_id": 0, "id": 1}).to_list(None)
+        return {
+            "range": await find({"likes": {"$gte": 3, "$lt": 4}}),
+            "in": await find({"id": {"$in": ["p01", "p02", "nope"]}}),
+            "array": await find({"tags": "b", "category": "writing"}),
+            "or": await find({"$or": [{"id": "p00"}, {"likes": 4, "category": "coding"}]}),
+            "missing": await find({"archived": {"$exists": False}, "id": {"$in": ["p05"]}}),
+        }
+
+    found = {name: {doc["id"] for doc in docs} for name, docs in asyncio.run(scenario()).items()}
+    assert found["range"] == {"p03", "p08", "p13", "p18"}
+    assert found["in"] == {"p01", "p02"}
+    assert found["array"] == {"p00", "p06", "p12", "p18"}
+    assert found["or"] == {"p00", "p09", "p19"}
+    assert found["missing"] == {"p05"}
+
+
+def test_unsupported_operator_fails_loudly():
+    async def scenario():
+        db = await _seed()
+        await db.prompts.find({"title": {"$regex": "^Prompt"}}).to_list(None)
+
+    with pytest.raises(OperationFailure):
+        asyncio.run(scenario())
+
+
+def test_sort_with_index_matches_full_sort():
+    async def scenario():
+        db = await _seed()
+        by_index = await db.prompts.find({"category": "coding"}).sort([("likes", -1)]).to_list(None)
+        # Same order via the reverse of the index, and via an unindexed sort
+        reversed_index = await db.prompts.find({"category": "coding"}).sort([("likes", 1)]).to_list(None)
+        unindexed = await db.prompts.find({"category": "coding"}).sort([("title", -1)]).to_list(None)
+        return by_index, reversed_index, unindexed
+
+    by_index, reversed_index, unindexed = asyncio.run(scenario())
+    assert [doc["likes"] for doc in by_index] == sorted((doc["likes"] for doc in by_index), reverse=True)
+    assert [doc["likes"] for doc in reversed_index] == sorted(doc["likes"] for doc in reversed_index)
+    assert [doc["title"] for doc in unindexed] == sorted((doc["title"] for doc in unindexed), reverse=True)
+
+
+def test_planner_uses_indexes():
+    async def scenario():
+        db = await _seed()
+        repo = db.prompts
+        return {
+            "equality_and_sort": repo._index_slots({"category": "coding"}, [("likes", -1)]),
+            "reverse_sort": repo._index_slots({"category": "coding"}, [("likes", 1)]),
+            "equality": repo._index_slots({"tags": "b"}, None),
+            "unindexed": repo._index_slots({"title": "Prompt 1"}, None),
+        }
+
+    plans = asyncio.run(scenario())
+    slots, ordered = plans["equality_and_sort"]
+    assert ordered and len(list(slots)) == 10
+    assert plans["reverse_sort"][1]
+    assert len(plans["equality"][0]) == 7
+    assert len(plans["unindexed"][0]) == 20
+
+
+def test_keyset_pages_cover_everything_once():
+    async def scenario():
+        db = await _seed(25)
+        seen, token = [], None
+        while True:
+            query = {}
+            if token:
+                value, last_id = decode_cursor(token, "likes", -1)
+                query = keyset_filter("likes", -1, value, last_id)
+            page = await db.prompts.find(query, {"_id": 0}).sort(keyset_sort("likes", -1)).limit(4).to_list(4)
+            seen.extend(page)
+            token = next_cursor("likes", -1, page, 4)
+            if not token:
+                return seen
+
+    seen = asyncio.run(scenario())
+    assert len(seen) == 25 and len({doc["id"] for doc in seen}) == 25
+    assert [doc["likes"] for doc in seen] == sorted((doc["likes"] for doc in seen), reverse=True)
+
+
+def test_unique_index_rejects_duplicates():
+    async def scenario():
+        db = await _seed()
+        with pytest.raises(DuplicateKeyError):
+            await db.prompts.insert_one(_prompt(1))
+        with pytest.raises(DuplicateKeyError):
+            await db.prompts.update_one({"id": "p02"}, {"$set": {"id": "p03"}})
+        # A failed write changes nothing
+        return await db.prompts.count_documents({}), await db.prompts.find_one({"id": "p02"})
+
+    count, p02 = asyncio.run(scenario())
+    assert count == 20
+    assert p02 is not None
+
+
+def test_cursor_iterates_directly_and_through_uuid_storage():
+    async def scenario():
+        db = MemoryDatabase("test")
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        wrapped = storage_database(db, UUID)
+        await wrapped.prompts.insert_many([{"id": doc_id, "title": doc_id} for doc_id in ids])
+        direct = [doc async for doc in db.prompts.find({})]
+        through_storage = [doc["id"] async for doc in wrapped.prompts.find({}, {"_id": 0})]
+        return ids, direct, through_storage
+
+    ids, direct, through_storage = asyncio.run(scenario())
+    assert len(direct) == 3 and all("id" not in doc for doc in direct)
+    assert sorted(through_storage) == sorted(ids)
@@ -0,0 +1,93 @@
+import functools
+
+import pytest
+from fastapi.testclient import TestClient
+
+import indexes
+import server
+import storage
+
+PROMPT = {"title": "Summarize", "description": "Short summaries", "prompt_text": "Summarize: ...", "category": "writing"}
+
+
+@pytest.fixture(params=[storage.FIELD, storage.UUID])
+def client(request, monkeypatch):
+    # The whole app on the in-memory backend, in both id storage modes
+    mode = request.param
+    monkeypatch.setattr(server, "storage_database", functools.partial(storage.storage_database, mode=mode))
+    monkeypatch.setattr(indexes, "index_keys", functools.partial(storage.index_keys, mode=mode))
+    with TestClient(server.app) as client:
+        yield client
+
+
+def _create(client, n, **fields):
+    response = client.post("/api/prompts/", json={**PROMPT, "title": f"Prompt {n}", **fields})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_prompt_lifecycle(client):
+    created = _create(client, 1, tags=["ai"])
+    prompt_id = created["id"]
+
+    response = client.get(f"/api/prompts/{prompt_id}")
+    assert response.status_code == 200 and response.json()["title"] == "Prompt 1"
+    etag = response.headers["etag"]
+    assert client.get(f"/api/prompts/{prompt_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post(f"/api/prompts/{prompt_id}/like").json()["likes"] == 1
+    # The like is still buffered, but reads see it and the ETag moves
+    response = client.get(f"/api/prompts/{prompt_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["likes"] == 1
+
+    response = client.put(f"/api/prompts/{prompt_id}", json={"title": "Renamed"})
+    assert response.status_code == 200 and response.json()["title"] == "Renamed"
+
+    assert client.delete(f"/api/prompts/{prompt_id}").status_code == 204
+    assert client.get(f"/api/prompts/{prompt_id}").status_code == 404
+
+
+def test_prompt_list_pages_with_cursor(client):
+    created = {_create(client, n)["id"] for n in range(7)}
+    seen, params = [], {"limit": 3}
+    while True:
+        response = client.get("/api/prompts/", params=params)
+        assert response.status_code == 200
+        seen.extend(prompt["id"] for prompt in response.json())
+        token = response.headers.get("x-next-cursor")
+        if not token:
+            break
+        params = {"limit": 3, "after": token}
+    assert len(seen) == len(set(seen)) and set(seen) >= created
+
+
+def test_batch_fetch_keeps_requested_order(client):
+    first, second = _create(client, 1)["id"], _create(client, 2)["id"]
+    response = client.get("/api/prompts/", params={"ids": f"{second},missing,{first}"})
+    assert [prompt["id"] for prompt in response.json()] == [second, first]
+
+
+def test_newsletter_and_contact(client):
+    assert client.post("/api/newsletter/subscribe", json={"email": "reader@example.com"}).status_code == 201
+    assert client.post("/api/newsletter/unsubscribe", json={"email": "reader@example.com"}).status_code == 200
+    response = client.post("/api/newsletter/subscribe", json={"email": "reader@example.com"})
+    assert response.status_code == 201 and response.json()["is_active"]
+
+    response = client.post(
+        "/api/contact/submit", json={"name": "Ann", "email": "ann@example.com", "message": "Hello"}
+    )
+    assert response.status_code == 201
+    assert client.get("/api/contact/submissions").status_code == 200
+
+
+def test_bundles(client):
+    _create(client, 1, tags=["ai"])
+    for path in ("/api/bundle/home", "/api/bundle/prompts", "/api/bundle/blog"):
+        assert client.get(path).status_code == 200
+
+
+def test_sparse_fieldset_keeps_id(client):
+    created = _create(client, 1)
+    response = client.get("/api/prompts/", params={"fields": "title"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": created["id"], "title": "Prompt 1"}]
@@ -0,0 +1,37 @@
+import asyncio
+
+from repositories import MemoryDatabase
+from search_engine import SearchIndex
+
+
+async def _built():
+    db = MemoryDatabase("test")
+    await db.prompts.insert_many([
+        {"id": "p1", "title": "Python refactoring", "description": "", "prompt_text": "", "category": "coding", "tags": ["python"]},
+        {"id": "p2", "title": "Pytest fixtures", "description": "", "prompt_text": "", "category": "testing", "tags": []},
+    ])
+    await db.blog_posts.insert_one(
+        {"id": "b1", "title": "Python tips", "content": "", "status": "published", "category_id": "c-123", "tags": ["python"]}
+    )
+    index = SearchIndex()
+    await index.build(db)
+    return index
+
+
+def test_build_sorts_vocabulary_and_prefix_search_works():
+    index = asyncio.run(_built())
+    assert index._vocabulary == sorted(index._vocabulary)
+    assert {hit["id"] for hit in index.search("py")["hits"]} == {"p1", "p2", "b1"}
+    # Incremental adds keep it sorted
+    index.index_prompt({"id": "p3", "title": "Aardvark", "category": "misc"})
+    assert index._vocabulary == sorted(index._vocabulary)
+    assert [hit["id"] for hit in index.search("aard")["hits"]] == ["p3"]
+
+
+def test_prompt_categories_and_blog_category_ids_are_faceted_apart():
+    index = asyncio.run(_built())
+    result = index.search("python")
+    assert result["facets"]["category"] == {"coding": 1}
+    assert result["facets"]["category_id"] == {"c-123": 1}
+    assert [hit["id"] for hit in index.search("python", category_id="c-123")["hits"]] == ["b1"]
+    assert [hit["id"] for hit in index.search("python", category="coding")["hits"]] == ["p1"]
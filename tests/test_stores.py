@@ -0,0 +1,50 @@
+import asyncio
+
+from repositories import MemoryDatabase
+from stores import (
+    deactivate_subscriber, delete_prompt_by_id, find_prompts, insert_campaign, insert_prompt, insert_submission,
+    list_submissions, page_prompts, transition_campaign
+)
+
+
+def test_prompt_queries():
+    async def scenario():
+        db = MemoryDatabase("test")
+        for n in range(5):
+            await insert_prompt(db, {"id": f"p{n}", "title": f"Prompt {n}", "likes": n, "category": "coding"})
+        page = await page_prompts(db, {}, {"_id": 0, "id": 1}, [("likes", -1), ("id", -1)], 1, 2)
+        found = await find_prompts(db, ["p0", "p3", "nope"])
+        deleted = await delete_prompt_by_id(db, "p4", ["category"])
+        missing = await delete_prompt_by_id(db, "p4", ["category"])
+        return page, found, deleted, missing
+
+    page, found, deleted, missing = asyncio.run(scenario())
+    assert page == [{"id": "p3"}, {"id": "p2"}]
+    assert sorted(doc["id"] for doc in found) == ["p0", "p3"]
+    assert deleted == {"category": "coding"}
+    assert missing is None
+
+
+def test_subscriber_campaign_and_submission_queries():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.newsletter_subscribers.insert_one({"email": "a@example.com", "is_active": False})
+        await insert_campaign(db, {"id": "c1", "status": "draft"})
+        await insert_submission(db, {"id": "s1", "status": "new", "created_at": 1})
+        await insert_submission(db, {"id": "s2", "status": "read", "created_at": 2})
+        return {
+            "inactive": await deactivate_subscriber(db, "a@example.com"),
+            "unknown": await deactivate_subscriber(db, "b@example.com"),
+            "queued": await transition_campaign(db, "c1", "draft", "queued"),
+            "again": await transition_campaign(db, "c1", "draft", "queued"),
+            "all": await list_submissions(db, None),
+            "new": await list_submissions(db, "new"),
+        }
+
+    result = asyncio.run(scenario())
+    # Unsubscribing an inactive subscriber still matches
+    assert result["inactive"] and not result["unknown"]
+    assert result["queued"].document["status"] == "queued"
+    assert not result["again"].found
+    assert [doc["id"] for doc in result["all"]] == ["s2", "s1"]
+    assert [doc["id"] for doc in result["new"]] == ["s1"]
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+
+from cache import configure_cache, response_cache
+from conditional import make_validators
+from repositories import MemoryDatabase
+from usage import record_usage_change, recount_renamed
+
+UPDATED = datetime(2024, 1, 1)
+
+
+def test_usage_change_updates_counts_and_drops_cached_lists():
+    async def scenario():
+        configure_cache("memory")
+        await response_cache.set("categories:list?", (b"[]", {}), tags=["categories"])
+        await response_cache.set("tags:list?", (b"[]", {}), tags=["tags"])
+        await response_cache.set("prompts:list?", (b"[]", {}), tags=["prompts"])
+
+        db = MemoryDatabase("test")
+        await db.categories.insert_one({"id": "c1", "name": "coding", "type": "prompt", "usage_count": 0, "updated_at": UPDATED})
+        await db.tags.insert_one({"id": "t1", "name": "python", "type": "prompt", "usage_count": 0, "updated_at": UPDATED})
+        before = await db.tags.find_one({"id": "t1"}, {"_id": 0})
+        await record_usage_change(db, "prompt", None, {"category": "coding", "tags": ["python"]})
+        after = await db.tags.find_one({"id": "t1"}, {"_id": 0})
+        category = await db.categories.find_one({"id": "c1"}, {"_id": 0})
+        cached = [await response_cache.get(key) for key in ("categories:list?", "tags:list?", "prompts:list?")]
+        return before, after, category, cached
+
+    before, after, category, cached = asyncio.run(scenario())
+    assert category["usage_count"] == 1 and after["usage_count"] == 1
+    # $inc leaves updated_at alone, the ETag still moves
+    assert after["updated_at"] == before["updated_at"]
+    assert make_validators([before])[0] != make_validators([after])[0]
+    assert cached[0] is None and cached[1] is None
+    assert cached[2] is not None
+
+
+def test_no_count_change_keeps_cache():
+    async def scenario():
+        configure_cache("memory")
+        await response_cache.set("tags:list?", (b"[]", {}), tags=["tags"])
+        db = MemoryDatabase("test")
+        doc = {"category": "coding", "tags": ["python"]}
+        await record_usage_change(db, "prompt", doc, dict(doc))
+        return await response_cache.get("tags:list?")
+
+    assert asyncio.run(scenario()) is not None
+
+
+def test_recount_renamed_follows_the_new_name():
+    async def scenario():
+        db = MemoryDatabase("test")
+        await db.prompts.insert_many([
+            {"id": "p1", "category": "code", "tags": ["py", "cli"]},
+            {"id": "p2", "category": "code", "tags": ["py"]},
+        ])
+        await db.categories.insert_many([
+            {"id": "c1", "name": "code", "type": "prompt", "usage_count": 0},
+            {"id": "c2", "name": "Guides", "type": "blog", "usage_count": 7},
+        ])
+        await db.tags.insert_one({"id": "t1", "name": "py", "type": "prompt", "usage_count": 0})
+        await recount_renamed(db, "category", [
+            {"id": "c1", "type": "prompt", "name": "code"},
+            {"id": "c2", "type": "blog", "name": "How-tos"},
+        ])
+        await recount_renamed(db, "tag", [{"id": "t1", "type": "prompt", "name": "py"}])
+        categories = {doc["id"]: doc["usage_count"] async for doc in db.categories.find({})}
+        tag = await db.tags.find_one({"id": "t1"})
+        return categories, tag
+
+    categories, tag = asyncio.run(scenario())
+    assert categories == {"c1": 2, "c2": 7}
+    assert tag["usage_count"] == 2